@@ -21,6 +21,9 @@ setuptools.setup(
         'Operating System :: OS Independent',
     ],
     install_requires=[],
+    extras_require={
+        'syntax': ['pygments'],
+    },
     package_dir={'': 'src'},
     packages=setuptools.find_packages(where='src'),
     python_requires='>=3.6',
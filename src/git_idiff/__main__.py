@@ -4,17 +4,139 @@ import sys
 import typing
 
 from . import __version__
-from .gitdiff import GitDiff
-from .ui.cui import CursesUi, curses_initialize
+
+if typing.TYPE_CHECKING:
+    from .gitdiff import GitDiff
+
+EXPORT_ARG = '--export='
+EXPORT_HUNKS_ARG = '--export-hunks'
+RENDER_STATS_ARG = '--render-stats='
+LOG_ARG = '--log'
+MAX_FILE_CHANGES_ARG = '--max-file-changes='
+
+# remaining arguments, export format, hunks flag, render stats path, log revision range
+# and the changed lines above which a patch is deferred
+SplitArgs = typing.Tuple[
+    typing.List[str], typing.Optional[str], bool, typing.Optional[str], typing.Optional[str],
+    typing.Optional[int]
+]
 
 def main(args: typing.List[str]) -> None:
     if len(args) > 0 and args[0] == '-V':
         print(__version__)
         sys.exit(0)
 
-    gitdiff = GitDiff(args)
-    cui = CursesUi(gitdiff)
-    curses_initialize(cui)
+    try:
+        (
+            args, export_format, export_hunks, render_stats_path, log_range, max_file_changes
+        ) = _split_args(args)
+    except ValueError as err:
+        print(err, file=sys.stderr)
+        sys.exit(1)
+
+    # only import what is needed so printing the version or bad arguments stay fast,
+    # the ui pulls in curses and asyncio
+    from .gitdiff import MAX_FILE_CHANGES, GitDiff
+    gitdiff = GitDiff(
+        args,
+        max_file_changes=max_file_changes if max_file_changes is not None else MAX_FILE_CHANGES
+    )
+
+    if export_format is not None:
+        _export(gitdiff, export_format, export_hunks)
+    else:
+        _run_ui(gitdiff, render_stats_path, log_range)
+
+def _export(gitdiff: 'GitDiff', export_format: str, export_hunks: bool) -> None:
+    from .export import export
+    from .process import ProcessError
+
+    if len(gitdiff.removed_args) > 0:
+        print(
+            f'ignoring unsupported arguments: {", ".join(gitdiff.removed_args)}',
+            file=sys.stderr
+        )
+
+    try:
+        export(gitdiff, export_format, sys.stdout, export_hunks)
+    except ProcessError as err:
+        print(err, end='', file=sys.stderr)
+        sys.exit(1)
+    except ValueError as err:
+        print(err, file=sys.stderr)
+        sys.exit(1)
+    except BrokenPipeError:
+        sys.stderr.close()
+
+def _run_ui(
+    gitdiff: 'GitDiff',
+    render_stats_path: typing.Optional[str],
+    log_range: typing.Optional[str]
+) -> None:
+    from .gitlog import CommitSeries
+    from .ui.cui import CursesUi, curses_initialize
+    from .ui.renderstats import RenderStats
+
+    render_stats = RenderStats() if render_stats_path is not None else None
+    commits = CommitSeries(gitdiff, [log_range]) if log_range is not None else None
+    cui = CursesUi(gitdiff, render_stats, commits)
+    try:
+        curses_initialize(cui)
+    finally:
+        if commits is not None:
+            commits.close()
+        gitdiff.close()
+
+    if render_stats is not None and render_stats_path is not None:
+        with open(render_stats_path, 'w', encoding='utf-8') as file:
+            render_stats.report(file)
+
+def _split_args(args: typing.List[str]) -> SplitArgs:
+    """
+    Removes the git-idiff arguments before any -- and returns the remaining arguments,
+    export format, hunks flag, render stats path, log revision range and max file changes
+    """
+    result = []
+    export_format = None
+    export_hunks = False
+    render_stats_path = None
+    log_range = None
+    max_file_changes = None
+
+    args_iter = iter(enumerate(args))
+    for idx, arg in args_iter:
+        if arg == '--':
+            result.extend(args[idx:])
+            break
+        if arg == LOG_ARG:
+            _, log_range = next(args_iter, (None, None))
+            if log_range is None:
+                raise ValueError(f'{LOG_ARG} requires a revision range')
+        elif arg.startswith(EXPORT_ARG):
+            export_format = arg[len(EXPORT_ARG):]
+        elif arg == EXPORT_HUNKS_ARG:
+            export_hunks = True
+        elif arg.startswith(RENDER_STATS_ARG):
+            render_stats_path = arg[len(RENDER_STATS_ARG):]
+        elif arg.startswith(MAX_FILE_CHANGES_ARG):
+            max_file_changes = _parse_max_file_changes(arg[len(MAX_FILE_CHANGES_ARG):])
+        else:
+            result.append(arg)
+
+    if export_hunks and export_format is None:
+        raise ValueError(f'{EXPORT_HUNKS_ARG} requires {EXPORT_ARG}<format>')
+
+    return result, export_format, export_hunks, render_stats_path, log_range, max_file_changes
+
+def _parse_max_file_changes(value: str) -> int:
+    error = ValueError(f'{MAX_FILE_CHANGES_ARG}<lines> requires a non-negative number')
+    try:
+        lines = int(value)
+    except ValueError as err:
+        raise error from err
+    if lines < 0:
+        raise error
+    return lines
 
 def main_args():
     main(sys.argv[1:])
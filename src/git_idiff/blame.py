@@ -0,0 +1,213 @@
+from collections import OrderedDict
+import os
+import select
+import subprocess
+import typing
+
+from .gitdiff import GitDiff
+from .gitfile import GitFile
+from .process import READ_SIZE, pipe
+
+# lines are blamed in aligned blocks of this many lines so nearby views share the results
+BLAME_BLOCK_LINES = 100
+
+# number of blamed blocks kept
+BLAME_CACHE_SIZE = 64
+
+# commit hash, author and author time of a line
+BlameLine = typing.Tuple[str, str, int]
+
+# given for lines whose blame is still running
+BLAME_PENDING: BlameLine = ('', '', 0)
+
+class BlameRange:
+    """
+    Blame of a range of lines of one version of a file,
+    read from git blame --incremental as it is written
+    """
+
+    def __init__(self, start: int, end: int, proc: typing.Optional[subprocess.Popen] = None):
+        self.start: int = start
+        self.end: int = end
+        self.lines: typing.List[typing.Optional[BlameLine]] = [None] * (end - start + 1)
+        self.proc: typing.Optional[subprocess.Popen] = proc
+
+        self._buffer: bytes = b''
+        self._commits: typing.Dict[str, typing.List[typing.Any]] = {}
+        # commit hash, first final line and line count of the entry being read
+        self._entry: typing.Optional[typing.Tuple[str, int, int]] = None
+
+    @property
+    def running(self) -> bool:
+        return self.proc is not None
+
+    def line(self, num: int) -> typing.Optional[BlameLine]:
+        blame = self.lines[num - self.start]
+        if blame is None and self.running:
+            return BLAME_PENDING
+        return blame
+
+    def poll(self) -> bool:
+        """
+        Reads the output git has written so far without blocking,
+        returns whether lines were blamed or the blame finished
+        """
+        if self.proc is None:
+            return False
+
+        changed = False
+        stdout = pipe(self.proc.stdout)
+        while len(select.select([stdout], [], [], 0)[0]) != 0:
+            chunk = os.read(stdout.fileno(), READ_SIZE)
+            if len(chunk) == 0:
+                # lines that were not blamed are no longer pending
+                self.close()
+                return True
+            changed = self.feed(chunk) or changed
+        return changed
+
+    def feed(self, data: bytes) -> bool:
+        """
+        Parses incremental blame output and returns whether lines were blamed
+        """
+        lines = (self._buffer + data).split(b'\n')
+        self._buffer = lines.pop()
+
+        changed = False
+        for line in lines:
+            changed = self._feed_line(line) or changed
+        return changed
+
+    def close(self) -> None:
+        if self.proc is not None:
+            if self.proc.poll() is None:
+                self.proc.kill()
+            self.proc.wait()
+            pipe(self.proc.stdout).close()
+            self.proc = None
+
+    def _feed_line(self, line: bytes) -> bool:
+        if self._entry is None:
+            fields = line.split(b' ')
+            if len(fields) != 4:
+                return False
+            self._entry = (fields[0].decode('ascii'), int(fields[2]), int(fields[3]))
+            return False
+
+        commit_hash, first, count = self._entry
+        commit = self._commits.setdefault(commit_hash, ['', 0])
+        key, _, value = line.partition(b' ')
+        if key == b'author':
+            commit[0] = value.decode('utf-8', 'replace')
+        elif key == b'author-time':
+            commit[1] = int(value)
+        elif key == b'filename':
+            # the entry ends with the filename
+            self._entry = None
+            for num in range(max(first, self.start), min(first + count, self.end + 1)):
+                self.lines[num - self.start] = (commit_hash, commit[0], commit[1])
+            return True
+        return False
+
+class BlameCache:
+    """
+    Blamed blocks of lines keyed by file, blob, old revision and range,
+    dropping the least recently used past size
+    """
+
+    def __init__(self, size: int = BLAME_CACHE_SIZE):
+        self.size: int = size
+        self._ranges: 'OrderedDict[typing.Tuple[str, str, str, int], BlameRange]' = OrderedDict()
+
+    @property
+    def running(self) -> bool:
+        return any(blame.running for blame in self._ranges.values())
+
+    def annotate(self,
+        gitdiff: GitDiff,
+        filename: str,
+        blob_id: str,
+        line_nums: typing.Iterable[int]
+    ) -> typing.List[typing.Optional[BlameLine]]:
+        """
+        Returns the blame of each line of the blob,
+        starting git blame for the blocks that were not blamed yet
+
+        Line numbers below 1 have no blame,
+        BLAME_PENDING is given for lines that are still being blamed.
+        """
+        result: typing.List[typing.Optional[BlameLine]] = []
+        for num in line_nums:
+            if num < 1:
+                result.append(None)
+                continue
+
+            start = (num - 1) // BLAME_BLOCK_LINES * BLAME_BLOCK_LINES + 1
+            blame = self._get(gitdiff, filename, blob_id, start)
+            result.append(blame.line(num) if num <= blame.end else None)
+        return result
+
+    def poll(self) -> bool:
+        """
+        Reads the output of the running blames and returns whether any changed
+        """
+        changed = False
+        for blame in self._ranges.values():
+            changed = blame.poll() or changed
+        return changed
+
+    def close(self) -> None:
+        for blame in self._ranges.values():
+            blame.close()
+        self._ranges.clear()
+
+    def _get(self, gitdiff: GitDiff, filename: str, blob_id: str, start: int) -> BlameRange:
+        key = (filename, blob_id, gitdiff.old_revision() or '', start)
+        blame = self._ranges.get(key)
+        if blame is not None:
+            self._ranges.move_to_end(key)
+            return blame
+
+        end = start + BLAME_BLOCK_LINES - 1
+        blame = BlameRange(start, end, gitdiff.start_blame(filename, blob_id, start, end))
+        self._ranges[key] = blame
+        while len(self._ranges) > self.size:
+            _, evicted = self._ranges.popitem(last=False)
+            evicted.close()
+        return blame
+
+def old_line_numbers(file: GitFile, rows: typing.Sequence[int]) -> typing.List[int]:
+    """
+    Returns the line number in the old version of each of the content rows of the file,
+    0 for rows not in the old version
+
+    The lines are only counted from the start of the hunks the rows are in,
+    or from the previous row if it is before the row in the same hunk.
+    """
+    content = file.content
+    numbers = [0] * len(rows)
+    if len(file.headers) != 0 and file.headers[0].startswith('diff --cc '):
+        return numbers
+
+    hunk_idx = -1
+    # the next row to count in the hunk and its old line number if it is in the old version
+    next_row = 0
+    num = 0
+    for pos, row in enumerate(rows):
+        if not 0 <= row < len(content):
+            continue
+        idx = file.find_hunk(row)
+        if idx < 0:
+            continue
+        if idx != hunk_idx or row < next_row:
+            hunk_idx = idx
+            hunk_row, num = file.hunk(idx)[:2]
+            next_row = hunk_row + 1
+
+        while next_row < row:
+            if content[next_row][:1] in (' ', '-'):
+                num += 1
+            next_row += 1
+        if content[row][:1] in (' ', '-'):
+            numbers[pos] = num
+    return numbers
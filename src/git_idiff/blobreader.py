@@ -0,0 +1,175 @@
+from collections import OrderedDict
+import subprocess
+import typing
+
+from .process import READ_SIZE, ProcessError, kill, pipe
+
+# total size of the blobs kept in memory after they are read for context expansion
+BLOB_CACHE_SIZE = 2 ** 26
+# seconds to wait for cat-file to exit after its input is closed
+CLOSE_TIMEOUT = 1
+
+class BlobReader:
+    """
+    Reads blobs through a long running git cat-file --batch process
+
+    The most recently read blobs are kept until their total size exceeds cache_size.
+    """
+
+    ARGS = ['git', 'cat-file', '--batch']
+
+    def __init__(self, cache_size: int = BLOB_CACHE_SIZE):
+        self.cache_size: int = cache_size
+        self._cache: 'OrderedDict[str, typing.Optional[bytes]]' = OrderedDict()
+        self._cache_bytes: int = 0
+        self._proc: typing.Optional[subprocess.Popen] = None
+
+    def read(self, blob_id: str) -> typing.Optional[bytes]:
+        """
+        Returns the contents of the blob, or None if it is not a blob in the repository
+        """
+        if blob_id in self._cache:
+            self._cache.move_to_end(blob_id)
+            return self._cache[blob_id]
+
+        data = self._read_object(blob_id)
+
+        self._cache[blob_id] = data
+        self._cache_bytes += len(data or b'')
+        while self._cache_bytes > self.cache_size and len(self._cache) > 1:
+            _, evicted = self._cache.popitem(last=False)
+            self._cache_bytes -= len(evicted or b'')
+        return data
+
+    def close(self) -> None:
+        proc = self._proc
+        if proc is None:
+            return
+        self._proc = None
+
+        try:
+            # cat-file exits once its input ends
+            pipe(proc.stdin).close()
+        except BrokenPipeError:
+            pass
+        try:
+            proc.wait(CLOSE_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            # cat-file is blocked writing an object that is not read
+            proc.kill()
+            proc.wait()
+        pipe(proc.stdout).close()
+
+    def read_to_file(self, blob_id: str, out: typing.BinaryIO) -> bool:
+        """
+        Writes the contents of the blob to out a chunk at a time without caching it,
+        returns False if it is not a blob in the repository
+        """
+        if blob_id in self._cache:
+            data = self._cache[blob_id]
+            if data is None:
+                return False
+            out.write(data)
+            return True
+
+        header = self._request(blob_id)
+        if header is None:
+            return False
+
+        obj_type, size, stdout = header
+        remaining = size + 1
+        try:
+            while remaining > 0:
+                chunk = stdout.read(min(remaining, READ_SIZE))
+                if len(chunk) == 0:
+                    raise self._exited()
+                remaining -= len(chunk)
+
+                if obj_type == b'blob':
+                    # the contents are followed by a newline
+                    out.write(chunk if remaining > 0 else chunk[:-1])
+            out.flush()
+        except BaseException:
+            self._kill()
+            raise
+        return obj_type == b'blob'
+
+    def _read_object(self, blob_id: str) -> typing.Optional[bytes]:
+        header = self._request(blob_id)
+        if header is None:
+            return None
+
+        obj_type, size, stdout = header
+        try:
+            data = stdout.read(size + 1)
+        except BaseException:
+            self._kill()
+            raise
+        if len(data) != size + 1:
+            raise self._exited()
+        if obj_type != b'blob':
+            return None
+        return data[:size]
+
+    def _request(
+        self,
+        blob_id: str
+    ) -> typing.Optional[typing.Tuple[bytes, int, typing.IO[bytes]]]:
+        """
+        Asks for the object and returns its type, size and the pipe its contents are read from,
+        or None if it does not exist
+        """
+        if self._proc is not None and self._proc.poll() is not None:
+            self.close()
+        if self._proc is None:
+            self._proc = _start_cat_file()
+
+        stdin, stdout = pipe(self._proc.stdin), pipe(self._proc.stdout)
+        try:
+            stdin.write(blob_id.encode('ascii') + b'\n')
+            stdin.flush()
+            header = stdout.readline()
+        except BrokenPipeError as exc:
+            raise self._exited() from exc
+        except BaseException:
+            self._kill()
+            raise
+        if len(header) == 0:
+            raise self._exited()
+
+        # missing and ambiguous objects only have the name and reason
+        fields = header.split()
+        if len(fields) != 3:
+            return None
+        return fields[1], int(fields[2]), stdout
+
+    def _exited(self) -> ProcessError:
+        """
+        Closes the pipes of cat-file after it exited, the next request starts it again
+        """
+        self._kill()
+        return ProcessError('git cat-file exited')
+
+    def _kill(self) -> None:
+        """
+        Stops cat-file when an object was not read to its end,
+        the rest of it would be read as the next reply; the next request starts it again
+        """
+        proc = self._proc
+        if proc is None:
+            return
+        self._proc = None
+
+        kill(proc)
+        proc.wait()
+        for stream in (proc.stdin, proc.stdout):
+            try:
+                pipe(stream).close()
+            except BrokenPipeError:
+                pass
+
+def _start_cat_file() -> subprocess.Popen:
+    return subprocess.Popen(
+        BlobReader.ARGS,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
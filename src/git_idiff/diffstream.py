@@ -0,0 +1,337 @@
+from array import array
+import subprocess
+import typing
+
+from .gitdiff import GitDiff, combined_filename, parse_statuses, process_numstat
+from .gitfile import GitFile, GitFileTable
+from .lines import LineBuffer
+from .process import STREAM_LIMIT, ProcessError, kill, kill_async, pipe, run_async
+
+Hunk = typing.Tuple[int, int, int, int, int]
+FileCallback = typing.Callable[[GitFile], typing.Optional[bool]]
+HunkCallback = typing.Callable[[GitFile, Hunk], None]
+
+class _PatchReader:
+    """
+    Collects the headers, hunk index and optionally the lines of one patch as its lines are read
+    """
+
+    def __init__(self,
+        gitdiff: GitDiff,
+        file: GitFile,
+        content: bool,
+        on_hunk: typing.Optional[HunkCallback] = None
+    ):
+        self.gitdiff: GitDiff = gitdiff
+        self.file: GitFile = file
+        self.on_hunk: typing.Optional[HunkCallback] = on_hunk
+        self.hunks: array = array('I')
+
+        # lines without their newline, joined when the patch ends
+        self.content: typing.Optional[typing.List[bytes]] = [] if content else None
+        self.rows: int = 0
+
+    def add(self, line: bytes) -> None:
+        if line.endswith(b'\n'):
+            line = line[:-1]
+
+        if self.rows == 0:
+            header = line.decode('utf-8', self.gitdiff.decode_errors)
+            if GitDiff.HEADERS_REGEX.match(header) is not None:
+                self.file.headers.append(header)
+                return
+
+        if line.startswith(b'@@'):
+            match = GitDiff.HUNK_REGEX.match(line)
+            if match is not None:
+                self._hunk_done()
+
+                old_start, old_count, new_start, new_count = match.groups()
+                self.hunks.extend((
+                    self.rows,
+                    int(old_start),
+                    int(old_count) if old_count is not None else 1,
+                    int(new_start),
+                    int(new_count) if new_count is not None else 1,
+                ))
+
+        if self.content is not None:
+            self.content.append(line)
+        self.rows += 1
+
+    def finish(self) -> GitFile:
+        self._hunk_done()
+
+        self.file.hunks = self.hunks
+        if self.content is not None:
+            self.file.content = LineBuffer.from_raw_lines(self.content, self.gitdiff.decode_errors)
+        return self.file
+
+    def _hunk_done(self) -> None:
+        if self.on_hunk is not None and len(self.hunks) != 0:
+            row, old_start, old_count, new_start, new_count = self.hunks[-GitFile.HUNK_SIZE:]
+            self.on_hunk(self.file, (row, old_start, old_count, new_start, new_count))
+
+class DiffStreamParser:
+    """
+    Parses git diff patch output fed to it one line at a time
+
+    Only the numstat entries are kept for the whole diff.
+    The lines of the current patch are kept if content is set, otherwise only its headers
+    and hunk index are, so memory does not grow with the size of the patches.
+    """
+
+    STATE_COMBINED = 0
+    STATE_NUMSTAT = 1
+    STATE_PATCHES = 2
+
+    def __init__(self,
+        gitdiff: GitDiff,
+        content: bool = True,
+        on_hunk: typing.Optional[HunkCallback] = None
+    ):
+        self.gitdiff: GitDiff = gitdiff
+        self.content: bool = content
+        self.on_hunk: typing.Optional[HunkCallback] = on_hunk
+
+        # merge conflict patches come before the numstat entries
+        self._state: int = DiffStreamParser.STATE_COMBINED
+        self._numstat: bytes = b''
+        self._results: GitFileTable = GitFileTable()
+        self._result_idx: int = 0
+        self._patch: typing.Optional[_PatchReader] = None
+        self._last_line: bytes = b''
+
+    def feed(self, line: bytes) -> typing.Optional[GitFile]:
+        """
+        Parses the next line of output and returns the file whose patch it ended, if any
+        """
+        finished = None
+
+        if self._state == DiffStreamParser.STATE_COMBINED:
+            if b'\0' not in line:
+                if line.startswith(GitDiff.DIFFSTART_PREFIXES):
+                    finished = self._finish_patch()
+                    self._patch = _PatchReader(
+                        self.gitdiff, self._combined_file(line), self.content, self.on_hunk
+                    )
+                elif self._patch is None:
+                    raise ValueError(f'expected diff header, but got {line[:32]!r}')
+
+                self._patch.add(line)
+                return finished
+
+            finished = self._finish_patch()
+            self._state = DiffStreamParser.STATE_NUMSTAT
+
+        if self._state == DiffStreamParser.STATE_NUMSTAT:
+            # the numstat entries end with an empty entry, followed by the first patch line
+            self._numstat += line
+            if b'\0\0' not in self._numstat:
+                return finished
+
+            numstat, _, line = self._numstat.partition(b'\0\0')
+            self._numstat = b''
+            self._process_numstat(numstat)
+            self._state = DiffStreamParser.STATE_PATCHES
+            if len(line) == 0:
+                return finished
+
+        patch = self._patch
+        if line.startswith(GitDiff.DIFFSTART_PREFIXES):
+            # the first patch line comes with the numstat entries,
+            # after a merge conflict patch may have ended
+            if patch is not None:
+                finished = self._finish_patch()
+            patch = self._start_patch()
+        elif patch is None:
+            raise ValueError(f'expected diff header, but got {line[:32]!r}')
+
+        patch.add(line)
+        self._last_line = line
+        return finished
+
+    def close(self) -> typing.List[GitFile]:
+        """
+        Finishes parsing at the end of the output and returns the remaining files
+        """
+        if self._state != DiffStreamParser.STATE_PATCHES:
+            finished = self._finish_patch()
+            if len(self._numstat) != 0:
+                self._process_numstat(self._numstat.rstrip(b'\0'))
+
+            # git diff did not return a patch
+            result = [] if finished is None else [finished]
+            result.extend(self._numstat_file(idx) for idx in range(len(self._results)))
+            return result
+
+        # the output ends with a newline,
+        # which leaves an empty last line like splitting the whole output does
+        if self._patch is not None and self._last_line.endswith(b'\n'):
+            self._patch.add(b'')
+        finished = self._finish_patch()
+        result = [] if finished is None else [finished]
+
+        if self._result_idx != len(self._results):
+            raise ValueError(
+                'not enough diff patches were given for all of the changes, '
+                f'expected {len(self._results)}, but got {self._result_idx}'
+            )
+        return result
+
+    def _process_numstat(self, numstat: bytes) -> None:
+        process_numstat((numstat + b'\0').split(b'\0'), 0, self._results)
+
+    def _start_patch(self) -> _PatchReader:
+        if self._result_idx == len(self._results):
+            raise ValueError(
+                'too many diff patches were given for all of the changes, '
+                f'only expected {len(self._results)}'
+            )
+
+        file = self._numstat_file(self._result_idx)
+        self._result_idx += 1
+
+        max_file_changes = self.gitdiff.max_file_changes
+        deferred = max_file_changes is not None and file.changes > max_file_changes
+        file.deferred = self.content and not file.is_binary and deferred
+        self._patch = _PatchReader(
+            self.gitdiff,
+            file,
+            self.content and not file.is_binary and not deferred,
+            self.on_hunk
+        )
+        return self._patch
+
+    def _finish_patch(self) -> typing.Optional[GitFile]:
+        if self._patch is None:
+            return None
+
+        file = self._patch.finish()
+        self._patch = None
+        return file
+
+    def _numstat_file(self, idx: int) -> GitFile:
+        return GitFile(
+            self._results.filename(idx),
+            self._results.old_filename(idx),
+            self._results[idx].insertions,
+            self._results[idx].deletions
+        )
+
+    def _combined_file(self, line: bytes) -> GitFile:
+        return GitFile(combined_filename(line.rstrip(b'\n')))
+
+def iter_diff(
+    gitdiff: GitDiff,
+    content: bool = True,
+    on_file: typing.Optional[FileCallback] = None,
+    on_hunk: typing.Optional[HunkCallback] = None
+) -> typing.Generator[GitFile, None, None]:
+    """
+    Runs git diff and yields each file with its status as soon as its patch has been read
+
+    Files are not kept after they are yielded. on_file is called with each file
+    before it is yielded, and the file is skipped if it returns False.
+    on_hunk is called with the file and the (content row, old start, old count,
+    new start, new count) of each hunk once its lines are read,
+    the file only has its filenames, counts and headers at that point.
+    Stopping the iteration or raising from a callback stops git.
+    """
+    with subprocess.Popen([
+        *GitDiff.STATUS_ARGS, *gitdiff.args
+    ], stdout=subprocess.PIPE, stderr=subprocess.PIPE) as proc:
+        output, stderr = proc.communicate()
+        if proc.returncode != 0:
+            raise ProcessError(stderr.decode('utf-8', 'replace'))
+
+        statuses = parse_statuses(output)
+
+    with subprocess.Popen([
+        *GitDiff.DIFF_ARGS, *gitdiff.args
+    ], stdout=subprocess.PIPE, stderr=subprocess.PIPE) as proc:
+        parser = DiffStreamParser(gitdiff, content, on_hunk)
+
+        try:
+            for file in parse_stream(parser, pipe(proc.stdout)):
+                if _accept_file(file, statuses, on_file):
+                    yield file
+
+            stderr = pipe(proc.stderr).read()
+            if proc.wait() != 0:
+                raise ProcessError(stderr.decode('utf-8', 'replace'))
+        finally:
+            # the caller stopped early or a callback raised
+            kill(proc)
+
+async def iter_diff_async(
+    gitdiff: GitDiff,
+    content: bool = True,
+    on_file: typing.Optional[FileCallback] = None,
+    on_hunk: typing.Optional[HunkCallback] = None
+) -> typing.AsyncGenerator[GitFile, None]:
+    """
+    Runs git diff and yields each file with its status as soon as its patch has been read
+
+    Same as iter_diff, but reads the git output without blocking the event loop.
+    """
+    import asyncio
+
+    statuses = parse_statuses(await run_async([*GitDiff.STATUS_ARGS, *gitdiff.args]))
+
+    proc = await asyncio.create_subprocess_exec(*[
+        *GitDiff.DIFF_ARGS, *gitdiff.args
+    ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, limit=STREAM_LIMIT)
+    parser = DiffStreamParser(gitdiff, content, on_hunk)
+    stdout = pipe(proc.stdout)
+
+    try:
+        while True:
+            line = await stdout.readline()
+            if len(line) == 0:
+                break
+
+            file = parser.feed(line)
+            if file is not None and _accept_file(file, statuses, on_file):
+                yield file
+
+        for file in parser.close():
+            if _accept_file(file, statuses, on_file):
+                yield file
+    except BaseException:
+        # the caller stopped early, a callback raised or the task was cancelled
+        await kill_async(proc)
+        raise
+
+    stderr = await pipe(proc.stderr).read()
+    if await proc.wait() != 0:
+        raise ProcessError(stderr.decode('utf-8', 'replace'))
+
+def iter_process_diff(
+    gitdiff: GitDiff,
+    lines: typing.Iterable[bytes],
+    content: bool = True,
+    on_hunk: typing.Optional[HunkCallback] = None
+) -> typing.Generator[GitFile, None, None]:
+    """
+    Processes git diff patch output line by line, yielding each GitFile when its patch ends
+    """
+    return parse_stream(DiffStreamParser(gitdiff, content, on_hunk), lines)
+
+def parse_stream(
+    parser: DiffStreamParser,
+    lines: typing.Iterable[bytes]
+) -> typing.Generator[GitFile, None, None]:
+    for line in lines:
+        file = parser.feed(line)
+        if file is not None:
+            yield file
+    yield from parser.close()
+
+def _accept_file(
+    file: GitFile,
+    statuses: typing.Dict[typing.Tuple[typing.Optional[str], str], str],
+    on_file: typing.Optional[FileCallback]
+) -> bool:
+    file.set_status(statuses.get((file.old_filename, file.filename)))
+    return on_file is None or on_file(file) is not False
@@ -0,0 +1,48 @@
+import json
+import typing
+
+from .diffstream import iter_diff
+from .gitdiff import GitDiff
+from .gitfile import GitFile, display_path
+
+EXPORT_FORMATS = ['jsonl']
+
+def export(gitdiff: GitDiff, export_format: str, out: typing.TextIO, hunks: bool = False) -> None:
+    """
+    Streams the diff to out in the export format without keeping the patches in memory
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f'unknown export format: {export_format}')
+
+    write_jsonl(iter_diff(gitdiff, content=False), out, hunks)
+
+def write_jsonl(files: typing.Iterable[GitFile], out: typing.TextIO, hunks: bool = False) -> None:
+    """
+    Writes one JSON record per file as each file is read
+    """
+    for file in files:
+        out.write(json.dumps(file_record(file, hunks)))
+        out.write('\n')
+
+def file_record(file: GitFile, hunks: bool = False) -> typing.Dict[str, typing.Any]:
+    record: typing.Dict[str, typing.Any] = {
+        'filename': display_path(file.filename),
+        'old_filename': display_path(file.old_filename) if file.old_filename is not None else None,
+        'status': file.status,
+        'score': file.score,
+        'insertions': file.insertions,
+        'deletions': file.deletions,
+    }
+
+    if hunks:
+        record['hunks'] = []
+        for idx in range(file.hunk_count):
+            _, old_start, old_count, new_start, new_count = file.hunk(idx)
+            record['hunks'].append({
+                'old_start': old_start,
+                'old_count': old_count,
+                'new_start': new_start,
+                'new_count': new_count,
+            })
+
+    return record
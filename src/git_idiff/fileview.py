@@ -0,0 +1,146 @@
+from array import array
+import bisect
+import mmap
+import tempfile
+import typing
+
+from .gitdiff import GitDiff
+from .gitfile import GitFile, is_null_blob
+from .lines import LineBuffer, stream_line_offsets
+
+class FileView:
+    """
+    Lines of the whole old or new version of a file,
+    memory mapped so only the lines that are shown are decoded
+
+    changes holds the start and end line index of each run of lines added to the new version,
+    or removed from the old version.
+    """
+
+    def __init__(self, lines: LineBuffer, changes: array, new: bool):
+        self.lines: LineBuffer = lines
+        self.changes: array = changes
+        self.new: bool = new
+        self.longest: int = lines.longest()
+
+        self._change_starts: array = changes[::2]
+
+    @property
+    def change_count(self) -> int:
+        return len(self._change_starts)
+
+    def change_start(self, idx: int) -> int:
+        return self._change_starts[idx]
+
+    def find_change(self, row: int) -> int:
+        """
+        Returns the index of the last change starting at or before the line, or -1 if there is none
+        """
+        return bisect.bisect_right(self._change_starts, row) - 1
+
+    def is_changed(self, row: int) -> bool:
+        return bisect.bisect_right(self.changes, row) % 2 == 1
+
+    def close(self) -> None:
+        data = self.lines.data
+        self.lines = LineBuffer()
+        if isinstance(data, mmap.mmap):
+            data.close()
+
+def open_file_view(gitdiff: GitDiff, file: GitFile, new: bool) -> typing.Optional[FileView]:
+    """
+    Maps the new or old version of the file, or returns None if that version does not exist
+
+    Blobs are streamed from git to a temporary file,
+    a new version that is not a blob is read from the work tree.
+    The mapping stays valid after the file it was made from is closed.
+    """
+    if file.is_binary or file.status == (GitFile.DELETED if new else GitFile.ADDED):
+        return None
+
+    blob_id = version_blob_id(file, new)
+    if blob_id is not None:
+        with tempfile.TemporaryFile() as source:
+            if gitdiff.read_blob_to_file(blob_id, source):
+                return _map_file_view(gitdiff, file, new, source)
+
+    if not new:
+        return None
+    with open(gitdiff.work_tree_path(file.filename), 'rb') as source:
+        return _map_file_view(gitdiff, file, new, source)
+
+def changed_runs(file: GitFile, new: bool) -> array:
+    """
+    Returns the start and end line index of each run of lines
+    added to the new version or removed from the old one,
+    numbered from the line starts of the hunk index
+    """
+    runs = array('Q')
+    if len(file.headers) != 0 and file.headers[0].startswith('diff --cc '):
+        return runs
+
+    prefix = '+' if new else '-'
+    content = file.content
+    hunks = file.hunks
+
+    for idx in range(0, len(hunks), GitFile.HUNK_SIZE):
+        row, old_start, _, new_start, _ = hunks[idx:idx + GitFile.HUNK_SIZE]
+        next_idx = idx + GitFile.HUNK_SIZE
+        end = hunks[next_idx] if next_idx < len(hunks) else len(content)
+
+        line_idx = (new_start if new else old_start) - 1
+        for line in content[row + 1:end]:
+            kind = line[:1]
+            if kind == prefix:
+                if len(runs) != 0 and runs[-1] == line_idx:
+                    runs[-1] += 1
+                else:
+                    runs.extend((line_idx, line_idx + 1))
+                line_idx += 1
+            elif kind == ' ':
+                line_idx += 1
+
+    return runs
+
+def version_blob_id(file: GitFile, new: bool) -> typing.Optional[str]:
+    """
+    Returns the blob id of the version of the file from its index header, or None if it is not known
+    """
+    blob_ids = file.index_blob_ids
+    if blob_ids is None:
+        return None
+
+    # combined diffs have one old blob per parent
+    blob = blob_ids[1 if new else 0]
+    if ',' in blob or is_null_blob(blob):
+        return None
+    return blob
+
+def _map_file_view(
+    gitdiff: GitDiff,
+    file: GitFile,
+    new: bool,
+    source: typing.BinaryIO
+) -> FileView:
+    data = _map(source)
+    try:
+        offsets = stream_line_offsets(data)
+        if data[-1:] == b'\n':
+            # the newline ends the last line instead of starting an empty one
+            offsets.pop()
+    except BaseException:
+        if isinstance(data, mmap.mmap):
+            data.close()
+        raise
+
+    return FileView(
+        LineBuffer(data, offsets, gitdiff.decode_errors),
+        changed_runs(file, new),
+        new
+    )
+
+def _map(source: typing.BinaryIO) -> typing.Any:
+    source.seek(0, 2)
+    if source.tell() == 0:
+        return b''
+    return mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
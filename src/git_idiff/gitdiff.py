@@ -1,49 +1,24 @@
-import asyncio
+from array import array
+import bisect
+import os
 import re
 import subprocess
+import tempfile
 import typing
 
-class GitFile:
-    ADDED = 'A'
-    COPIED = 'C'
-    DELETED = 'D'
-    MODIFIED = 'M'
-    RENAMED = 'R'
-    TYPE_CHANGED = 'T'
-    UNMERGED = 'U'
-    UNKNOWN = 'X'
-    BROKEN = 'B'
+from .blobreader import BlobReader
+from .gitfile import PATH_ERRORS, GitFile, GitFileTable, display_path, is_null_blob
+from .lines import DEFAULT_ERRORS, LineBuffer, line_offsets
+from .process import ProcessError, run_async
+from .progress import DiffProgress
 
-    def __init__(self,
-        filename: str,
-        old_filename: typing.Optional[str] = None,
-        insertions: typing.Optional[int] = None,
-        deletions: typing.Optional[int] = None,
-        headers: typing.Optional[typing.List[str]] = None,
-        content: typing.Optional[typing.List[str]] = None,
-        status: typing.Optional[str] = None
-    ):
-        self.filename: str = filename
-        self.old_filename: typing.Optional[str] = old_filename
-        self.insertions: typing.Optional[int] = insertions
-        self.deletions: typing.Optional[int] = deletions
-        self.headers: typing.List[str] = headers if headers is not None else []
-        self.content: typing.List[str] = content if content is not None else []
-
-        self.status: str = GitFile.UNKNOWN
-        self.score: int = 0
+if typing.TYPE_CHECKING:
+    from .diffstream import FileCallback, HunkCallback
 
-        self.set_status(status)
+# files with more changed lines than this have their patch loaded on demand
+MAX_FILE_CHANGES = 10000
 
-    def set_status(self, status) -> None:
-        if status is not None:
-            self.status = status[0]
-            self.score = int(status[1:]) if len(status) > 1 else 0
-        else:
-            self.status = GitFile.UNKNOWN
-            self.score = 0
-
-_FileDiff = typing.Tuple[typing.List[str], typing.List[str]]
+_FileDiff = typing.Tuple[str, typing.List[str], LineBuffer, array]
 
 class GitDiff:
     WHITELIST_ARGS = [
@@ -99,180 +74,563 @@ class GitDiff:
     DIFFSTART_REGEX = re.compile(
         r'^diff --(cc|git) '
     )
+    DIFFSTART_PREFIXES = (b'diff --cc ', b'diff --git ')
+    TWO_PATH_STATUSES = (GitFile.COPIED, GitFile.RENAMED)
+    HUNK_REGEX = re.compile(
+        rb'@@+ -(\d+)(?:,(\d+))?(?: -\d+(?:,\d+)?)* \+(\d+)(?:,(\d+))? @@'
+    )
+    SIMILARITY_REGEX = re.compile(
+        r'^similarity index (\d+)%'
+    )
 
     DIFF_ARGS = ['git', 'diff', '--numstat', '-z', '-p']
     STATUS_ARGS = ['git', 'diff', '--name-status', '-z']
+    BLAME_ARGS = ['git', 'blame', '--incremental']
+
+    # short options whose value can be given as the next argument
+    ARGS_SINGLE_VALUE = 'UlSGOI'
+    # long options whose value can be given as the next argument,
+    # they are joined to it as --option=value when sanitized
+    ARGS_LONG_VALUE = [
+        '--unified',
+        '--anchored', '--diff-algorithm',
+        '--diff-filter',
+        '--find-object',
+        '--skip-to', '--rotate-to',
+        '--ignore-matching-lines',
+        '--inter-hunk-context',
+        '--src-prefix', '--dst-prefix',
+    ]
+
+    # each commit starts with a NUL, which a patch line cannot start with,
+    # followed by NUL terminated fields
+    LOG_ARGS = [
+        'git', 'log', '-p', '--numstat', '-z',
+        '--format=%x00commit %H%x00%P%x00%an%x00%at%x00%s'
+    ]
+    LOG_COMMIT_PREFIX = b'\0commit '
+    LOG_COMMIT_FIELDS = 6
 
-    def __init__(self, args: typing.Optional[typing.Iterable[str]] = None):
+    def __init__(self,
+        args: typing.Optional[typing.Iterable[str]] = None,
+        decode_errors: str = DEFAULT_ERRORS,
+        max_file_changes: typing.Optional[int] = MAX_FILE_CHANGES
+    ):
         self.src_prefix: str = 'a/'
         self.dst_prefix: str = 'b/'
         self._removed_args: typing.List[str] = []
 
         self.args = self._sanitize_args(args) if args is not None else []
 
-    async def get_diff_async(self) -> typing.List[GitFile]:
+        # error handler used when decoding patch lines that are not valid UTF-8
+        self.decode_errors: str = decode_errors
+
+        # patches of files with more inserted and deleted lines are deferred, None loads all patches
+        self.max_file_changes: typing.Optional[int] = max_file_changes
+
+        # started on the first blob read and kept running,
+        # it can be shared by other GitDiff instances
+        self.blob_reader: typing.Optional[BlobReader] = None
+
+        self._top_level: typing.Optional[str] = None
+        # object id of each revision checked, None if it did not name an object,
+        # merge bases are kept under their A...B name
+        self._revisions: typing.Dict[str, typing.Optional[str]] = {}
+
+    async def get_diff_async(self,
+        previous: typing.Optional[typing.Sequence[GitFile]] = None,
+        progress: typing.Optional[DiffProgress] = None
+    ) -> GitFileTable:
         """
         Gets git diff patch output and processes it
-        """
-        proc = await asyncio.create_subprocess_exec(*[
-            *GitDiff.DIFF_ARGS, *self.args
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        output, stderr = await proc.communicate()
-        if proc.returncode != 0:
-            raise ProcessError(stderr.decode('utf-8'))
 
-        return self._process_diff(output)
+        Patches of files in previous whose blob ids have not changed
+        are reused instead of the new entries.
+        The output is counted in progress as it is read.
+        """
+        output = await run_async([*GitDiff.DIFF_ARGS, *self.args], progress)
+        return self._process_diff(output, previous)
 
-    def get_diff(self) -> typing.List[GitFile]:
+    def get_diff(self,
+        previous: typing.Optional[typing.Sequence[GitFile]] = None
+    ) -> GitFileTable:
         """
         Gets git diff patch output and processes it
+
+        Patches of files in previous whose blob ids have not changed
+        are reused instead of the new entries
         """
         with subprocess.Popen([
             *GitDiff.DIFF_ARGS, *self.args
         ], stdout=subprocess.PIPE, stderr=subprocess.PIPE) as proc:
             output, stderr = proc.communicate()
             if proc.returncode != 0:
-                raise ProcessError(stderr.decode('utf-8'))
+                raise ProcessError(stderr.decode('utf-8', 'replace'))
 
-            return self._process_diff(output)
+            return self._process_diff(output, previous)
 
-    def _process_diff(self, output: bytes) -> typing.List[GitFile]:
+    def iter_diff(self,
+        content: bool = True,
+        on_file: typing.Optional['FileCallback'] = None,
+        on_hunk: typing.Optional['HunkCallback'] = None
+    ) -> typing.Generator[GitFile, None, None]:
         """
-        Processes git diff patch output into GitFile entries
+        Runs git diff and yields each file with its status as soon as its patch has been read
+
+        See diffstream.iter_diff for the callbacks.
         """
-        output_split = output.split(b'\0')
-        idx = 0
+        from .diffstream import iter_diff
 
-        results: typing.List[GitFile] = []
+        return iter_diff(self, content, on_file, on_hunk)
 
-        # check for merge conflict patches
-        merge_conflicts = 0
-        last_content: typing.List[str] = []
-        for (headers, content) in self._get_file_diffs(output_split[0].decode('utf-8')):
-            if len(headers) == 0:
-                break
+    def iter_diff_async(self,
+        content: bool = True,
+        on_file: typing.Optional['FileCallback'] = None,
+        on_hunk: typing.Optional['HunkCallback'] = None
+    ) -> typing.AsyncGenerator[GitFile, None]:
+        """
+        Same as iter_diff, but reads the git output without blocking the event loop
+        """
+        from .diffstream import iter_diff_async
 
-            match = GitDiff.DIFFSTART_REGEX.match(headers[0])
-            if not match:
-                raise ValueError(f'expected diff header, but got {headers[0]}')
-            if match.groups()[0] != 'cc':
-                raise ValueError(f'expected combined diff, but got {match.groups()[0]}')
-
-            filename = headers[0][match.end():]
-
-            results.append(GitFile(
-                filename,
-                None,
-                None,
-                None,
-                headers,
-                content,
-            ))
-            last_content = content
-            merge_conflicts += 1
+        return iter_diff_async(self, content, on_file, on_hunk)
 
-        if len(last_content) != 0:
-            output_split[0] = last_content[-1].encode('utf-8')
-            last_content.pop()
+    def get_file_patch(self, file: GitFile) -> None:
+        """
+        Loads the patch of a deferred file
+        """
+        with subprocess.Popen([
+            *GitDiff.DIFF_ARGS, *self._file_args(file)
+        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE) as proc:
+            output, stderr = proc.communicate()
+            if proc.returncode != 0:
+                raise ProcessError(stderr.decode('utf-8', 'replace'))
 
-        # process numstat
-        while idx < len(output_split):
-            parts = output_split[idx].split(b'\t')
-            idx += 1
-            if len(parts) == 1:
-                break
+            self._process_file_patch(file, output)
 
-            insertions, deletions, fname = parts
-            old_fname = None
+    def read_blob(self, blob_id: str) -> typing.Optional[bytes]:
+        """
+        Returns the contents of the blob, or None if it is not a blob in the repository
+        """
+        if self.blob_reader is None:
+            self.blob_reader = BlobReader()
+        return self.blob_reader.read(blob_id)
 
-            try:
-                if len(fname) == 0:
-                    old_fname = output_split[idx].decode('utf-8')
-                    idx += 1
-                    fname = output_split[idx]
-                    idx += 1
-
-                    if len(fname) == 0 or len(old_fname) == 0:
-                        raise ValueError('missing filename')
-
-                results.append(GitFile(
-                    fname.decode('utf-8'),
-                    old_fname,
-                    int(insertions) if insertions != b'-' else None,
-                    int(deletions) if deletions != b'-' else None
-                ))
-            except (IndexError, ValueError) as err:
-                raise ValueError('received incorrect output from git diff') from err
+    def read_blob_to_file(self, blob_id: str, out: typing.BinaryIO) -> bool:
+        """
+        Writes the contents of the blob to out, returns False if it is not a blob in the repository
+        """
+        if self.blob_reader is None:
+            self.blob_reader = BlobReader()
+        return self.blob_reader.read_to_file(blob_id, out)
 
-        # git diff did not return a patch
-        if idx == len(output_split):
-            return results
+    def work_tree_path(self, filename: str) -> str:
+        """
+        Returns the path of a file of the diff in the work tree
+        """
+        if '--no-index' in self.args or '--relative' in self.args:
+            return filename
+
+        if self._top_level is None:
+            with subprocess.Popen([
+                'git', 'rev-parse', '--show-toplevel'
+            ], stdout=subprocess.PIPE, stderr=subprocess.PIPE) as proc:
+                output, stderr = proc.communicate()
+                if proc.returncode != 0:
+                    raise ProcessError(stderr.decode('utf-8', 'replace'))
+                self._top_level = output.rstrip(b'\n').decode('utf-8', PATH_ERRORS)
+
+        for arg in self.args:
+            if arg.startswith('--relative='):
+                return os.path.join(self._top_level, arg[len('--relative='):], filename)
+        return os.path.join(self._top_level, filename)
+
+    def rev_parse(self, revision: str) -> typing.Optional[str]:
+        """
+        Returns the object id the revision names, or None if it does not name an object
+        """
+        return self._resolve(revision, ['git', 'rev-parse', '--verify', '--quiet', revision])
+
+    def merge_base(self, first: str, second: str) -> typing.Optional[str]:
+        """
+        Returns the object id of the best common ancestor of the commits,
+        or None if they have none
+        """
+        return self._resolve(f'{first}...{second}', ['git', 'merge-base', first, second])
+
+    def old_revision(self) -> typing.Optional[str]:
+        """
+        Returns the commit of the old side of the diff, that of HEAD if it is the index,
+        or None if the old side is not in a commit of the repository
+        """
+        return self._old_version()[0]
+
+    def _old_version(self) -> typing.Tuple[typing.Optional[str], bool]:
+        """
+        Returns the commit of the old side of the diff
+        and whether the old side is the index on top of it
+        """
+        if '--no-index' in self.args:
+            return None, False
+
+        options, revisions, _ = self._split_args()
+        if len(revisions) == 1 and '...' in revisions[0]:
+            first, second = revisions[0].split('...', 1)
+            return self.merge_base(first or 'HEAD', second or 'HEAD'), False
+        if len(revisions) == 1 and '..' in revisions[0]:
+            first, second = revisions[0].split('..', 1)
+            revisions = [first or 'HEAD', second or 'HEAD']
+
+        if len(revisions) == 0:
+            # the index is diffed against the work tree, or HEAD against the index
+            cached = '--cached' in options or '--staged' in options
+            return self._commit('HEAD'), not cached
+        if len(revisions) > 2:
+            # combined diffs have one old side per parent
+            return None, False
+        if '--merge-base' in options:
+            second = revisions[1] if len(revisions) == 2 else 'HEAD'
+            return self.merge_base(revisions[0], second), False
+        return self._commit(revisions[0]), False
+
+    def start_blame(self,
+        filename: str,
+        blob_id: str,
+        start: int,
+        end: int
+    ) -> typing.Optional[subprocess.Popen]:
+        """
+        Starts git blame --incremental over lines start to end of the blob,
+        the old version of the file, and returns None if there are no lines to blame
+        """
+        revision, from_index = self._old_version()
+        if revision is None:
+            return None
+        data = self.read_blob(blob_id)
+        if data is None:
+            return None
+
+        line_count = data.count(b'\n') + (1 if len(data) != 0 and not data.endswith(b'\n') else 0)
+        end = min(end, line_count)
+        if start > end:
+            return None
+
+        args = [*GitDiff.BLAME_ARGS, '-L', f'{start},{end}']
+        path = self.work_tree_path(filename)
+        if not from_index:
+            return _start_blame([*args, revision, '--', path], subprocess.DEVNULL)
+
+        # the old version in the index is not in a commit, blame its contents from HEAD.
+        # git reads them from a file so writing them does not wait for git
+        with tempfile.TemporaryFile() as contents:
+            contents.write(data)
+            contents.seek(0)
+            return _start_blame([*args, '--contents', '-', '--', path], contents)
+
+    def expand_context(self, file: GitFile, lines: int) -> bool:
+        """
+        Adds up to lines unchanged lines before and after each hunk of the file,
+        merging hunks that meet
+
+        The lines are read from the old blob of the file,
+        returns False if there is none to read them from.
+        """
+        blob_ids = file.blob_ids
+        if (
+            blob_ids is None or file.deferred or file.hunk_count == 0
+            or len(file.headers) == 0 or file.headers[0].startswith('diff --cc ')
+        ):
+            return False
+
+        old_blob = blob_ids[0]
+        if is_null_blob(old_blob):
+            return False
+        data = self.read_blob(old_blob)
+        if data is None:
+            return False
+
+        blob_lines = data.split(b'\n')
+        if data.endswith(b'\n') or len(data) == 0:
+            blob_lines.pop()
+
+        result = _expand_hunks(_raw_lines(file.content), file.hunks, blob_lines, lines)
+        if result is None:
+            return False
+
+        file.content = LineBuffer.from_raw_lines(result[0], self.decode_errors)
+        file.hunks = result[1]
+        return True
+
+    def close(self) -> None:
+        if self.blob_reader is not None:
+            self.blob_reader.close()
+
+    def _file_args(self, file: GitFile) -> typing.List[str]:
+        """
+        Returns the diff arguments limited to the paths of the file
+        """
+        if '--no-index' in self.args:
+            return self.args
 
-        # process patches
-        result_idx = merge_conflicts
-        for filediff in self._get_file_diffs(output_split[idx].decode('utf-8')):
-            headers, content = filediff
+        options, revisions, _ = self._split_args()
+        args = [*options, *revisions, '--']
+        if file.old_filename is not None:
+            args.append(file.old_filename)
+        args.append(file.filename)
+        return args
 
-            if result_idx == len(results):
-                raise ValueError(
-                    f'too many diff patches were given for all of the changes, only expected {len(results)}'
+    def _split_args(self) -> typing.Tuple[typing.List[str], typing.List[str], typing.List[str]]:
+        """
+        Splits the arguments into options, revisions and paths the way git diff does
+
+        Arguments before -- are revisions until one does not name an object,
+        it and the arguments after it are paths.
+        """
+        options: typing.List[str] = []
+        revisions: typing.List[str] = []
+        paths: typing.List[str] = []
+
+        skip = False
+        for idx, arg in enumerate(self.args):
+            if skip:
+                options.append(arg)
+                skip = False
+            elif arg == '--':
+                paths.extend(self.args[idx + 1:])
+                break
+            elif arg.startswith('-'):
+                options.append(arg)
+                skip = len(arg) == 2 and arg[1] in GitDiff.ARGS_SINGLE_VALUE
+            elif len(paths) == 0 and self._is_revision(arg):
+                revisions.append(arg)
+            else:
+                paths.append(arg)
+        return options, revisions, paths
+
+    def _commit(self, revision: str) -> typing.Optional[str]:
+        return self.rev_parse(f'{revision}^{{commit}}')
+
+    def _resolve(self, key: str, args: typing.List[str]) -> typing.Optional[str]:
+        """
+        Runs the git command naming an object once for the key and returns the object id,
+        or None if the command failed
+        """
+        if key not in self._revisions:
+            with subprocess.Popen(
+                args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+            ) as proc:
+                output, _ = proc.communicate()
+                self._revisions[key] = (
+                    output.strip().decode('ascii') if proc.returncode == 0 else None
                 )
+        return self._revisions[key]
+
+    def _is_revision(self, arg: str) -> bool:
+        for separator in ('...', '..'):
+            if separator in arg:
+                return all(
+                    self.rev_parse(side or 'HEAD') is not None
+                    for side in arg.split(separator, 1)
+                )
+        return self.rev_parse(arg) is not None
+
+    def _process_file_patch(self, file: GitFile, output: bytes) -> None:
+        for entry in self._process_diff(output, defer=False):
+            if entry.filename == file.filename and entry.old_filename == file.old_filename:
+                file.headers = entry.headers
+                file.content = entry.content
+                file.hunks = entry.hunks
+                file.deferred = False
+                return
+
+        raise ValueError(f'git diff did not return the patch of {display_path(file.filename)}')
+
+    def _process_diff(self,
+        output: bytes,
+        previous: typing.Optional[typing.Sequence[GitFile]] = None,
+        defer: bool = True
+    ) -> GitFileTable:
+        """
+        Processes git diff patch output into GitFile entries
 
-            results[result_idx].headers = headers
-            results[result_idx].content = content
-            result_idx += 1
+        The content of binary files is skipped,
+        and so is the content of files over the change budget if defer is set
+        """
+        output_split = output.split(b'\0')
+        results = GitFileTable()
+
+        # check for merge conflict patches, the first numstat entry follows the last patch
+        if output_split[0].startswith(GitDiff.DIFFSTART_PREFIXES):
+            patches, _, output_split[0] = output_split[0].rpartition(b'\n')
+            self._add_combined_patches(results, patches)
+        merge_conflicts = len(results)
+
+        idx = process_numstat(output_split, 0, results)
+
+        # git diff did not return a patch
+        if idx == len(output_split):
+            return results
 
+        skip = bytearray()
+        for result_idx in range(merge_conflicts, len(results)):
+            insertions = results.insertions[result_idx]
+            deletions = results.deletions[result_idx]
+            if insertions == -1 and deletions == -1:
+                skip.append(1)
+            elif (
+                defer and self.max_file_changes is not None
+                and insertions + deletions > self.max_file_changes
+            ):
+                skip.append(1)
+                results.deferred[result_idx] = 1
+            else:
+                skip.append(0)
+
+        result_idx = self._add_patches(results, output_split[idx], merge_conflicts, skip, previous)
         if result_idx != len(results):
             raise ValueError(
-                f'not enough diff patches were given for all of the changes, expected {len(results)}, but got {result_idx}'
+                'not enough diff patches were given for all of the changes, '
+                f'expected {len(results)}, but got {result_idx}'
             )
 
         return results
 
-    def _get_file_diffs(self, data: str) -> typing.Generator[_FileDiff, None, None]:
+    def _add_combined_patches(self, results: GitFileTable, patches: bytes) -> None:
+        for (filename, headers, content, hunks) in self._get_file_diffs(patches):
+            file_idx = results.append(filename)
+            results.headers[file_idx] = headers
+            results.content[file_idx] = content
+            results.set_hunks(file_idx, hunks)
+
+    def _add_patches(self,
+        results: GitFileTable,
+        data: bytes,
+        result_idx: int,
+        skip: bytearray,
+        previous: typing.Optional[typing.Sequence[GitFile]]
+    ) -> int:
         """
-        Iterates and yields each git diff patch entry
+        Adds the patches in data to the numstat entries of results starting at result_idx,
+        and returns the index after the last patch
+
+        Patches of files in previous whose blob ids have not changed reuse their content.
         """
-        lines = data.split('\n')
-        start = 0
-        idx = 0
+        prevmap = _reusable_files(previous) if previous is not None else {}
+        patches = list(self._iter_patches(data))
+        if len(patches) > len(results) - result_idx:
+            raise ValueError(
+                'too many diff patches were given for all of the changes, '
+                f'only expected {len(results)}'
+            )
 
-        while idx < len(lines):
-            if GitDiff.DIFFSTART_REGEX.search(lines[idx]) is not None:
-                if start != idx:
-                    yield self._get_file_diff(lines, start, idx)
-                    start = idx
-            idx += 1
+        for idx, (buffer, start, end) in enumerate(_patch_buffers(
+            data,
+            [ (start, end) for _, _, start, end in patches ],
+            results.deferred[result_idx:result_idx + len(patches)]
+        )):
+            results.headers[result_idx] = patches[idx][1]
+
+            prev = prevmap.get((results.old_filename(result_idx), results.filename(result_idx)))
+            if prev is not None and _is_unchanged(prev, results[result_idx]):
+                _rehome_content(prev.content, buffer, start, end)
+                results.content[result_idx] = prev.content
+                results.set_hunks(result_idx, prev.hunks)
+                results.deferred[result_idx] = 1 if prev.deferred else 0
+            elif not skip[idx]:
+                content, hunks = self._build_patch(buffer, start, end)
+                results.content[result_idx] = content
+                results.set_hunks(result_idx, hunks)
+            result_idx += 1
 
-        if start != idx:
-            yield self._get_file_diff(lines, start, idx)
+        return result_idx
 
-    def _get_file_diff(self, lines: typing.List[str], start: int, end: int) -> _FileDiff:
+    def _get_file_diffs(self, data: bytes) -> typing.Generator[_FileDiff, None, None]:
         """
-        Returns the separated headers and content from the git diff patch entry
+        Iterates and yields each git diff patch entry
         """
-        idx = start
-        while idx < end:
-            if GitDiff.HEADERS_REGEX.search(lines[idx]) is None:
-                break
-            idx += 1
+        for patch_start, headers, start, end in self._iter_patches(data):
+            line_end = data.find(b'\n', patch_start, end)
+            filename = combined_filename(data[patch_start:line_end if line_end != -1 else end])
+            content, hunks = self._build_patch(data, start, end)
+            yield filename, headers, content, hunks
+
+    def _iter_patches(self,
+        data: bytes
+    ) -> typing.Generator[typing.Tuple[int, typing.List[str], int, int], None, None]:
+        """
+        Yields the start offset and headers of each git diff patch entry
+        and the start and end offsets of its content
+
+        The content ends before the newline ending its last line, it is empty if start is past end.
+        """
+        starts = [
+            pos for pos in _find_line_starts(data, b'diff --')
+            if pos != 0 and data.startswith(GitDiff.DIFFSTART_PREFIXES, pos)
+        ]
+        if len(data) != 0:
+            starts.insert(0, 0)
+
+        for idx, start in enumerate(starts):
+            end = starts[idx + 1] - 1 if idx + 1 < len(starts) else len(data)
+
+            headers = []
+            pos = start
+            while pos <= end:
+                line_end = data.find(b'\n', pos, end)
+                if line_end == -1:
+                    line_end = end
+                header = data[pos:line_end].decode('utf-8', self.decode_errors)
+                if GitDiff.HEADERS_REGEX.match(header) is None:
+                    break
+                headers.append(header)
+                pos = line_end + 1
+
+            yield start, headers, pos, end
+
+    def _build_patch(self,
+        data: bytes,
+        start: int,
+        end: int
+    ) -> typing.Tuple[LineBuffer, array]:
+        """
+        Returns the content of a patch entry from its start and end offsets and its hunk index
+
+        The content shares the data buffer and is decoded lazily.
+        """
+        hunks = array('I')
+        if start > end:
+            return LineBuffer(errors=self.decode_errors), hunks
+
+        offsets = line_offsets(data[start:end], start)
+        if len(offsets) == 1:
+            # an empty last line
+            offsets.append(start + 1)
+
+        for pos in _find_line_starts(data, b'@@', start, end):
+            match = GitDiff.HUNK_REGEX.match(data, pos, end)
+            if match is None:
+                continue
+
+            old_start, old_count, new_start, new_count = match.groups()
+            hunks.extend((
+                bisect.bisect_right(offsets, pos) - 1,
+                int(old_start),
+                int(old_count) if old_count is not None else 1,
+                int(new_start),
+                int(new_count) if new_count is not None else 1,
+            ))
 
-        return lines[start:idx], lines[idx:end]
+        content = LineBuffer(data, offsets, self.decode_errors)
+        return content, hunks
 
-    async def get_statuses_async(self, files: typing.List[GitFile]) -> None:
+    async def get_statuses_async(self, files: typing.Sequence[GitFile]) -> None:
         """
         Gets git diff status output and processes it
         """
-        proc = await asyncio.create_subprocess_exec(*[
-            *GitDiff.STATUS_ARGS, *self.args
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        output, stderr = await proc.communicate()
-        if proc.returncode != 0:
-            raise ProcessError(stderr.decode('utf-8'))
-
+        output = await run_async([*GitDiff.STATUS_ARGS, *self.args])
         self._process_statuses(files, output)
 
-    def get_statuses(self, files: typing.List[GitFile]) -> None:
+    def get_statuses(self, files: typing.Sequence[GitFile]) -> None:
         """
         Gets git diff status output and processes it
         """
@@ -281,55 +639,37 @@ class GitDiff:
         ], stdout=subprocess.PIPE, stderr=subprocess.PIPE) as proc:
             output, stderr = proc.communicate()
             if proc.returncode != 0:
-                raise ProcessError(stderr.decode('utf-8'))
+                raise ProcessError(stderr.decode('utf-8', 'replace'))
 
             self._process_statuses(files, output)
 
-    def _process_statuses(self, files: typing.List[GitFile], output: bytes) -> None:
+    def _process_statuses(self, files: typing.Sequence[GitFile], output: bytes) -> None:
         """
         Processes git diff status output
         """
-        output_split = output.split(b'\0')
-        idx = 0
-
-        filemap: typing.Dict[str, GitFile] = {}
-        for file in files:
-            filemap[file.filename] = file
+        filemap: typing.Dict[typing.Tuple[typing.Optional[str], str], GitFile] = {
+            (file.old_filename, file.filename): file for file in files
+        }
 
-        while idx < len(output_split) and len(output_split[idx]) > 0:
+        for key, status in parse_statuses(output).items():
             try:
-                status = output_split[idx].decode('utf-8')
-                idx += 1
-                fname = output_split[idx].decode('utf-8')
-                idx += 1
-
-                old_fname = None
-
-                if fname not in filemap:
-                    old_fname = fname
-                    fname = output_split[idx].decode('utf-8')
-                    idx += 1
-
-                    if fname not in filemap:
-                        raise ValueError(f'filename is not in results: {fname}')
-
-                file = filemap[fname]
-                file.set_status(status)
-
-                if old_fname != file.old_filename:
-                    raise ValueError(
-                        f'expected a src filename of {file.old_filename}, but got {old_fname}'
-                    )
-            except (IndexError, ValueError) as err:
+                file = filemap[key]
+            except KeyError as err:
                 raise ValueError('received incorrect output from git diff') from err
+            file.set_status(status)
 
     def _sanitize_args(self, args: typing.Iterable[str]) -> typing.List[str]:
         result = []
 
+        args = iter(args)
         for arg in args:
             if arg == '--':
                 result.append(arg)
                 break
+            if arg in GitDiff.ARGS_LONG_VALUE:
+                # so the value is not taken for a revision or path
+                value = next(args, None)
+                arg = arg if value is None else f'{arg}={value}'
             if arg[0] == '-':
                 if len(arg) > 1:
                     if arg[1] != '-':
@@ -363,5 +703,268 @@ class GitDiff:
     def removed_args(self) -> typing.List[str]:
         return self._removed_args[:]
 
-class ProcessError(Exception):
-    pass
+def process_numstat(
+    output_split: typing.List[bytes],
+    idx: int,
+    results: GitFileTable
+) -> int:
+    """
+    Adds the numstat entries starting at idx to results
+    and returns the index after the terminating empty entry
+    """
+    while idx < len(output_split):
+        parts = output_split[idx].split(b'\t')
+        idx += 1
+        if len(parts) == 1:
+            break
+
+        insertions, deletions, fname = parts
+        old_fname = None
+
+        try:
+            if len(fname) == 0:
+                old_fname = output_split[idx].decode('utf-8', PATH_ERRORS)
+                idx += 1
+                fname = output_split[idx]
+                idx += 1
+
+                if len(fname) == 0 or len(old_fname) == 0:
+                    raise ValueError('missing filename')
+
+            results.append(
+                fname.decode('utf-8', PATH_ERRORS),
+                old_fname,
+                int(insertions) if insertions != b'-' else None,
+                int(deletions) if deletions != b'-' else None
+            )
+        except (IndexError, ValueError) as err:
+            raise ValueError('received incorrect output from git diff') from err
+
+    return idx
+
+def parse_statuses(
+    output: bytes
+) -> typing.Dict[typing.Tuple[typing.Optional[str], str], str]:
+    """
+    Parses git diff status output into the status of each (old filename, filename) pair
+    """
+    output_split = output.decode('utf-8', PATH_ERRORS).split('\0')
+    idx = 0
+
+    # renames and copies are keyed by both paths, since a copy source can also be a changed file
+    statuses: typing.Dict[typing.Tuple[typing.Optional[str], str], str] = {}
+
+    while idx < len(output_split) and len(output_split[idx]) > 0:
+        try:
+            status = output_split[idx]
+            key: typing.Tuple[typing.Optional[str], str]
+            if status[0] in GitDiff.TWO_PATH_STATUSES:
+                key = (output_split[idx + 1], output_split[idx + 2])
+                idx += 3
+            else:
+                key = (None, output_split[idx + 1])
+                idx += 2
+
+            statuses[key] = status
+        except IndexError as err:
+            raise ValueError('received incorrect output from git diff') from err
+
+    return statuses
+
+def _find_line_starts(
+    data: bytes,
+    prefix: bytes,
+    start: int = 0,
+    end: typing.Optional[int] = None
+) -> typing.Generator[int, None, None]:
+    """
+    Yields the offsets of the lines in data between start and end that start with prefix
+    """
+    if end is None:
+        end = len(data)
+    if data.startswith(prefix, start, end):
+        yield start
+
+    pos = data.find(b'\n' + prefix, start, end)
+    while pos != -1:
+        yield pos + 1
+        pos = data.find(b'\n' + prefix, pos + 1, end)
+
+def combined_filename(line: bytes) -> str:
+    """
+    Returns the path of a combined diff from its diff --cc header line
+    """
+    header = line.decode('utf-8', PATH_ERRORS)
+    match = GitDiff.DIFFSTART_REGEX.match(header)
+    if not match:
+        raise ValueError(f'expected diff header, but got {display_path(header)}')
+    if match.groups()[0] != 'cc':
+        raise ValueError(f'expected combined diff, but got {match.groups()[0]}')
+    return header[match.end():]
+
+def _raw_lines(content: typing.Sequence[str]) -> typing.List[bytes]:
+    if isinstance(content, LineBuffer):
+        data = content.data
+        offsets = content.offsets
+        return [ data[offsets[idx]:offsets[idx + 1] - 1] for idx in range(len(content)) ]
+    return [ line.encode('utf-8', 'surrogateescape') for line in content ]
+
+def _expand_hunks(
+    content: typing.List[bytes],
+    hunks: array,
+    blob: typing.List[bytes],
+    lines: int
+) -> typing.Optional[typing.Tuple[typing.List[bytes], array]]:
+    """
+    Returns the patch content and hunk index
+    with up to lines lines of the old blob added around each hunk,
+    or None if the hunks do not fit in the blob
+    """
+    end = len(content)
+    while end > 0 and len(content[end - 1]) == 0:
+        end -= 1
+
+    # (first old line, last old line, content start, content end, new line offset, header suffix)
+    # of each hunk
+    ranges = []
+    delta = 0
+    for idx in range(0, len(hunks), GitFile.HUNK_SIZE):
+        row, old_start, old_count, _, new_count = hunks[idx:idx + GitFile.HUNK_SIZE]
+        first = old_start if old_count > 0 else old_start + 1
+        last = first + old_count - 1
+        if last > len(blob):
+            return None
+
+        match = GitDiff.HUNK_REGEX.match(content[row])
+        if match is None:
+            return None
+        body_end = hunks[idx + GitFile.HUNK_SIZE] if idx + GitFile.HUNK_SIZE < len(hunks) else end
+        ranges.append((first, last, row + 1, body_end, delta, content[row][match.end():]))
+        delta += new_count - old_count
+
+    result = content[:hunks[0]]
+    result_hunks = array('I')
+
+    group_start = 0
+    while group_start < len(ranges):
+        group_end = group_start + 1
+        while (
+            group_end < len(ranges)
+            and ranges[group_end][0] - lines <= ranges[group_end - 1][1] + lines + 1
+        ):
+            group_end += 1
+
+        first, _, _, _, group_delta, suffix = ranges[group_start]
+        start = max(1, first - lines)
+        if start != first:
+            # the function git found before the old start may be in the added lines,
+            # or not be the nearest one anymore
+            suffix = b''
+        body: typing.List[bytes] = []
+        prev_last = start - 1
+        for first, last, body_start, body_end, _, _ in ranges[group_start:group_end]:
+            body.extend(b' ' + blob[num - 1] for num in range(prev_last + 1, first))
+            body.extend(content[body_start:body_end])
+            prev_last = last
+        context_end = min(len(blob), prev_last + lines)
+        body.extend(b' ' + blob[num - 1] for num in range(prev_last + 1, context_end + 1))
+
+        old_count = sum(1 for line in body if line[:1] in (b' ', b'-'))
+        new_count = sum(1 for line in body if line[:1] in (b' ', b'+'))
+        old_start = start if old_count > 0 else start - 1
+        new_start = start + group_delta if new_count > 0 else start + group_delta - 1
+
+        result_hunks.extend((len(result), old_start, old_count, new_start, new_count))
+        result.append(b'@@ -%s +%s @@%s' % (
+            _hunk_range(old_start, old_count),
+            _hunk_range(new_start, new_count),
+            suffix
+        ))
+        result.extend(body)
+        group_start = group_end
+
+    result.extend(content[end:])
+    return result, result_hunks
+
+def _hunk_range(start: int, count: int) -> bytes:
+    if count == 1:
+        return b'%d' % start
+    return b'%d,%d' % (start, count)
+
+def _reusable_files(
+    files: typing.Sequence[GitFile]
+) -> typing.Dict[typing.Tuple[typing.Optional[str], str], GitFile]:
+    """
+    Returns the files whose patch can be reused by their (old filename, filename) pair
+    """
+    return {
+        (file.old_filename, file.filename): file for file in files if file.blob_ids is not None
+    }
+
+def _rehome_content(content: typing.Sequence[str], data: bytes, start: int, end: int) -> None:
+    """
+    Points reused content at the same lines in the new output, so the previous output can be freed
+    """
+    if not isinstance(content, LineBuffer) or content.data is data or len(content) == 0:
+        return
+    if start > end:
+        return
+
+    offsets = content.offsets
+    if memoryview(content.data)[offsets[0]:offsets[-1] - 1] != memoryview(data)[start:end]:
+        # the content was loaded or expanded on its own and has its own buffer
+        return
+
+    shift = start - offsets[0]
+    content.data = data
+    content.offsets = array('Q', map(shift.__add__, offsets))
+
+def _patch_buffers(
+    data: bytes,
+    ranges: typing.Sequence[typing.Tuple[int, int]],
+    deferred: typing.Sequence[int]
+) -> typing.List[typing.Tuple[bytes, int, int]]:
+    """
+    Returns the buffer holding the content of each patch
+    and the start and end offsets of the content in it
+
+    The patches share data unless some of them are deferred,
+    then each run of patches between deferred ones shares a copy of its slice
+    so the content of the deferred patches is freed with data.
+    """
+    if not any(deferred):
+        return [ (data, start, end) for start, end in ranges ]
+
+    buffers = [ (b'', start, end) for start, end in ranges ]
+    idx = 0
+    while idx < len(ranges):
+        if deferred[idx]:
+            idx += 1
+            continue
+
+        first = idx
+        while idx < len(ranges) and not deferred[idx]:
+            idx += 1
+        base = ranges[first][0]
+        buffer = data[base:ranges[idx - 1][1]]
+        for run_idx in range(first, idx):
+            start, end = ranges[run_idx]
+            buffers[run_idx] = (buffer, start - base, end - base)
+    return buffers
+
+def _is_unchanged(prev: GitFile, file: GitFile) -> bool:
+    """
+    Returns True if the previously parsed file has the same patch as the new file entry
+    """
+    return (
+        prev.insertions == file.insertions
+        and prev.deletions == file.deletions
+        and prev.headers == file.headers
+        and file.blob_ids is not None
+    )
+
+def _start_blame(args: typing.List[str], stdin: typing.Any) -> subprocess.Popen:
+    """
+    Starts git blame, its output is read by the blame range while it runs
+    """
+    return subprocess.Popen(args, stdin=stdin, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
@@ -0,0 +1,358 @@
+from array import array
+import re
+import typing
+import weakref
+
+# paths keep the bytes that are not UTF-8 so they can be given back to git and the filesystem
+PATH_ERRORS = 'surrogateescape'
+
+class GitFile:
+    """
+    A file of the diff, stored as a row of a GitFileTable
+
+    A file created on its own is the only row of a table of its own.
+    """
+
+    ADDED = 'A'
+    COPIED = 'C'
+    DELETED = 'D'
+    MODIFIED = 'M'
+    RENAMED = 'R'
+    TYPE_CHANGED = 'T'
+    UNMERGED = 'U'
+    UNKNOWN = 'X'
+    BROKEN = 'B'
+
+    HUNK_SIZE = 5
+
+    INDEX_REGEX = re.compile(
+        r'^index ([0-9a-f,]+)\.\.([0-9a-f]+)'
+    )
+
+    __slots__ = ('table', 'index', '__weakref__')
+
+    def __init__(self,
+        filename: str,
+        old_filename: typing.Optional[str] = None,
+        insertions: typing.Optional[int] = None,
+        deletions: typing.Optional[int] = None,
+        headers: typing.Optional[typing.List[str]] = None,
+        content: typing.Optional[typing.Sequence[str]] = None,
+        status: typing.Optional[str] = None,
+        hunks: typing.Optional[array] = None
+    ):
+        self.table: GitFileTable = GitFileTable()
+        self.index: int = self.table.append(filename, old_filename, insertions, deletions)
+
+        if headers is not None:
+            self.headers = headers
+        if content is not None:
+            self.content = content
+
+        # (content row, old start, old count, new start, new count) of each hunk
+        if hunks is not None:
+            self.hunks = hunks
+
+        self.set_status(status)
+
+    @staticmethod
+    def table_row(table: 'GitFileTable', index: int) -> 'GitFile':
+        """
+        Returns a file for a row of the table without copying it
+        """
+        file = GitFile.__new__(GitFile)
+        file.table = table
+        file.index = index
+        return file
+
+    @property
+    def filename(self) -> str:
+        return self.table.filename(self.index)
+
+    @property
+    def old_filename(self) -> typing.Optional[str]:
+        return self.table.old_filename(self.index)
+
+    @property
+    def insertions(self) -> typing.Optional[int]:
+        val = self.table.insertions[self.index]
+        return val if val != -1 else None
+
+    @insertions.setter
+    def insertions(self, val: typing.Optional[int]) -> None:
+        self.table.insertions[self.index] = val if val is not None else -1
+
+    @property
+    def deletions(self) -> typing.Optional[int]:
+        val = self.table.deletions[self.index]
+        return val if val != -1 else None
+
+    @deletions.setter
+    def deletions(self, val: typing.Optional[int]) -> None:
+        self.table.deletions[self.index] = val if val is not None else -1
+
+    @property
+    def headers(self) -> typing.List[str]:
+        return self.table.headers[self.index]
+
+    @headers.setter
+    def headers(self, val: typing.List[str]) -> None:
+        self.table.headers[self.index] = val
+
+    @property
+    def content(self) -> typing.Sequence[str]:
+        return self.table.content[self.index]
+
+    @content.setter
+    def content(self, val: typing.Sequence[str]) -> None:
+        self.table.content[self.index] = val
+
+    @property
+    def hunks(self) -> array:
+        start, end = self.table.hunk_range(self.index)
+        return self.table.hunk_data[start:end]
+
+    @hunks.setter
+    def hunks(self, val: array) -> None:
+        self.table.set_hunks(self.index, val)
+
+    @property
+    def status(self) -> str:
+        return chr(self.table.statuses[self.index])
+
+    @status.setter
+    def status(self, val: str) -> None:
+        self.table.statuses[self.index] = ord(val)
+
+    @property
+    def score(self) -> int:
+        return self.table.scores[self.index]
+
+    @score.setter
+    def score(self, val: int) -> None:
+        self.table.scores[self.index] = val
+
+    @property
+    def deferred(self) -> bool:
+        """
+        Whether the patch was not loaded because the file has too many changes
+        """
+        return self.table.deferred[self.index] != 0
+
+    @deferred.setter
+    def deferred(self, val: bool) -> None:
+        self.table.deferred[self.index] = 1 if val else 0
+
+    @property
+    def blob_ids(self) -> typing.Optional[typing.Tuple[str, str]]:
+        """
+        Returns the old and new blob ids from the index header, or None if they are not known
+        """
+        blob_ids = self.index_blob_ids
+        if blob_ids is None or is_null_blob(blob_ids[1]):
+            return None
+        return blob_ids
+
+    @property
+    def index_blob_ids(self) -> typing.Optional[typing.Tuple[str, str]]:
+        """
+        Returns the old and new blob ids from the index header, or None if it has none,
+        the blob id of a version that does not exist is all zeros
+        """
+        for header in self.headers:
+            match = GitFile.INDEX_REGEX.match(header)
+            if match is not None:
+                old_blob, new_blob = match.groups()
+                return old_blob, new_blob
+        return None
+
+    @property
+    def is_binary(self) -> bool:
+        return self.insertions is None and self.deletions is None
+
+    @property
+    def changes(self) -> int:
+        return (self.insertions or 0) + (self.deletions or 0)
+
+    @property
+    def hunk_count(self) -> int:
+        _, start, end = self._hunk_range()
+        return (end - start) // GitFile.HUNK_SIZE
+
+    def hunk(self, idx: int) -> typing.Tuple[int, int, int, int, int]:
+        """
+        Returns the content row, old start, old count, new start and new count of the hunk
+        """
+        hunks, start, _ = self._hunk_range()
+        start += idx * GitFile.HUNK_SIZE
+        row, old_start, old_count, new_start, new_count = hunks[start:start + GitFile.HUNK_SIZE]
+        return row, old_start, old_count, new_start, new_count
+
+    def find_hunk(self, row: int) -> int:
+        """
+        Returns the index of the hunk that contains the content row,
+        or -1 if the row is before the first hunk
+        """
+        hunks, start, end = self._hunk_range()
+        low = 0
+        high = (end - start) // GitFile.HUNK_SIZE
+        while low < high:
+            mid = (low + high) // 2
+            if hunks[start + mid * GitFile.HUNK_SIZE] <= row:
+                low = mid + 1
+            else:
+                high = mid
+        return low - 1
+
+    def _hunk_range(self) -> typing.Tuple[array, int, int]:
+        """
+        Returns the array holding the hunk index of the file and its start and end offsets
+        """
+        start, end = self.table.hunk_range(self.index)
+        return self.table.hunk_data, start, end
+
+    def set_status(self, status) -> None:
+        if status is not None:
+            self.status = status[0]
+            self.score = int(status[1:]) if len(status) > 1 else 0
+        else:
+            self.status = GitFile.UNKNOWN
+            self.score = 0
+
+class GitFileTable(typing.Sequence[GitFile]):
+    """
+    Columnar storage of GitFile entries, row objects are only created when they are accessed
+    """
+
+    def __init__(self):
+        self.names: typing.List[str] = []
+
+        # -1 means no old filename, or no line counts for binary files
+        self.filename_ids: array = array('l')
+        self.old_filename_ids: array = array('l')
+        self.insertions: array = array('q')
+        self.deletions: array = array('q')
+        self.statuses: bytearray = bytearray()
+        self.scores: array = array('B')
+        self.deferred: bytearray = bytearray()
+
+        self.headers: typing.List[typing.List[str]] = []
+        self.content: typing.List[typing.Sequence[str]] = []
+
+        # hunk indexes of all files,
+        # the hunks of file i are hunk_data[hunk_offsets[i]:hunk_offsets[i + 1]]
+        self.hunk_data: array = array('I')
+        self.hunk_offsets: array = array('Q', [0])
+
+        self._rows: 'weakref.WeakValueDictionary[int, GitFile]' = weakref.WeakValueDictionary()
+
+    def append(self,
+        filename: str,
+        old_filename: typing.Optional[str] = None,
+        insertions: typing.Optional[int] = None,
+        deletions: typing.Optional[int] = None
+    ) -> int:
+        """
+        Adds a file entry and returns its index
+        """
+        self.filename_ids.append(self._add_name(filename))
+        self.old_filename_ids.append(
+            self._add_name(old_filename) if old_filename is not None else -1
+        )
+        self.insertions.append(insertions if insertions is not None else -1)
+        self.deletions.append(deletions if deletions is not None else -1)
+        self.statuses.append(ord(GitFile.UNKNOWN))
+        self.scores.append(0)
+        self.deferred.append(0)
+
+        self.headers.append([])
+        self.content.append([])
+
+        return len(self.filename_ids) - 1
+
+    def append_file(self, file: GitFile) -> int:
+        """
+        Adds a copy of the file, including its patch, and returns its index
+        """
+        idx = self.append(file.filename, file.old_filename, file.insertions, file.deletions)
+        self.statuses[idx] = ord(file.status)
+        self.scores[idx] = file.score
+        self.deferred[idx] = 1 if file.deferred else 0
+        self.headers[idx] = file.headers
+        self.content[idx] = file.content
+        if len(file.hunks) != 0:
+            self.set_hunks(idx, file.hunks)
+        return idx
+
+    def filename(self, idx: int) -> str:
+        return self.names[self.filename_ids[idx]]
+
+    def old_filename(self, idx: int) -> typing.Optional[str]:
+        name_id = self.old_filename_ids[idx]
+        return self.names[name_id] if name_id != -1 else None
+
+    def hunk_range(self, idx: int) -> typing.Tuple[int, int]:
+        if idx + 1 >= len(self.hunk_offsets):
+            return 0, 0
+        return self.hunk_offsets[idx], self.hunk_offsets[idx + 1]
+
+    def set_hunks(self, idx: int, hunks: array) -> None:
+        # files without hunks before this one get empty ranges
+        while len(self.hunk_offsets) <= idx:
+            self.hunk_offsets.append(len(self.hunk_data))
+
+        if idx + 1 == len(self.hunk_offsets):
+            self.hunk_data.extend(hunks)
+            self.hunk_offsets.append(len(self.hunk_data))
+            return
+
+        start, end = self.hunk_range(idx)
+        self.hunk_data[start:end] = hunks
+
+        delta = len(hunks) - (end - start)
+        if delta != 0:
+            for offset_idx in range(idx + 1, len(self.hunk_offsets)):
+                self.hunk_offsets[offset_idx] += delta
+
+    def total_insertions(self) -> int:
+        return sum(val for val in self.insertions if val != -1)
+
+    def total_deletions(self) -> int:
+        return sum(val for val in self.deletions if val != -1)
+
+    def _add_name(self, name: str) -> int:
+        self.names.append(name)
+        return len(self.names) - 1
+
+    def __len__(self) -> int:
+        return len(self.filename_ids)
+
+    @typing.overload
+    def __getitem__(self, idx: int) -> GitFile: ...
+
+    @typing.overload
+    def __getitem__(self, idx: slice) -> typing.List[GitFile]: ...
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [ self[i] for i in range(*idx.indices(len(self))) ]
+
+        if idx < 0:
+            idx += len(self)
+        if idx < 0 or idx >= len(self):
+            raise IndexError('file index out of range')
+
+        row = self._rows.get(idx)
+        if row is None:
+            row = GitFile.table_row(self, idx)
+            self._rows[idx] = row
+        return row
+
+def display_path(path: str) -> str:
+    """
+    Returns the path with the bytes that are not UTF-8 replaced so it can be shown
+    """
+    return path.encode('utf-8', PATH_ERRORS).decode('utf-8', 'replace')
+
+def is_null_blob(blob: str) -> bool:
+    return len(blob.strip('0')) == 0
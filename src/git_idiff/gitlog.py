@@ -0,0 +1,293 @@
+import subprocess
+import typing
+
+from .blobreader import BlobReader
+from .diffstream import DiffStreamParser
+from .gitdiff import GitDiff
+from .gitfile import GitFile, GitFileTable
+from .process import ProcessError, kill, pipe
+
+# commits before and after the selected one whose files are kept loaded
+PREFETCH_COMMITS = 2
+
+# tree of a commit without parents, so root commits can be diffed
+EMPTY_TREE = '4b825dc642cb6eb9a060e54bf8d69288fbee4904'
+
+class GitCommit:
+    """
+    A commit read from git log, files is None while its patches are not loaded
+    """
+
+    __slots__ = ('commit_hash', 'parents', 'author', 'timestamp', 'subject', 'files')
+
+    def __init__(self,
+        commit_hash: str,
+        parents: typing.Optional[typing.List[str]] = None,
+        author: str = '',
+        timestamp: int = 0,
+        subject: str = '',
+        files: typing.Optional[GitFileTable] = None
+    ):
+        self.commit_hash: str = commit_hash
+        self.parents: typing.List[str] = parents if parents is not None else []
+        self.author: str = author
+        self.timestamp: int = timestamp
+        self.subject: str = subject
+        self.files: typing.Optional[GitFileTable] = files
+
+
+class CommitSeries:
+    """
+    Commits of a git log range, read from a single git log stream as they are needed
+
+    Only the commits within prefetch of the selected one keep their files, the others
+    only keep their metadata and are read again with git log -1 if they are selected later.
+    """
+
+    def __init__(self,
+        gitdiff: GitDiff,
+        revisions: typing.List[str],
+        prefetch: int = PREFETCH_COMMITS
+    ):
+        self.gitdiff: GitDiff = gitdiff
+        self.revisions: typing.List[str] = revisions
+        self.prefetch: int = prefetch
+
+        self.commits: typing.List[GitCommit] = []
+        self.selected_idx: int = -1
+
+        # every commit of the range has been read, or the stream was closed
+        self.complete: bool = False
+        self._stream: typing.Optional[typing.Generator[GitCommit, None, None]] = None
+
+    def __len__(self) -> int:
+        return len(self.commits)
+
+    def select(self, idx: int) -> typing.Optional[GitCommit]:
+        """
+        Selects the commit at the index, reading the stream up to it,
+        and returns it with its files loaded
+        """
+        while idx >= len(self.commits) and self.fetch_next():
+            pass
+        if idx < 0 or idx >= len(self.commits):
+            return None
+
+        self.selected_idx = idx
+        for commit_idx, commit in enumerate(self.commits):
+            if abs(commit_idx - idx) > self.prefetch:
+                commit.files = None
+
+        commit = self.commits[idx]
+        self._load(commit)
+        return commit
+
+    def update_selected(self, files: GitFileTable) -> None:
+        """
+        Replaces the files of the selected commit after its diff was read again
+        """
+        if 0 <= self.selected_idx < len(self.commits):
+            self.commits[self.selected_idx].files = files
+
+    def needs_prefetch(self) -> bool:
+        """
+        Returns True if a commit near the selected one is not loaded
+        """
+        return self._prefetch_target() is not None
+
+    def prefetch_one(self) -> None:
+        """
+        Loads the nearest commit around the selected one that is not loaded
+        """
+        target = self._prefetch_target()
+        if target is None:
+            return
+        if target < len(self.commits):
+            self._load(self.commits[target])
+        else:
+            self.fetch_next()
+
+    def fetch_next(self) -> bool:
+        """
+        Reads the next commit from the git log stream, returns False if there are no more commits
+        """
+        if self.complete:
+            return False
+        if self._stream is None:
+            self._stream = iter_log(self.gitdiff, self.revisions)
+
+        try:
+            self.commits.append(next(self._stream))
+            return True
+        except StopIteration:
+            self.complete = True
+            self._stream = None
+            return False
+
+    def commit_gitdiff(self, commit: GitCommit) -> GitDiff:
+        """
+        Returns a GitDiff of the changes made by the commit, relative to its first parent
+        """
+        parent = commit.parents[0] if len(commit.parents) != 0 else EMPTY_TREE
+        gitdiff = GitDiff(
+            [parent, commit.commit_hash, *self.gitdiff.args],
+            self.gitdiff.decode_errors,
+            self.gitdiff.max_file_changes
+        )
+
+        # all commits read their blobs through the same git process
+        if self.gitdiff.blob_reader is None:
+            self.gitdiff.blob_reader = BlobReader()
+        gitdiff.blob_reader = self.gitdiff.blob_reader
+        return gitdiff
+
+    def close(self) -> None:
+        """
+        Stops the git log stream
+        """
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+        self.complete = True
+
+    def _load(self, commit: GitCommit) -> None:
+        if commit.files is None:
+            commit.files = get_commit(self.gitdiff, commit.commit_hash).files
+
+    def _prefetch_target(self) -> typing.Optional[int]:
+        if self.selected_idx < 0:
+            return None
+
+        for offset in range(1, self.prefetch + 1):
+            for idx in (self.selected_idx + offset, self.selected_idx - offset):
+                if 0 <= idx < len(self.commits) and self.commits[idx].files is None:
+                    return idx
+
+        if self.selected_idx + self.prefetch >= len(self.commits) and not self.complete:
+            return len(self.commits)
+        return None
+
+def iter_log(
+    gitdiff: GitDiff,
+    revisions: typing.List[str],
+    content: bool = True
+) -> typing.Generator[GitCommit, None, None]:
+    """
+    Runs git log with patches over the revisions and yields each commit with its files
+    as soon as its last patch has been read
+
+    The statuses of the files come from their patch headers. Stopping the iteration stops git.
+    """
+    with subprocess.Popen([
+        *GitDiff.LOG_ARGS, *revisions, *gitdiff.args
+    ], stdout=subprocess.PIPE, stderr=subprocess.PIPE) as proc:
+        try:
+            yield from iter_process_log(gitdiff, pipe(proc.stdout), content)
+
+            stderr = pipe(proc.stderr).read()
+            if proc.wait() != 0:
+                raise ProcessError(stderr.decode('utf-8', 'replace'))
+        finally:
+            # the caller stopped early
+            kill(proc)
+
+def get_commit(gitdiff: GitDiff, commit_hash: str) -> GitCommit:
+    """
+    Reads a single commit with its files
+    """
+    for commit in iter_log(gitdiff, ['-1', commit_hash]):
+        return commit
+    raise ValueError(f'commit not found: {commit_hash}')
+
+def iter_process_log(
+    gitdiff: GitDiff,
+    lines: typing.Iterable[bytes],
+    content: bool = True
+) -> typing.Generator[GitCommit, None, None]:
+    """
+    Processes git log patch output line by line, yielding each commit when its last patch ends
+    """
+    # commit whose patches are being read, with the parser of its patches
+    current: typing.Optional[typing.Tuple[GitCommit, DiffStreamParser]] = None
+
+    for line in lines:
+        if line.startswith(GitDiff.LOG_COMMIT_PREFIX):
+            if current is not None:
+                yield _add_commit_files(current[0], current[1].close())
+
+            # commits without patches share the line of the next commit
+            commits = _parse_commits(gitdiff, line)
+            for empty_commit in commits[:-1]:
+                yield _add_commit_files(empty_commit, [])
+
+            current = (commits[-1], DiffStreamParser(gitdiff, content))
+            continue
+
+        if current is None:
+            raise ValueError(f'expected commit header, but got {line[:32]!r}')
+
+        commit, parser = current
+        file = parser.feed(line)
+        if file is not None:
+            _add_commit_files(commit, [file])
+
+    if current is not None:
+        yield _add_commit_files(current[0], current[1].close())
+
+def _parse_commits(gitdiff: GitDiff, line: bytes) -> typing.List[GitCommit]:
+    fields = line.rstrip(b'\n').decode('utf-8', gitdiff.decode_errors).split('\0')
+    commits = []
+
+    for idx in range(0, len(fields) - 1, GitDiff.LOG_COMMIT_FIELDS):
+        try:
+            _, commit_hash, parents, author, timestamp, subject = (
+                fields[idx:idx + GitDiff.LOG_COMMIT_FIELDS]
+            )
+            commits.append(GitCommit(
+                commit_hash[len('commit '):],
+                parents.split(),
+                author,
+                int(timestamp),
+                subject
+            ))
+        except ValueError as err:
+            raise ValueError('received incorrect output from git log') from err
+
+    return commits
+
+def _add_commit_files(commit: GitCommit, files: typing.List[GitFile]) -> GitCommit:
+    """
+    Adds the parsed files to the commit, with the statuses given by their headers
+    """
+    if commit.files is None:
+        commit.files = GitFileTable()
+
+    for file in files:
+        file.set_status(_header_status(file.headers))
+        commit.files.append_file(file)
+    return commit
+
+def _header_status(headers: typing.List[str]) -> str:
+    """
+    Returns the status of a patch from its headers, with the similarity index of renames and copies
+    """
+    status = GitFile.MODIFIED
+    score = ''
+
+    for header in headers:
+        if header.startswith('new file mode'):
+            status = GitFile.ADDED
+        elif header.startswith('deleted file mode'):
+            status = GitFile.DELETED
+        elif header.startswith('rename from'):
+            status = GitFile.RENAMED
+        elif header.startswith('copy from'):
+            status = GitFile.COPIED
+        else:
+            match = GitDiff.SIMILARITY_REGEX.match(header)
+            if match is not None:
+                score = match.groups()[0].zfill(3)
+
+    if status in GitDiff.TWO_PATH_STATUSES:
+        return status + score
+    return status
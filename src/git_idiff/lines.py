@@ -0,0 +1,133 @@
+from array import array
+import itertools
+import typing
+
+DEFAULT_ERRORS = 'replace'
+
+# size of the slices of a buffer split at a time when finding its line offsets
+OFFSETS_CHUNK_SIZE = 2 ** 24
+
+class LineBuffer(typing.Sequence[str]):
+    """
+    Sequence of lines stored as one UTF-8 bytes buffer and an array of line offsets
+
+    Line i is data[offsets[i]:offsets[i + 1] - 1],
+    the newline at the end of each line is not included.
+    Lines are only decoded when they are accessed, using the errors policy for invalid bytes.
+    The data can be any buffer whose slices are bytes, such as an mmap.
+    """
+    __slots__ = ('data', 'offsets', 'errors')
+
+    def __init__(self,
+        data: bytes = b'',
+        offsets: typing.Optional[array] = None,
+        errors: str = DEFAULT_ERRORS
+    ):
+        self.data: bytes = data
+        self.offsets: array = offsets if offsets is not None else line_offsets(data)
+        self.errors: str = errors
+
+    def longest(self) -> int:
+        """
+        Returns the length in bytes of the longest line without decoding the lines
+        """
+        offsets = self.offsets
+        if len(offsets) < 2:
+            return 0
+        return max(map(int.__sub__, offsets[1:], offsets[:-1])) - 1
+
+    def __len__(self) -> int:
+        return max(len(self.offsets) - 1, 0)
+
+    @typing.overload
+    def __getitem__(self, idx: int) -> str: ...
+
+    @typing.overload
+    def __getitem__(self, idx: slice) -> 'LineBuffer': ...
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            start, stop, step = idx.indices(len(self))
+            if step != 1:
+                lines = [ self[i] for i in range(start, stop, step) ]
+                return LineBuffer.from_lines(lines, self.errors)
+            if stop <= start:
+                return LineBuffer(errors=self.errors)
+            return LineBuffer(self.data, self.offsets[start:stop + 1], self.errors)
+
+        if idx < 0:
+            idx += len(self)
+        if idx < 0 or idx >= len(self):
+            raise IndexError('line index out of range')
+
+        return self.data[self.offsets[idx]:self.offsets[idx + 1] - 1].decode('utf-8', self.errors)
+
+    def __iter__(self) -> typing.Iterator[str]:
+        data = self.data
+        offsets = self.offsets
+        errors = self.errors
+        for idx in range(len(self)):
+            yield data[offsets[idx]:offsets[idx + 1] - 1].decode('utf-8', errors)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, typing.Sequence) or isinstance(other, (str, bytes)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self) -> str:
+        return f'LineBuffer({list(self)!r})'
+
+    @staticmethod
+    def from_lines(lines: typing.Iterable[str], errors: str = DEFAULT_ERRORS) -> 'LineBuffer':
+        return LineBuffer.from_raw_lines(
+            [ line.encode('utf-8', 'surrogateescape') for line in lines ],
+            errors
+        )
+
+    @staticmethod
+    def from_raw_lines(lines: typing.List[bytes], errors: str = DEFAULT_ERRORS) -> 'LineBuffer':
+        return LineBuffer(b'\n'.join(lines), _lengths_to_offsets(map(len, lines)), errors)
+
+def line_offsets(data: bytes, start: int = 0) -> array:
+    """
+    Returns the offsets of the lines in data as split by newlines,
+    followed by the end offset of the last line plus one
+
+    An empty buffer has no lines. The offsets begin at start, for data sliced out of a buffer.
+    """
+    if len(data) == 0:
+        return array('Q', [start])
+    return _lengths_to_offsets(map(len, data.split(b'\n')), start)
+
+def stream_line_offsets(data: typing.Any, chunk_size: int = OFFSETS_CHUNK_SIZE) -> array:
+    """
+    Returns the same offsets as line_offsets,
+    splitting the buffer one chunk at a time so it is never copied whole
+    """
+    if len(data) == 0:
+        return array('Q', [0])
+
+    offsets = array('Q', [0])
+    for pos in range(0, len(data), chunk_size):
+        # every piece but the last ends at a newline,
+        # the first piece may continue a line of the previous chunk
+        pieces = data[pos:pos + chunk_size].split(b'\n')
+        ends = itertools.accumulate(
+            itertools.chain((pos,), map((1).__add__, map(len, pieces[:-1])))
+        )
+        next(ends)
+        offsets.extend(ends)
+
+    offsets.append(len(data) + 1)
+    return offsets
+
+def _lengths_to_offsets(lengths: typing.Iterable[int], start: int = 0) -> array:
+    return array('Q', itertools.accumulate(itertools.chain(
+        (start,),
+        map((1).__add__, lengths)
+    )))
+
+def longest_line(lines: typing.Sequence[str]) -> int:
+    if isinstance(lines, LineBuffer):
+        return lines.longest()
+    return max(( len(line) for line in lines ), default=0)
@@ -0,0 +1,77 @@
+import subprocess
+import typing
+
+from .progress import DiffProgress
+
+# line length limit of the asyncio stream reader used when iterating the diff
+STREAM_LIMIT = 2 ** 30
+
+# size of the reads of git output when progress is tracked
+READ_SIZE = 2 ** 16
+
+T = typing.TypeVar('T')
+
+async def run_async(
+    args: typing.List[str],
+    progress: typing.Optional[DiffProgress] = None
+) -> bytes:
+    """
+    Runs the command and returns its output, the process is killed if the task is cancelled
+    """
+    import asyncio
+
+    proc = await asyncio.create_subprocess_exec(
+        *args, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    try:
+        if progress is None:
+            output, stderr = await proc.communicate()
+        else:
+            output, stderr = await asyncio.gather(
+                _read_progress(pipe(proc.stdout), progress), pipe(proc.stderr).read()
+            )
+            await proc.wait()
+    except asyncio.CancelledError:
+        await kill_async(proc)
+        raise
+
+    if proc.returncode != 0:
+        raise ProcessError(stderr.decode('utf-8', 'replace'))
+    return output
+
+async def _read_progress(stream: typing.Any, progress: DiffProgress) -> bytes:
+    chunks = []
+    while True:
+        chunk = await stream.read(READ_SIZE)
+        if len(chunk) == 0:
+            break
+        chunks.append(chunk)
+        progress.update(chunk)
+    return b''.join(chunks)
+
+async def kill_async(proc: typing.Any) -> None:
+    if proc.returncode is None:
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass
+        await proc.wait()
+
+def kill(proc: subprocess.Popen) -> None:
+    """
+    Kills the process if it is still running,
+    closing its pipe alone only stops it once it writes again
+    """
+    if proc.poll() is None:
+        proc.kill()
+
+def pipe(stream: typing.Optional[T]) -> T:
+    """
+    Returns the pipe of a process, which is only None if it was not requested when starting it
+    """
+    if stream is None:
+        raise ValueError('the process was started without the pipe')
+    return stream
+
+class ProcessError(Exception):
+    pass
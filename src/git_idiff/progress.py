@@ -0,0 +1,80 @@
+import re
+import time
+import typing
+
+class DiffProgress:
+    """
+    Counters of a running git diff, updated from the raw output chunks as they are read
+
+    Patches are counted by their diff line,
+    and the expected file count is known once all numstat entries are read.
+    """
+
+    PATCH_REGEX = re.compile(rb'[\n\0]diff --(?:git|cc) ')
+    PATCH_OVERLAP = len(b'\ndiff --git ') - 1
+
+    def __init__(self):
+        self.start_time: float = time.monotonic()
+        self.bytes_read: int = 0
+        self.files: int = 0
+        self.expected_files: typing.Optional[int] = None
+
+        self._tail: bytes = b'\n'
+        self._numstat_started: bool = False
+        self._numstat_tabs: int = 0
+        self._combined: int = 0
+        self._last_byte: bytes = b''
+
+    @property
+    def rate(self) -> float:
+        """
+        Returns the bytes read per second
+        """
+        elapsed = time.monotonic() - self.start_time
+        return self.bytes_read / elapsed if elapsed > 0 else 0.0
+
+    def update(self, chunk: bytes) -> None:
+        self.bytes_read += len(chunk)
+
+        # matches that are entirely in the tail were already counted
+        data = self._tail + chunk
+        patch_ends = [
+            match.end() - len(self._tail)
+            for match in DiffProgress.PATCH_REGEX.finditer(data) if match.end() > len(self._tail)
+        ]
+        self._tail = data[-DiffProgress.PATCH_OVERLAP:]
+
+        if self.expected_files is None:
+            self._update_numstat(chunk, patch_ends)
+        self.files += len(patch_ends)
+        self._last_byte = chunk[-1:]
+
+    def _update_numstat(self, chunk: bytes, patch_ends: typing.List[int]) -> None:
+        """
+        Counts the numstat entries, which each have two tabs,
+        from the start of the line holding the first NUL
+        to the empty entry ending them
+        """
+        start = 0
+        if not self._numstat_started:
+            nul = chunk.find(b'\0')
+            newline = chunk.rfind(b'\n', 0, nul if nul != -1 else len(chunk))
+            if newline != -1:
+                # merge conflict patches come before the numstat entries
+                self._numstat_tabs = 0
+                self._combined = self.files + sum(1 for end in patch_ends if end <= newline)
+                start = newline + 1
+            if nul == -1:
+                self._numstat_tabs += chunk.count(b'\t', start)
+                return
+            self._numstat_started = True
+
+        end = chunk.find(b'\0\0', start)
+        if end == -1 and self._last_byte == b'\0' and chunk[:1] == b'\0':
+            end = 0
+        if end == -1:
+            self._numstat_tabs += chunk.count(b'\t', start)
+            return
+
+        self._numstat_tabs += chunk.count(b'\t', start, end)
+        self.expected_files = self._combined + self._numstat_tabs // 2
@@ -0,0 +1,45 @@
+import curses
+import time
+import typing
+
+from ..blame import BLAME_PENDING, BlameLine
+from .pad import CursesPad
+
+BLAME_GUTTER_WIDTH = 30
+
+class BlameGutter(CursesPad):
+    def __init__(self, win: curses.window, offset_x: int):
+        lines, _ = win.getmaxyx()
+
+        super().__init__(win,
+            height = lines - 1,
+            width = BLAME_GUTTER_WIDTH,
+            offset_y = 0,
+            offset_x = offset_x
+        )
+
+        self.visible = False
+
+    def update(self, blames: typing.Sequence[typing.Optional[BlameLine]]) -> None:
+        """
+        Draws the commit, date and author blamed for each row of the diff view,
+        leaving the last column blank
+        """
+        self.pad.erase()
+
+        max_y, max_x = self.pad.getmaxyx()
+        width = min(self._width, max_x) - 1
+
+        for row, blame in enumerate(blames[:max_y]):
+            if blame is None:
+                continue
+
+            if blame is BLAME_PENDING:
+                self.pad.addnstr(row, 0, '...', width, curses.A_DIM)
+                continue
+
+            commit_hash, author, timestamp = blame
+            date = time.strftime('%Y-%m-%d', time.localtime(timestamp))
+            self.pad.addnstr(row, 0, f'{commit_hash[:7]} {date} {author}', width)
+
+        self.refresh(0, 0)
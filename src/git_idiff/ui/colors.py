@@ -5,6 +5,10 @@ COLOR_REMOVE = 2
 COLOR_SECTION = 3
 COLOR_HEADER = 4
 COLOR_CHANGE = 5
+COLOR_SYNTAX_KEYWORD = 6
+COLOR_SYNTAX_STRING = 7
+COLOR_SYNTAX_COMMENT = 8
+COLOR_SYNTAX_NUMBER = 9
 
 def init_colors() -> None:
     curses.use_default_colors()
@@ -13,3 +17,7 @@ def init_colors() -> None:
     curses.init_pair(COLOR_SECTION, curses.COLOR_CYAN, -1)
     curses.init_pair(COLOR_HEADER, curses.COLOR_MAGENTA, -1)
     curses.init_pair(COLOR_CHANGE, curses.COLOR_YELLOW, -1)
+    curses.init_pair(COLOR_SYNTAX_KEYWORD, curses.COLOR_BLUE, -1)
+    curses.init_pair(COLOR_SYNTAX_STRING, curses.COLOR_YELLOW, -1)
+    curses.init_pair(COLOR_SYNTAX_COMMENT, curses.COLOR_CYAN, -1)
+    curses.init_pair(COLOR_SYNTAX_NUMBER, curses.COLOR_MAGENTA, -1)
@@ -0,0 +1,112 @@
+import curses
+import typing
+
+from .messagebox import MessageBox
+
+if typing.TYPE_CHECKING:
+    from .pad import CursesPad
+
+class Compositor:
+    """
+    Collects the pads damaged while handling a key
+    and writes them to the terminal with a single update
+    """
+
+    def __init__(self, win: curses.window):
+        self.window: curses.window = win
+        self._pads: typing.List['CursesPad'] = []
+        self._damaged: typing.List['CursesPad'] = []
+
+        # message box pad drawn above the pads, with its top left screen position
+        self._overlay: typing.Optional[curses.window] = None
+        self._overlay_y: int = 0
+        self._overlay_x: int = 0
+
+    @property
+    def damaged(self) -> typing.List['CursesPad']:
+        return self._damaged
+
+    @property
+    def overlay_visible(self) -> bool:
+        return self._overlay is not None
+
+    def add(self, pad: 'CursesPad') -> None:
+        pad.compositor = self
+        self._pads.append(pad)
+
+    def damage(self, pad: 'CursesPad') -> None:
+        """
+        Marks the pad to be copied to the screen on the next update
+        """
+        if pad not in self._damaged:
+            self._damaged.append(pad)
+
+    def clear(self) -> None:
+        """
+        Erases the window behind the pads, the pads are copied over it again on the next update
+        """
+        self.window.erase()
+        self.window.noutrefresh()
+        self._touch_pads()
+
+    def show_overlay(self, message: typing.List[str], **kwargs) -> None:
+        """
+        Draws a message box in its own pad above the other pads until hide_overlay() is called
+        """
+        lines, columns = self.window.getmaxyx()
+        box_lines, box_columns = MessageBox.box_size(
+            message,
+            kwargs.get('hspacing', 0),
+            kwargs.get('vspacing', 0)
+        )
+
+        if box_lines > lines or box_columns > columns:
+            raise ValueError(
+                'message exceeds available window space '
+                f'{box_lines}, {box_columns} > {lines}, {columns}'
+            )
+
+        # the extra line and column let the bottom right corner be drawn without scrolling the pad
+        overlay = curses.newpad(box_lines + 1, box_columns + 1)
+        MessageBox.draw(overlay, message, offset_y=0, offset_x=0, **kwargs)
+
+        self._overlay = overlay
+        self._overlay_y = (lines - box_lines) // 2
+        self._overlay_x = (columns - box_columns) // 2
+
+    def hide_overlay(self) -> None:
+        """
+        Removes the message box and copies the unchanged pad contents below it back to the screen
+        """
+        if self._overlay is None:
+            return
+
+        self._overlay = None
+        self._touch_pads()
+
+    def _touch_pads(self) -> None:
+        """
+        Damages every pad so their unchanged contents are copied again
+        """
+        for pad in self._pads:
+            pad.pad.touchwin()
+            self.damage(pad)
+
+    def update(self) -> None:
+        """
+        Copies the damaged pads to the virtual screen, in the order they were damaged,
+        and updates the terminal once
+        """
+        for pad in self._damaged:
+            pad.noutrefresh()
+        self._damaged.clear()
+
+        if self._overlay is not None:
+            lines, columns = self._overlay.getmaxyx()
+            self._overlay.touchwin()
+            self._overlay.noutrefresh(
+                0, 0,
+                self._overlay_y, self._overlay_x,
+                self._overlay_y + lines - 2, self._overlay_x + columns - 2
+            )
+        curses.doupdate()
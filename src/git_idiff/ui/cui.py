@@ -3,12 +3,22 @@ import curses
 import sys
 import typing
 
-from ..gitdiff import GitDiff, GitFile, ProcessError
+from ..blame import BlameCache, BlameLine, old_line_numbers
+from ..fileview import FileView, open_file_view, version_blob_id
+from ..gitdiff import GitDiff
+from ..gitfile import GitFile, GitFileTable, display_path
+from ..gitlog import CommitSeries
+from ..lines import longest_line
+from ..process import ProcessError
+from ..progress import DiffProgress
 from .colors import init_colors
+from .blamegutter import BLAME_GUTTER_WIDTH, BlameGutter
+from .compositor import Compositor
 from .diff import DiffPad
 from .filelist import FileList
 from . import loader
 from .messagebox import MessageBox
+from .renderstats import RenderStats
 from .statusbar import StatusBar
 
 FILELIST_COLUMN_WIDTH_MIN = 16
@@ -17,21 +27,42 @@ FILELIST_SCROLL_COUNT = 5
 
 WAIT_GET_FILES = 0.15
 
+# milliseconds without resize events before the pads are resized and redrawn
+RESIZE_DELAY = 50
+
+# milliseconds between reads of the output of running blames
+BLAME_POLL_DELAY = 50
+
+COMMIT_SUBJECT_LENGTH = 40
+
+# unchanged lines added before and after each hunk when expanding the context
+EXPAND_CONTEXT_LINES = 10
+
 class CursesUi:
     FILELIST_SCROLL_OFFSET = 1
 
     CURSES_BUTTON5_PRESSED = 0x00200000 # thanks python
 
-    def __init__(self, gitdiff: GitDiff):
+    def __init__(self,
+        gitdiff: GitDiff,
+        render_stats: typing.Optional[RenderStats] = None,
+        commits: typing.Optional[CommitSeries] = None
+    ):
         self.gitdiff = gitdiff
+        self.render_stats = render_stats
+
+        # the commits shown one at a time instead of the diff
+        self.commits = commits
 
         self.stdscr: curses.window = None
 
         self.pad_filelist: FileList = None
         self.pad_diff: DiffPad = None
+        self.pad_blame: BlameGutter = None
         self.pad_statusbar: StatusBar = None
+        self.compositor: Compositor = None
 
-        self.filelist: typing.List[GitFile] = []
+        self.filelist: GitFileTable = GitFileTable()
         self.total_insertions: int = 0
         self.total_deletions: int = 0
 
@@ -39,80 +70,125 @@ class CursesUi:
         self.selected_file_idx: int = -1
         self.filelist_border_selected: bool = False
 
+        # whole version of the selected file shown instead of its patch
+        self.file_view: typing.Optional[FileView] = None
+
+        self.blame_cache: BlameCache = BlameCache()
+
+        # shown in the status bar until another file is selected
+        self.status_message: str = ''
+
         self.help_menu_visible: bool = False
+        self.reflow_pending: bool = False
 
     async def run(self, stdscr: curses.window) -> None:
         self.stdscr = stdscr
-        lines, columns = self.stdscr.getmaxyx()
 
         curses.curs_set(False)
+        # lets curses move unchanged lines with the terminal's scroll region or insert/delete line
+        stdscr.idlok(True)
+        stdscr.scrollok(False)
         curses.mousemask(curses.ALL_MOUSE_EVENTS)
         init_colors()
 
-        removed_args = self.gitdiff.removed_args
-        if len(removed_args) > 0:
-            try:
-                MessageBox.draw(
-                    stdscr,
-                    MessageBox.box_msg(
-                        [
-                            'You supplied unsupported arguments, they will be ignored: ',
-                            ', '.join(removed_args),
-                            '',
-                            'Press any key to continue.'
-                        ],
-                        min(70, columns - 4)
-                    ),
-                    title='Unsupported arguments',
-                    hspacing=1
-                )
-                self.stdscr.getch()
-            except ValueError:
-                pass
-
-        filelist_column_width = columns // 4
-
-        self.pad_filelist = FileList(stdscr, filelist_column_width)
-        self.pad_diff = DiffPad(stdscr, self.gitdiff, filelist_column_width)
-        self.pad_statusbar = StatusBar(stdscr)
+        self._show_removed_args()
+        self._create_pads()
 
         stdscr.erase()
         stdscr.refresh()
 
-        await self.get_diff_async(update=False)
+        if self.commits is not None:
+            if not self._select_commit(0):
+                return
+        else:
+            try:
+                await self.get_diff_async(update=False)
 
-        if len(self.filelist) == 0:
-            return
+                if len(self.filelist) == 0:
+                    return
 
-        await self.get_statuses_async()
-        self.select_file(0)
+                await self.get_statuses_async()
+            except loader.LoadingCancelled:
+                return
+
+            self.select_file(0)
+        self.compositor.update()
+        if self.render_stats is not None:
+            self.render_stats.end_frame()
 
         while True:
+            self._prefetch_commits()
+            self.stdscr.timeout(self._input_timeout())
             key = self.stdscr.getch()
+            if self.render_stats is not None:
+                self.render_stats.start_frame(key)
+
+            if key == -1:
+                # the size settled or blame output arrived before the next key
+                self._reflow()
+                if self.blame_cache.poll():
+                    self._update_blame()
+            else:
+                if self.help_menu_visible:
+                    self.compositor.hide_overlay()
+                    self.help_menu_visible = False
+
+                if self._handle_key_input(key):
+                    break
+                self._update_blame()
+            self.update_statusbar()
+            self.compositor.update()
+            if self.render_stats is not None:
+                self.render_stats.end_frame()
 
-            if self.help_menu_visible:
-                self.update_filelist()
-                self.update_diff()
-                self.help_menu_visible = False
+        self._close_file_view()
+        self.blame_cache.close()
 
-            if self._handle_key_input(key):
-                break
-            self.update_statusbar()
+    def _show_removed_args(self) -> None:
+        removed_args = self.gitdiff.removed_args
+        if len(removed_args) == 0:
+            return
+
+        _, columns = self.stdscr.getmaxyx()
+        try:
+            MessageBox.draw(
+                self.stdscr,
+                MessageBox.box_msg(
+                    [
+                        'You supplied unsupported arguments, they will be ignored: ',
+                        ', '.join(removed_args),
+                        '',
+                        'Press any key to continue.'
+                    ],
+                    min(70, columns - 4)
+                ),
+                title='Unsupported arguments',
+                hspacing=1
+            )
+            self.stdscr.getch()
+        except ValueError:
+            pass
+
+    def _create_pads(self) -> None:
+        """
+        Creates the pads and the compositor that writes them to the screen
+        """
+        _, columns = self.stdscr.getmaxyx()
+        filelist_column_width = columns // 4
+
+        self.pad_filelist = FileList(self.stdscr, filelist_column_width)
+        self.pad_diff = DiffPad(self.stdscr, self.gitdiff, filelist_column_width)
+        self.pad_blame = BlameGutter(self.stdscr, filelist_column_width)
+        self.pad_statusbar = StatusBar(self.stdscr)
+
+        self.compositor = Compositor(self.stdscr)
+        for pad in (self.pad_filelist, self.pad_diff, self.pad_blame, self.pad_statusbar):
+            self.compositor.add(pad)
 
     def _handle_key_input(self, key: int) -> bool:
         if key < 256:
-            keychr = chr(key)
-            if keychr == 'f':
-                self.toggle_filelist()
-            elif keychr in ('n', 'B'): # ctrl + KEY_DOWN
-                self.select_next_file()
-            elif keychr in ('p', 'A'): # ctrl + KEY_UP
-                self.select_prev_file()
-            elif keychr == '?':
-                self.show_help_menu()
-            elif keychr == 'q':
-                return True
-        elif key == curses.KEY_UP:
+            return self._handle_char_input(chr(key))
+        if key == curses.KEY_UP:
             self.pad_diff.scroll(-1, 0)
         elif key == curses.KEY_DOWN:
             self.pad_diff.scroll(1, 0)
@@ -134,15 +210,50 @@ class CursesUi:
             lines, columns = self.stdscr.getmaxyx()
             self.pad_filelist.height = lines - 1
             self.pad_diff.height = lines - 1
+            self.pad_blame.height = lines - 1
             self.pad_statusbar.offset_y = lines - 1
-            self.pad_diff.width = columns - self.pad_filelist.column_width
             self.pad_statusbar.width = columns
+            self._layout_diff()
 
-            self.stdscr.erase()
-            self.stdscr.refresh()
+            self.compositor.clear()
+            self._defer_reflow()
+        return False
 
-            self.update_filelist()
-            self.update_diff()
+    def _handle_char_input(self, keychr: str) -> bool:
+        if keychr == 'f':
+            self.toggle_filelist()
+        elif keychr in ('n', 'B'): # ctrl + KEY_DOWN
+            self.select_next_file()
+        elif keychr in ('p', 'A'): # ctrl + KEY_UP
+            self.select_prev_file()
+        elif keychr == 'r':
+            self._refresh_diff()
+        elif keychr == 'l':
+            self._load_patch()
+        elif keychr == 'e':
+            self._expand_context()
+        elif keychr == 'F':
+            self._toggle_file_view()
+        elif keychr == 'b':
+            self._toggle_blame()
+        elif keychr == 'w':
+            self._toggle_worddiff()
+        elif keychr == 's':
+            self._toggle_syntax()
+        elif keychr == 'v':
+            self._toggle_split()
+        elif keychr == ']':
+            self._select_next_hunk()
+        elif keychr == '[':
+            self._select_prev_hunk()
+        elif keychr == '}':
+            self._select_next_commit()
+        elif keychr == '{':
+            self._select_prev_commit()
+        elif keychr == '?':
+            self.show_help_menu()
+        elif keychr == 'q':
+            return True
         return False
 
     def _handle_mouse_input(self) -> None:
@@ -181,14 +292,16 @@ class CursesUi:
                     self.pad_diff.scroll(FILELIST_SCROLL_COUNT, 0)
 
     async def get_diff_async(self, update: bool = True) -> None:
-        self.filelist = []
-        task = asyncio.create_task(self.gitdiff.get_diff_async())
+        self.filelist = GitFileTable()
+        progress = DiffProgress()
+        task = asyncio.create_task(self.gitdiff.get_diff_async(progress=progress))
 
         self.filelist = await loader.show_loading(
             self.stdscr,
             task,
             'Loading diff',
-            WAIT_GET_FILES
+            WAIT_GET_FILES,
+            progress
         )
         self._get_diff_after(update)
 
@@ -196,18 +309,124 @@ class CursesUi:
         self.filelist = self.gitdiff.get_diff()
         self._get_diff_after(update)
 
+    def _refresh_diff(self) -> None:
+        """
+        Re-runs the diff, reusing the already parsed files that did not change
+        """
+        selected_file = self.selected_file
+        diff_y, diff_x = self.pad_diff.y, self.pad_diff.x
+
+        try:
+            filelist = self.gitdiff.get_diff(self.filelist)
+            self.gitdiff.get_statuses(filelist)
+        except ProcessError as err:
+            # the shown file and its view stay as they were
+            reason = str(err).strip().split('\n', maxsplit=1)[0]
+            self.status_message = f'failed to refresh the diff: {reason}'
+            self.update_statusbar()
+            return
+
+        self._close_file_view()
+        self.filelist = filelist
+        if self.commits is not None:
+            self.commits.update_selected(filelist)
+        self._get_diff_after(update=False)
+
+        idx = 0
+        if selected_file is not None:
+            for i, file in enumerate(self.filelist):
+                if file.filename == selected_file.filename:
+                    idx = i
+                    break
+
+        if len(self.filelist) == 0:
+            self.selected_file = None
+            self.selected_file_idx = -1
+            self.update_filelist()
+            self.update_diff()
+            return
+
+        self.select_file(idx)
+        if selected_file is not None and self.filelist.filename(idx) == selected_file.filename:
+            self.pad_diff.refresh(diff_y, diff_x)
+
+    def _load_patch(self) -> None:
+        """
+        Loads the patch of the selected file if it was deferred for being too large
+        """
+        if self.selected_file is None or not self.selected_file.deferred:
+            return
+
+        try:
+            self.gitdiff.get_file_patch(self.selected_file)
+        except (ProcessError, ValueError) as err:
+            reason = str(err).strip().split('\n', maxsplit=1)[0]
+            self.status_message = f'failed to load the patch: {reason}'
+            self.update_statusbar()
+            return
+
+        self.status_message = ''
+        self.update_diff()
+        self.update_statusbar()
+        self.pad_diff.refresh(0, 0)
+
+    def _expand_context(self) -> None:
+        """
+        Shows more unchanged lines around the hunks of the selected file
+        """
+        if self.selected_file is None or self.file_view is not None:
+            return
+
+        try:
+            if not self.gitdiff.expand_context(self.selected_file, EXPAND_CONTEXT_LINES):
+                return
+        except (ProcessError, ValueError):
+            return
+
+        diff_y, diff_x = self.pad_diff.y, self.pad_diff.x
+        self.update_diff()
+        self.update_statusbar()
+        self.pad_diff.refresh(diff_y, diff_x)
+
+    def _toggle_file_view(self) -> None:
+        """
+        Cycles the diff pane between the patch
+        and the whole new and old versions of the selected file
+        """
+        if self.selected_file is None:
+            return
+
+        if self.file_view is None:
+            versions = [True, False]
+        elif self.file_view.new:
+            versions = [False]
+        else:
+            versions = []
+        self._close_file_view()
+
+        for new in versions:
+            try:
+                self.file_view = open_file_view(self.gitdiff, self.selected_file, new)
+            except (ProcessError, OSError, ValueError):
+                continue
+            if self.file_view is not None:
+                break
+
+        self.update_diff()
+        self.update_statusbar()
+        self.pad_diff.refresh(0, 0)
+
+    def _close_file_view(self) -> None:
+        if self.file_view is not None:
+            self.file_view.close()
+            self.file_view = None
+
     def _get_diff_after(self, update: bool = True) -> None:
         if len(self.filelist) != 0:
             self.selected_file = self.filelist[0]
 
-        self.total_insertions = 0
-        self.total_deletions = 0
-
-        for file in self.filelist:
-            if file.insertions is not None:
-                self.total_insertions += file.insertions
-            if file.deletions is not None:
-                self.total_deletions += file.deletions
+        self.total_insertions = self.filelist.total_insertions()
+        self.total_deletions = self.filelist.total_deletions()
 
         if update:
             self.update_filelist()
@@ -243,6 +462,8 @@ class CursesUi:
         if idx < 0 or idx >= len(self.filelist):
             return
 
+        self._close_file_view()
+        self.status_message = ''
         self.selected_file_idx = idx
         self.selected_file = self.filelist[self.selected_file_idx]
 
@@ -252,21 +473,119 @@ class CursesUi:
 
         self.pad_diff.refresh(0, 0)
 
+    def _select_commit(self, idx: int) -> bool:
+        """
+        Shows the files of the commit at the index of the commit series
+        """
+        if self.commits is None:
+            return False
+
+        commit = self.commits.select(idx)
+        if commit is None or commit.files is None:
+            return False
+
+        self.gitdiff = self.commits.commit_gitdiff(commit)
+        self.pad_diff.gitdiff = self.gitdiff
+        self.filelist = commit.files
+        self.selected_file = None
+        self.selected_file_idx = -1
+        self._get_diff_after(update=False)
+
+        self.pad_filelist.refresh(0, 0)
+        if len(self.filelist) != 0:
+            self.select_file(0)
+        else:
+            self.update_filelist()
+            self.update_diff()
+        return True
+
+    def _select_next_commit(self) -> bool:
+        if self.commits is None:
+            return False
+        return self._select_commit(self.commits.selected_idx + 1)
+
+    def _select_prev_commit(self) -> bool:
+        if self.commits is None or self.commits.selected_idx == 0:
+            return False
+        return self._select_commit(self.commits.selected_idx - 1)
+
+    def _prefetch_commits(self) -> None:
+        """
+        Reads the commits around the selected one until a key is pressed
+        """
+        if self.commits is None:
+            return
+
+        if not self.commits.needs_prefetch():
+            return
+
+        while self.commits.needs_prefetch():
+            self.stdscr.timeout(0)
+            key = self.stdscr.getch()
+            self.stdscr.timeout(self._input_timeout())
+
+            if key != -1:
+                curses.ungetch(key)
+                return
+            self.commits.prefetch_one()
+
+        # the commit count may have changed
+        self.update_statusbar()
+        self.compositor.update()
+
+    def _select_next_hunk(self) -> bool:
+        if self.file_view is not None:
+            idx = self.file_view.find_change(self.pad_diff.content_row) + 1
+            if idx >= self.file_view.change_count:
+                return False
+
+            self.pad_diff.scroll_to_content_row(self.file_view.change_start(idx))
+            return True
+        if self.selected_file is None:
+            return False
+
+        idx = self.selected_file.find_hunk(self.pad_diff.content_row) + 1
+        if idx >= self.selected_file.hunk_count:
+            return False
+
+        self.pad_diff.scroll_to_content_row(self.selected_file.hunk(idx)[0])
+        return True
+
+    def _select_prev_hunk(self) -> bool:
+        row = self.pad_diff.content_row
+        if self.file_view is not None:
+            idx = self.file_view.find_change(row)
+            if idx >= 0 and self.file_view.change_start(idx) == row:
+                idx -= 1
+            if idx < 0:
+                return False
+
+            self.pad_diff.scroll_to_content_row(self.file_view.change_start(idx))
+            return True
+        if self.selected_file is None:
+            return False
+
+        idx = self.selected_file.find_hunk(row)
+        if idx >= 0 and self.selected_file.hunk(idx)[0] == row:
+            idx -= 1
+        if idx < 0:
+            return False
+
+        self.pad_diff.scroll_to_content_row(self.selected_file.hunk(idx)[0])
+        return True
+
     def toggle_filelist(self) -> None:
         if self.pad_filelist.visible:
             self.pad_filelist.visible = False
-            self.pad_diff.offset_x -= self.pad_filelist.column_width
-            self.pad_diff.width += self.pad_filelist.column_width
+            self._layout_diff()
 
-            self.stdscr.erase()
-            self.stdscr.refresh()
+            self.compositor.clear()
 
             self.pad_filelist.pad.erase()
             self.pad_filelist.refresh(0, 0)
         else:
             self.pad_filelist.visible = True
-            self.pad_diff.offset_x += self.pad_filelist.column_width
-            self.pad_diff.width -= self.pad_filelist.column_width
+            self._layout_diff()
 
             self.pad_filelist.scroll(
                 self.selected_file_idx - self.pad_filelist.y - CursesUi.FILELIST_SCROLL_OFFSET - 1,
@@ -276,6 +595,19 @@ class CursesUi:
 
         self.update_diff()
 
+    def _toggle_worddiff(self) -> None:
+        self.pad_diff.worddiff_enabled = not self.pad_diff.worddiff_enabled
+        self.update_diff()
+
+    def _toggle_syntax(self) -> None:
+        self.pad_diff.syntax_enabled = not self.pad_diff.syntax_enabled
+        self.update_diff()
+
+    def _toggle_split(self) -> None:
+        self.pad_diff.split_enabled = not self.pad_diff.split_enabled
+        self.update_diff()
+        self.pad_diff.refresh(0, 0)
+
     def set_filelist_column_width(self, width: int) -> None:
         if width == self.pad_filelist.column_width:
             return
@@ -286,29 +618,118 @@ class CursesUi:
             FILELIST_COLUMN_WIDTH_MIN
         )
 
-        self.pad_diff.width = columns - self.pad_filelist.column_width
-        self.pad_diff.offset_x = self.pad_filelist.column_width
-        self.stdscr.erase()
-        self.stdscr.refresh()
+        self._layout_diff()
+        self.compositor.clear()
+        self.update_filelist()
+        self._defer_reflow()
+
+    def _defer_reflow(self) -> None:
+        """
+        Waits for the size to settle before resizing the pads,
+        until then only their views are redrawn
+        """
+        self.reflow_pending = True
+
+    def _reflow(self) -> None:
+        """
+        Grows the pads to their views once the size settled, keeping their contents
+        """
+        if not self.reflow_pending:
+            return
+        self.reflow_pending = False
+
+        self.pad_filelist.grow_to_view()
+        self.pad_statusbar.grow_to_view()
+        if self.pad_diff.grow_to_view():
+            self.pad_diff.refresh(self.pad_diff.y, self.pad_diff.x)
+        self.pad_blame.grow_to_view()
         self.update_filelist()
+        self._update_blame()
+
+    def _input_timeout(self) -> int:
+        """
+        Returns the milliseconds to wait for a key before handling a pending resize
+        or blame output, -1 to wait forever
+        """
+        if self.reflow_pending:
+            return RESIZE_DELAY
+        if self.pad_blame.visible and self.blame_cache.running:
+            return BLAME_POLL_DELAY
+        return -1
+
+    def _layout_diff(self) -> None:
+        """
+        Places the blame gutter and the diff to the right of the file list
+        """
+        _, columns = self.stdscr.getmaxyx()
+        left = self.pad_filelist.column_width if self.pad_filelist.visible else 0
+        gutter_width = BLAME_GUTTER_WIDTH if self.pad_blame.visible else 0
+
+        self.pad_blame.offset_x = left
+        self.pad_diff.offset_x = left + gutter_width
+        self.pad_diff.width = max(columns - left - gutter_width, 1)
+
+    def _toggle_blame(self) -> None:
+        self.pad_blame.visible = not self.pad_blame.visible
+        self._layout_diff()
+        self.compositor.clear()
         self.update_diff()
+        self._update_blame()
+
+    def _update_blame(self) -> None:
+        if self.pad_blame.visible:
+            self.pad_blame.update(self._visible_blame())
+
+    def _visible_blame(self) -> typing.List[typing.Optional[BlameLine]]:
+        """
+        Returns the blame of the old line on each row of the diff view,
+        only blaming the blocks of lines in view
+        """
+        file = self.selected_file
+        if file is None or (self.file_view is not None and self.file_view.new):
+            return []
+        blob_id = version_blob_id(file, False)
+        if blob_id is None:
+            return []
+
+        rows = self.pad_diff.visible_rows()
+        if self.file_view is not None:
+            line_nums = [ row + 1 for row in rows ]
+        else:
+            line_nums = old_line_numbers(file, rows)
+
+        try:
+            return self.blame_cache.annotate(
+                self.gitdiff, file.old_filename or file.filename, blob_id, line_nums
+            )
+        except (ProcessError, OSError):
+            return []
 
     def update_filelist(self) -> None:
         self.pad_filelist.update(self.filelist, self.selected_file_idx)
 
     def update_diff(self) -> None:
+        if self.file_view is not None:
+            self.pad_diff.show_file(self.file_view, self._file_view_title())
+            return
+
         if self.selected_file is not None:
             headers = self.selected_file.headers
             content = self.selected_file.content
+            filename = self.selected_file.filename
         else:
             headers = []
             content = []
+            filename = None
 
         self.pad_diff.update(
             headers,
             content,
             self.diff_lines(),
-            self.diff_longest_line()
+            self.diff_longest_line(),
+            filename,
+            self.selected_file.hunks if self.selected_file is not None else None,
+            self._diff_placeholder()
         )
 
     def update_statusbar(self) -> None:
@@ -319,42 +740,128 @@ class CursesUi:
             self.selected_file_idx,
             len(self.filelist),
             self.total_insertions,
-            self.total_deletions
+            self.total_deletions,
+            self._current_hunk(),
+            self._hunk_count(),
+            self._commit_label(),
+            self.status_message
         )
 
     def show_help_menu(self) -> None:
         try:
-            MessageBox.draw(self.stdscr, [
+            self.compositor.show_overlay([
                 '  use arrow keys to navigate diff  ',
                 '  n  select next file',
                 '  p  select previous file',
                 '  f  toggle file list',
+                '  r  refresh diff',
+                '  l  load patch of large file',
+                '  e  expand context around hunks',
+                '  F  cycle whole new file, old file and patch',
+                '  b  toggle blame of old lines',
+                '  w  toggle word diff highlighting',
+                '  s  toggle syntax highlighting',
+                '  v  toggle side-by-side view',
+                '  ]  jump to next hunk',
+                '  [  jump to previous hunk',
+                '  }  select next commit',
+                '  {  select previous commit',
                 '',
                 '  q  quit'
             ], title='Help menu')
-            self.stdscr.refresh()
             self.help_menu_visible = True
         except ValueError:
             pass
 
+    def _commit_label(self) -> str:
+        """
+        Returns the position, hash and subject of the selected commit,
+        or an empty string if no commit is shown
+        """
+        if self.commits is None or self.commits.selected_idx < 0:
+            return ''
+
+        commit = self.commits.commits[self.commits.selected_idx]
+        count = str(len(self.commits)) if self.commits.complete else f'{len(self.commits)}+'
+        subject = commit.subject[:COMMIT_SUBJECT_LENGTH]
+        return f'commit {self.commits.selected_idx + 1}/{count} {commit.commit_hash[:7]} {subject}'
+
+    def _current_hunk(self) -> int:
+        if self.file_view is not None:
+            return self.file_view.find_change(self.pad_diff.content_row)
+        if self.selected_file is None:
+            return -1
+        return self.selected_file.find_hunk(self.pad_diff.content_row)
+
+    def _hunk_count(self) -> int:
+        """
+        Returns the number of hunks of the selected file,
+        or of runs of changed lines in its file view
+        """
+        if self.file_view is not None:
+            return self.file_view.change_count
+        if self.selected_file is None:
+            return 0
+        return self.selected_file.hunk_count
+
+    def _file_view_title(self) -> str:
+        file = self.selected_file
+        if self.file_view is None or file is None:
+            return ''
+        if self.file_view.new:
+            return f'new version of {display_path(file.filename)}'
+        return f'old version of {display_path(file.old_filename or file.filename)}'
+
+    def _diff_placeholder(self) -> typing.Optional[str]:
+        """
+        Returns the text shown in place of the patch of the selected file
+        if its content is not loaded
+        """
+        if self.selected_file is None:
+            return None
+        if self.selected_file.deferred:
+            return (
+                f'Large patch with {self.selected_file.changes} changed lines is not shown, '
+                'press l to load it'
+            )
+        if self.selected_file.is_binary and len(self.selected_file.content) == 0:
+            return 'Binary file not shown'
+        return None
+
     def diff_lines(self) -> int:
+        if self.file_view is not None:
+            return 1 + len(self.file_view.lines)
         if self.selected_file is None:
             return 0
-        return len(self.selected_file.headers) + len(self.selected_file.content)
+        lines = len(self.selected_file.headers) + len(self.selected_file.content)
+        if self._diff_placeholder() is not None:
+            lines += 1
+        return lines
 
     def diff_longest_line(self) -> int:
+        if self.file_view is not None:
+            return max(len(self._file_view_title()), self.file_view.longest)
         if self.selected_file is None:
             return 0
         return max(
-            max( len(line) for line in self.selected_file.headers ) if len(self.selected_file.headers) != 0 else 0,
-            max( len(line) for line in self.selected_file.content )  if len(self.selected_file.content) != 0 else 0
-        ) if self.diff_lines() != 0 else 0
+            longest_line(self.selected_file.headers),
+            longest_line(self.selected_file.content)
+        )
 
 def curses_initialize(cui: CursesUi) -> None:
+    if cui.render_stats is not None:
+        cui.render_stats.install()
+
     try:
         curses.wrapper(lambda stdscr: _main(cui, stdscr))
     except ProcessError as err:
         print(err, end='', file=sys.stderr)
+    finally:
+        if cui.render_stats is not None:
+            cui.render_stats.uninstall()
 
 def _main(cui: CursesUi, stdscr: curses.window) -> None:
+    if cui.render_stats is not None:
+        # the wrapper stands in for the window it counts the calls of
+        stdscr = typing.cast(curses.window, cui.render_stats.wrap(stdscr))
     asyncio.run(cui.run(stdscr))
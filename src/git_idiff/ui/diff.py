@@ -1,14 +1,52 @@
+from array import array
+import bisect
 import curses
 import typing
 
+from ..fileview import FileView
 from ..gitdiff import GitDiff
+from ..gitfile import GitFile
 from . import colors
 from .pad import CursesPad
+from . import split
+from .syntax import SyntaxHighlighter
+from . import worddiff
+
+# diffs with longer lines only draw the visible part of each line
+LONG_LINE_LENGTH = 4096
+LINE_CHUNK_SIZE = 1024
+
+# changed word spans of a hunk by their row
+_RowSpans = typing.Dict[int, typing.List[worddiff.RowSpan]]
 
 class DiffPad(CursesPad):
     def __init__(self, win: curses.window, gitdiff: GitDiff, filelist_column_width: int):
         self.gitdiff: GitDiff = gitdiff
 
+        self.worddiff_enabled: bool = True
+        self.syntax_enabled: bool = False
+        self.syntax: SyntaxHighlighter = SyntaxHighlighter()
+
+        self.split_enabled: bool = False
+
+        self._filename: typing.Optional[str] = None
+        self._headers: typing.Sequence[str] = []
+        self._placeholder: typing.Optional[str] = None
+        self._content: typing.Sequence[str] = []
+        self._content_offset: int = 0
+        self._longest_line: int = 0
+        # widest tab expanded line drawn since the content changed
+        self._display_longest: int = 0
+        self._split_rows: typing.Optional[array] = None
+        self._line_chunks: typing.Dict[int, typing.List[str]] = {}
+        self._hunk_starts: typing.Sequence[int] = []
+        self._worddiff_cache: typing.Dict[int, _RowSpans] = {}
+        self._worddiff_drawn: typing.Set[int] = set()
+        self._syntax_drawn: bytearray = bytearray()
+
+        # shown instead of the patch when set
+        self._file_view: typing.Optional[FileView] = None
+
         lines, columns = win.getmaxyx()
 
         super().__init__(win,
@@ -20,12 +58,71 @@ class DiffPad(CursesPad):
 
     def update(self,
         diff_headers: typing.List[str],
-        diff_contents: typing.List[str],
+        diff_contents: typing.Sequence[str],
         diff_lines: int,
-        diff_longest_line: int
+        diff_longest_line: int,
+        filename: typing.Optional[str] = None,
+        hunks: typing.Optional[array] = None,
+        placeholder: typing.Optional[str] = None
     ) -> None:
+        self._file_view = None
+        if diff_contents is not self._content:
+            self._content = diff_contents
+            self._worddiff_cache = {}
+            self._split_rows = None
+            self._line_chunks = {}
+        if len(diff_headers) != self._content_offset:
+            self._line_chunks = {}
+        self._headers = diff_headers
+        self._placeholder = placeholder
+        self._filename = filename
+        self._content_offset = len(diff_headers)
+        self._longest_line = diff_longest_line
+        self._display_longest = 0
+        self._worddiff_drawn = set()
+        self._syntax_drawn = bytearray(len(diff_contents))
+
+        if hunks is not None:
+            self._hunk_starts = hunks[::GitFile.HUNK_SIZE]
+        else:
+            self._hunk_starts = [
+                idx for idx, line in enumerate(diff_contents) if len(line) != 0 and line[0] == '@'
+            ]
+
         self.pad.erase()
 
+        if self._is_split():
+            self._update_split()
+        elif self._is_long():
+            self.pad.resize(self._height + 1, self._width + 1)
+        else:
+            self._update_unified(diff_lines, diff_longest_line)
+
+        self.refresh(self.y, self.x)
+
+    def show_file(self, view: FileView, title: str) -> None:
+        """
+        Shows a whole version of a file under the title instead of the patch,
+        drawing only the visible rows
+        """
+        self._file_view = view
+        self._headers = [title]
+        self._content = view.lines
+        self._content_offset = 1
+        self._longest_line = max(len(title), view.longest)
+        self._display_longest = 0
+        self._placeholder = None
+        self._split_rows = None
+        self._line_chunks = {}
+        self._hunk_starts = []
+        self._worddiff_cache = {}
+        self._worddiff_drawn = set()
+        self._syntax_drawn = bytearray()
+
+        self.pad.erase()
+        self.refresh(self.y, self.x)
+
+    def _update_unified(self, diff_lines: int, diff_longest_line: int) -> None:
         max_y, max_x = self.pad.getmaxyx()
         if diff_lines != max_y or diff_longest_line != max_x:
             self.pad.resize(
@@ -34,7 +131,7 @@ class DiffPad(CursesPad):
             )
 
         idx = 0
-        for line in diff_headers:
+        for line in self._headers:
             if len(line) == 0:
                 idx += 1
                 continue
@@ -42,13 +139,13 @@ class DiffPad(CursesPad):
             self.pad.addstr(idx, 0, line, curses.color_pair(colors.COLOR_HEADER))
             idx += 1
 
-        colormap = {
-            '+': curses.color_pair(colors.COLOR_ADD),
-            '-': curses.color_pair(colors.COLOR_REMOVE),
-            '@': curses.color_pair(colors.COLOR_SECTION)
-        }
+        if self._placeholder is not None:
+            self.pad.addnstr(idx, 0, self._placeholder, self.pad.getmaxyx()[1] - 1, curses.A_DIM)
+            return
+
+        colormap = _colormap()
 
-        for line in diff_contents:
+        for line in self._content:
             if len(line) == 0:
                 idx += 1
                 continue
@@ -56,4 +153,318 @@ class DiffPad(CursesPad):
             self.pad.addstr(idx, 0, line, colormap.get(line[0], curses.A_NORMAL))
             idx += 1
 
-        self.refresh(self.y, self.x)
+    def _update_split(self) -> None:
+        if self._split_rows is None:
+            self._split_rows = split.split_rows(len(self._headers), self._content)
+
+        self.pad.resize(self._height + 1, self._width + 1)
+
+    @property
+    def content_row(self) -> int:
+        """
+        Returns the content row shown at the top of the view,
+        which is negative if the headers are shown
+        """
+        if self._is_split() and self._split_rows is not None:
+            if self._y * 2 >= len(self._split_rows):
+                return -1
+            idx = split.row_line(self._split_rows, self._y)
+        else:
+            idx = self._y
+        return idx - self._content_offset
+
+    def visible_rows(self) -> typing.List[int]:
+        """
+        Returns the content row shown on each row of the view,
+        or of its left side in the side-by-side view, with -1 for rows that are not content
+        """
+        if self._is_split():
+            rows = self._split_rows
+            if rows is None:
+                return []
+            end = min(self._y + self._height, len(rows) // 2)
+            indices = [ rows[row * 2] for row in range(self._y, end) ]
+        else:
+            end = min(self._y + self._height, self._content_offset + len(self._content))
+            indices = list(range(self._y, end))
+
+        offset = self._content_offset
+        return [ idx - offset if idx >= offset else -1 for idx in indices ]
+
+    def scroll_to_content_row(self, row: int) -> None:
+        idx = row + self._content_offset
+        if self._is_split() and self._split_rows is not None:
+            self.refresh(split.line_row(self._split_rows, idx), self._x)
+        else:
+            self.refresh(idx, self._x)
+
+    def refresh(self, y: int, x: int) -> None:
+        if self._is_split():
+            self._refresh_split(y, x)
+            return
+        if self._is_long():
+            self._refresh_long(y, x)
+            return
+
+        if self.syntax_enabled:
+            self._draw_syntax(y)
+        if self.worddiff_enabled:
+            self._draw_worddiff(y)
+        super().refresh(y, x)
+
+    def _refresh_split(self, y: int, x: int) -> None:
+        """
+        Draws only the visible rows of the side-by-side view
+        """
+        rows = self._split_rows
+        if rows is None:
+            return
+
+        row_count = len(rows) // 2
+        half_width = max((self._width - 1) // 2, 1)
+
+        self._y = max(0, min(y, row_count - self._height))
+        self._x = max(0, min(x, self._longest_line - half_width))
+
+        max_y, max_x = self.pad.getmaxyx()
+        if max_y < self._height + 1 or max_x < self._width + 1:
+            self.pad.resize(max(max_y, self._height + 1), max(max_x, self._width + 1))
+        self.pad.erase()
+
+        header_attr = curses.color_pair(colors.COLOR_HEADER)
+        for pad_row in range(min(self._height, row_count - self._y)):
+            left = rows[(self._y + pad_row) * 2]
+            right = rows[(self._y + pad_row) * 2 + 1]
+
+            if left == right and left < self._content_offset:
+                self._draw_line_slice(pad_row, 0, left, self._width, header_attr)
+            elif left == right and self._line_slice(left, 0, 1)[0] == '@':
+                self._draw_line_slice(pad_row, 0, left, self._width)
+            else:
+                self._draw_line_slice(pad_row, 0, left, half_width)
+                self.pad.addch(pad_row, half_width, curses.ACS_VLINE)
+                self._draw_line_slice(pad_row, half_width + 1, right, half_width)
+
+        self._refresh_pad(0, 0)
+
+    def _refresh_long(self, y: int, x: int) -> None:
+        """
+        Draws only the visible slice of the visible rows, marking lines that continue past the view
+
+        The view scrolls right as far as the widest tab expanded line drawn.
+        """
+        line_count = self._content_offset + len(self._content)
+
+        self._y = max(0, min(y, line_count - self._height))
+        for idx in range(self._y, min(self._y + self._height, line_count)):
+            self._display_longest = max(self._display_longest, self._line_slice(idx, 0, 0)[1])
+        self._x = max(0, min(x, self._display_longest - self._width + 1))
+
+        max_y, max_x = self.pad.getmaxyx()
+        if max_y < self._height + 1 or max_x < self._width + 1:
+            self.pad.resize(max(max_y, self._height + 1), max(max_x, self._width + 1))
+        self.pad.erase()
+
+        header_attr = curses.color_pair(colors.COLOR_HEADER)
+        for pad_row in range(min(self._height, line_count - self._y)):
+            idx = self._y + pad_row
+            if idx < self._content_offset:
+                attr = header_attr
+            elif self._file_view is not None:
+                attr = _file_view_attr(self._file_view, idx - self._content_offset)
+            else:
+                attr = None
+            length = self._draw_line_slice(pad_row, 0, idx, self._width, attr)
+
+            if self._x > 0 and length > self._x:
+                self.pad.addch(pad_row, 0, '<', curses.A_REVERSE)
+            if length > self._x + self._width:
+                self.pad.addch(pad_row, self._width - 1, '>', curses.A_REVERSE)
+
+        self._refresh_pad(0, 0)
+
+    def _draw_line_slice(self,
+        pad_row: int,
+        col: int,
+        idx: int,
+        width: int,
+        attr: typing.Optional[int] = None
+    ) -> int:
+        """
+        Draws the part of the line visible at the current x offset
+        and returns the full length of the line
+        """
+        if idx < 0:
+            return 0
+
+        text, length = self._line_slice(idx, self._x, width)
+        if length == 0:
+            return 0
+
+        if attr is None:
+            attr = _colormap().get(self._line_slice(idx, 0, 1)[0], curses.A_NORMAL)
+        if len(text) != 0:
+            self.pad.addnstr(pad_row, col, text, width, attr)
+
+        if not self.worddiff_enabled or idx < self._content_offset:
+            return length
+
+        row = idx - self._content_offset
+        hunk_idx = bisect.bisect_right(self._hunk_starts, row) - 1
+        if hunk_idx < 0:
+            return length
+
+        for _, start, end in self._hunk_worddiff(hunk_idx).get(row, ()):
+            start = max(start - self._x, 0)
+            end = min(end - self._x, width)
+            if start < end:
+                self.pad.chgat(pad_row, col + start, end - start, attr | curses.A_REVERSE)
+
+        return length
+
+    def _line_slice(self, idx: int, start: int, width: int) -> typing.Tuple[str, int]:
+        """
+        Returns the tab expanded slice of the line and the length of the whole line
+
+        Lines longer than a chunk are split into chunks once,
+        so a slice only joins the chunks it covers.
+        """
+        chunks = self._line_chunks.get(idx)
+        if chunks is None:
+            line = self._line(idx).expandtabs()
+            if len(line) <= LINE_CHUNK_SIZE:
+                return line[start:start + width], len(line)
+
+            chunks = [ line[i:i + LINE_CHUNK_SIZE] for i in range(0, len(line), LINE_CHUNK_SIZE) ]
+            self._line_chunks[idx] = chunks
+
+        first = start // LINE_CHUNK_SIZE
+        last = (start + width) // LINE_CHUNK_SIZE
+        offset = start - first * LINE_CHUNK_SIZE
+        text = ''.join(chunks[first:last + 1])[offset:offset + width]
+        return text, (len(chunks) - 1) * LINE_CHUNK_SIZE + len(chunks[-1])
+
+    def _line(self, idx: int) -> str:
+        if idx < self._content_offset:
+            return self._headers[idx]
+        return self._content[idx - self._content_offset]
+
+    def _is_long(self) -> bool:
+        return self._file_view is not None or self._longest_line > LONG_LINE_LENGTH
+
+    def _is_split(self) -> bool:
+        return (
+            self.split_enabled and self._file_view is None
+            and self._placeholder is None and not self._is_combined(0)
+        )
+
+    def _draw_syntax(self, y: int) -> None:
+        """
+        Redraws the visible lines that have not been highlighted yet with their syntax colors
+        """
+        if self._filename is None or self._is_combined(0):
+            return
+
+        colormap = _colormap()
+        start = max(y - self._content_offset, 0)
+        end = min(y - self._content_offset + self._height, len(self._content))
+
+        for row in range(start, end):
+            if self._syntax_drawn[row]:
+                continue
+            self._syntax_drawn[row] = 1
+
+            line = self._content[row]
+            if len(line) == 0 or line[0] not in ' +-':
+                continue
+
+            tokens = self.syntax.tokenize(self._filename, line[1:])
+            if tokens is None:
+                return
+
+            attr = _SYNTAX_LINE_ATTRS.get(line[0], curses.A_NORMAL)
+            prefix_attr = colormap.get(line[0], curses.A_NORMAL)
+            self.pad.addstr(row + self._content_offset, 0, line[0], prefix_attr)
+            for text, color in tokens:
+                self.pad.addstr(text, curses.color_pair(color) | attr)
+
+            if self.worddiff_enabled:
+                self._draw_row_worddiff(row)
+
+    def _draw_row_worddiff(self, row: int) -> None:
+        hunk_idx = bisect.bisect_right(self._hunk_starts, row) - 1
+        if hunk_idx < 0 or hunk_idx not in self._worddiff_drawn:
+            return
+
+        self._draw_spans(self._hunk_worddiff(hunk_idx).get(row, ()))
+
+    def _draw_worddiff(self, y: int) -> None:
+        """
+        Highlights the changed words of the hunks in or near the viewport
+        """
+        if len(self._hunk_starts) == 0:
+            return
+
+        top = y - self._content_offset - self._height
+        bottom = y - self._content_offset + self._height * 2
+
+        hunk_idx = max(bisect.bisect_right(self._hunk_starts, top) - 1, 0)
+        while hunk_idx < len(self._hunk_starts) and self._hunk_starts[hunk_idx] <= bottom:
+            if hunk_idx not in self._worddiff_drawn:
+                self._worddiff_drawn.add(hunk_idx)
+                for spans in self._hunk_worddiff(hunk_idx).values():
+                    self._draw_spans(spans)
+            hunk_idx += 1
+
+    def _draw_spans(self, spans: typing.Iterable[worddiff.RowSpan]) -> None:
+        colormap = _colormap()
+        for row, start, end in spans:
+            self.pad.chgat(
+                row + self._content_offset,
+                start,
+                end - start,
+                colormap.get(self._content[row][0], curses.A_NORMAL) | curses.A_REVERSE
+            )
+
+    def _hunk_worddiff(self, hunk_idx: int) -> _RowSpans:
+        """
+        Returns the changed word spans of the hunk by their row
+        """
+        cached = self._worddiff_cache.get(hunk_idx)
+        if cached is not None:
+            return cached
+
+        start = self._hunk_starts[hunk_idx]
+        if hunk_idx + 1 < len(self._hunk_starts):
+            end = self._hunk_starts[hunk_idx + 1]
+        else:
+            end = len(self._content)
+
+        rows: _RowSpans = {}
+        if not self._is_combined(start):
+            for span in worddiff.hunk_spans(self._content, start + 1, end):
+                rows.setdefault(span[0], []).append(span)
+
+        self._worddiff_cache[hunk_idx] = rows
+        return rows
+
+    def _is_combined(self, row: int) -> bool:
+        # combined diffs have more than one prefix column
+        return row < len(self._content) and self._content[row].startswith('@@@')
+
+_SYNTAX_LINE_ATTRS = {
+    '+': curses.A_BOLD,
+    '-': curses.A_DIM,
+}
+
+def _colormap() -> typing.Dict[str, int]:
+    return {
+        '+': curses.color_pair(colors.COLOR_ADD),
+        '-': curses.color_pair(colors.COLOR_REMOVE),
+        '@': curses.color_pair(colors.COLOR_SECTION)
+    }
+
+def _file_view_attr(file_view: FileView, row: int) -> int:
+    if not file_view.is_changed(row):
+        return curses.A_NORMAL
+    return curses.color_pair(colors.COLOR_ADD if file_view.new else colors.COLOR_REMOVE)
@@ -1,7 +1,7 @@
 import curses
 import typing
 
-from ..gitdiff import GitFile
+from ..gitfile import GitFile, display_path
 from . import colors
 from .pad import CursesPad
 from .utils import StrAttrFormat, addnstrattrfmt
@@ -73,7 +73,7 @@ def _gitfile_to_entry(file: GitFile, max_x: int) -> typing.Tuple[str, str, str,
     status = file.status
     added_str = str(file.insertions) if file.insertions is not None else '-'
     removed_str = str(file.deletions) if file.deletions is not None else '-'
-    fname = file.filename
+    fname = display_path(file.filename)
 
     total_length = len(f'{status} {added_str} {removed_str} {fname}')
     if total_length > max_x:
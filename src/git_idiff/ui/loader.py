@@ -2,14 +2,28 @@ import asyncio
 import curses
 import typing
 
+from ..progress import DiffProgress
 from .messagebox import MessageBox
 
+# keys that do not cancel loading
+IGNORED_KEYS = (-1, curses.KEY_RESIZE, curses.KEY_MOUSE)
+
+class LoadingCancelled(Exception):
+    pass
+
 async def show_loading(
     win: curses.window,
     task: asyncio.Task,
     message: str,
-    wait_interval: float
+    wait_interval: float,
+    progress: typing.Optional[DiffProgress] = None
 ) -> typing.Any:
+    """
+    Shows a spinner until the task is done and returns its result,
+    the bytes and files read so far are shown under it if progress is given
+
+    Pressing a key cancels the task and raises LoadingCancelled.
+    """
     loadchars = r'/-\|'
     counter = 0
 
@@ -23,15 +37,46 @@ async def show_loading(
         except asyncio.TimeoutError:
             pass
 
-        win.erase()
-        MessageBox.draw(win, [
+        if _key_pressed(win):
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            raise LoadingCancelled()
+
+        lines = [
             '',
             f'   {message}... {loadchars[counter]}   ',
             ''
-        ])
+        ]
+        if progress is not None:
+            lines.insert(2, f'   {format_progress(progress)}   ')
+
+        win.erase()
+        MessageBox.draw(win, lines)
         counter += 1
         if counter == len(loadchars):
             counter = 0
         win.refresh()
 
     return result
+
+def format_progress(progress: DiffProgress) -> str:
+    files = str(progress.files)
+    if progress.expected_files is not None:
+        files += f'/{progress.expected_files}'
+
+    return f'{progress.bytes_read / 1e6:.1f} MB, {files} files, {progress.rate / 1e6:.1f} MB/s'
+
+def _key_pressed(win: curses.window) -> bool:
+    win.nodelay(True)
+    try:
+        while True:
+            key = win.getch()
+            if key == -1:
+                return False
+            if key not in IGNORED_KEYS:
+                return True
+    finally:
+        win.nodelay(False)
@@ -21,10 +21,7 @@ class MessageBox:
         br: int = kwargs.get('tl', curses.ACS_LRCORNER)
 
         lines, columns = win.getmaxyx()
-        data_lines = len(message)
-        data_columns = max( len(line) for line in message )
-        box_lines = data_lines + vspacing * 2 + 2
-        box_columns = data_columns + hspacing * 2 + 2
+        box_lines, box_columns = MessageBox.box_size(message, hspacing, vspacing)
 
         if box_lines > lines or box_columns > columns:
             raise ValueError(
@@ -72,6 +69,22 @@ class MessageBox:
         for line in message:
             _addnstr(win, cur.add(1, 0), line + ' ' * (width - len(line)), width)
 
+    @staticmethod
+    def box_size(
+        message: typing.List[str],
+        hspacing: int = 0,
+        vspacing: int = 0
+    ) -> typing.Tuple[int, int]:
+        """
+        Returns the lines and columns of the box drawn around the message, including its border
+        """
+        data_lines = len(message)
+        data_columns = max( len(line) for line in message )
+        return (
+            data_lines + max(vspacing, 0) * 2 + 2,
+            data_columns + max(hspacing, 0) * 2 + 2
+        )
+
     @staticmethod
     def box_msg(message: typing.List[str], width: int) -> typing.List[str]:
         result = []
@@ -1,5 +1,8 @@
 from abc import ABC
 import curses
+import typing
+
+from .compositor import Compositor
 
 class CursesPad(ABC):
     def __init__(self, win: curses.window, **kwargs):
@@ -15,6 +18,11 @@ class CursesPad(ABC):
         self._y: int = 0
         self._x: int = 0
 
+        # when set, refreshes are deferred until the compositor updates the screen
+        self.compositor: typing.Optional[Compositor] = None
+        self._pad_y: int = 0
+        self._pad_x: int = 0
+
     @property
     def height(self) -> int:
         return self._height
@@ -87,20 +95,52 @@ class CursesPad(ABC):
         self.refresh(self._y + offy, self._x + offx)
 
     def refresh(self, y: int, x: int) -> None:
-        wmax_y, wmax_x = self.window.getmaxyx()
         pmax_y, pmax_x = self.pad.getmaxyx()
 
         self._y = _clamp(y, 0, pmax_y - self._height - 1)
         self._x = _clamp(x, 0, pmax_x - self._width - 1)
 
+        self._refresh_pad(self._y, self._x)
+
+    def _refresh_pad(self, pad_y: int, pad_x: int) -> None:
+        """
+        Copies the pad contents starting at (pad_y, pad_x) to the window
+        """
+        self._pad_y = pad_y
+        self._pad_x = pad_x
+
+        if self.compositor is not None:
+            self.compositor.damage(self)
+            return
+
+        self.noutrefresh()
+        curses.doupdate()
+
+    def noutrefresh(self) -> None:
+        """
+        Copies the pad contents to the virtual screen without updating the terminal
+        """
+        wmax_y, wmax_x = self.window.getmaxyx()
+
         if self._visible:
-            self.pad.refresh(
-                self._y, self._x,
+            self.pad.noutrefresh(
+                self._pad_y, self._pad_x,
                 min(self._offset_y, wmax_y - 1), min(self._offset_x, wmax_x - 1),
                 min(self._height + self._offset_y, wmax_y) - 1,
                 min(self._width + self._offset_x, wmax_x) - 1
             )
 
+    def grow_to_view(self) -> bool:
+        """
+        Grows the pad to cover its view, keeping its contents, and returns whether it was resized
+        """
+        max_y, max_x = self.pad.getmaxyx()
+        if max_y >= self._height and max_x >= self._width:
+            return False
+
+        self.pad.resize(max(max_y, self._height), max(max_x, self._width))
+        return True
+
     def resize(self, max_y: int, max_x: int) -> None:
         if max_y < 1 or max_x < 1:
             raise ValueError()
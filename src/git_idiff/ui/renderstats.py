@@ -0,0 +1,199 @@
+import curses
+import time
+import typing
+
+# linux only, counts the bytes the ui thread passes to write(),
+# /proc/self/io would also include the output of the git processes once they are reaped.
+# it is only read around the curses calls that write to the terminal,
+# so the requests the ui thread writes to git are not counted
+PROC_IO_PATH = '/proc/thread-self/io'
+
+COUNTED_CALLS = ['addstr', 'addnstr', 'addch', 'refresh', 'noutrefresh', 'doupdate']
+
+class FrameStats:
+    """
+    Render cost of handling a single key
+    """
+
+    __slots__ = ('key', 'calls', 'chars', 'bytes_written', 'elapsed')
+
+    def __init__(self, key: str):
+        self.key: str = key
+        self.calls: typing.Dict[str, int] = dict.fromkeys(COUNTED_CALLS, 0)
+        self.chars: int = 0
+        self.bytes_written: typing.Optional[int] = None
+        self.elapsed: float = 0.0
+
+    @property
+    def refreshes(self) -> int:
+        return self.calls['refresh'] + self.calls['noutrefresh']
+
+class RenderStats:
+    """
+    Counts the curses calls made while rendering each key, and the bytes written to the terminal
+    """
+
+    def __init__(self):
+        self.frames: typing.List[FrameStats] = []
+
+        self._measured: bool = _get_bytes_written() is not None
+        self._frame: FrameStats = self._new_frame('startup')
+        self._start_time: float = time.perf_counter()
+        self._patched: typing.Dict[str, typing.Callable] = {}
+
+    def install(self) -> None:
+        """
+        Patches curses so new pads and screen updates are counted
+        """
+        newpad = curses.newpad
+        doupdate = curses.doupdate
+
+        def counted_newpad(*args) -> 'InstrumentedWindow':
+            return self.wrap(newpad(*args))
+
+        def counted_doupdate() -> None:
+            self.count('doupdate')
+            self.measure(doupdate)
+
+        self._patched = {
+            'newpad': newpad,
+            'doupdate': doupdate,
+        }
+        setattr(curses, 'newpad', counted_newpad)
+        setattr(curses, 'doupdate', counted_doupdate)
+
+    def uninstall(self) -> None:
+        for name, func in self._patched.items():
+            setattr(curses, name, func)
+        self._patched = {}
+
+    def wrap(self, win: curses.window) -> 'InstrumentedWindow':
+        return InstrumentedWindow(win, self)
+
+    def count(self, call: str, chars: int = 0) -> None:
+        self._frame.calls[call] += 1
+        self._frame.chars += chars
+
+    def measure(self, func: typing.Callable, *args) -> typing.Any:
+        """
+        Calls a curses function that may write to the terminal and counts the bytes it wrote
+        """
+        before = _get_bytes_written()
+        result = func(*args)
+        after = _get_bytes_written()
+
+        if before is not None and after is not None and self._frame.bytes_written is not None:
+            self._frame.bytes_written += after - before
+        return result
+
+    def start_frame(self, key: int) -> None:
+        """
+        Starts counting the render cost of a key
+        """
+        try:
+            name = curses.keyname(key).decode('utf-8', 'replace')
+        except (ValueError, curses.error):
+            name = str(key)
+
+        self._frame = self._new_frame(name)
+        self._start_time = time.perf_counter()
+
+    def end_frame(self) -> None:
+        """
+        Stops counting the current key, output written while waiting for the next key
+        is still counted for it
+        """
+        self._frame.elapsed = time.perf_counter() - self._start_time
+        self.frames.append(self._frame)
+
+    def report(self, out: typing.TextIO) -> None:
+        """
+        Writes the render cost of each key followed by the totals
+        """
+        columns = ['key', *COUNTED_CALLS, 'chars', 'bytes', 'ms']
+        out.write('\t'.join(columns) + '\n')
+
+        total = FrameStats('total')
+        total.bytes_written = 0
+
+        for frame in self.frames:
+            out.write(_format_frame(frame))
+            for call, val in frame.calls.items():
+                total.calls[call] += val
+            total.chars += frame.chars
+            total.elapsed += frame.elapsed
+            if frame.bytes_written is None:
+                total.bytes_written = None
+            elif total.bytes_written is not None:
+                total.bytes_written += frame.bytes_written
+
+        out.write(_format_frame(total))
+
+    def _new_frame(self, key: str) -> FrameStats:
+        frame = FrameStats(key)
+        if self._measured:
+            frame.bytes_written = 0
+        return frame
+
+class InstrumentedWindow:
+    """
+    Wraps a curses window and counts the drawing and refresh calls made on it
+    """
+
+    def __init__(self, win: curses.window, stats: RenderStats):
+        self.window: curses.window = win
+        self.stats: RenderStats = stats
+
+    def __getattr__(self, name: str) -> typing.Any:
+        return getattr(self.window, name)
+
+    def addstr(self, *args) -> None:
+        self.stats.count('addstr', len(_find_str(args)))
+        self.window.addstr(*args)
+
+    def addnstr(self, *args) -> None:
+        val = _find_str(args)
+        count = args[args.index(val) + 1]
+        self.stats.count('addnstr', min(len(val), count))
+        self.window.addnstr(*args)
+
+    def addch(self, *args) -> None:
+        self.stats.count('addch', 1)
+        self.window.addch(*args)
+
+    def refresh(self, *args) -> None:
+        self.stats.count('refresh')
+        self.stats.measure(self.window.refresh, *args)
+
+    def noutrefresh(self, *args) -> None:
+        self.stats.count('noutrefresh')
+        self.window.noutrefresh(*args)
+
+    def getch(self, *args) -> int:
+        # refreshes the window first if it changed
+        return self.stats.measure(self.window.getch, *args)
+
+def _find_str(args: tuple) -> typing.Union[str, bytes]:
+    for arg in args:
+        if isinstance(arg, (str, bytes)):
+            return arg
+    raise TypeError('expected a string argument')
+
+def _format_frame(frame: FrameStats) -> str:
+    return '\t'.join([
+        frame.key,
+        *(str(frame.calls[call]) for call in COUNTED_CALLS),
+        str(frame.chars),
+        str(frame.bytes_written) if frame.bytes_written is not None else '-',
+        f'{frame.elapsed * 1000:.2f}',
+    ]) + '\n'
+
+def _get_bytes_written() -> typing.Optional[int]:
+    try:
+        with open(PROC_IO_PATH, 'r', encoding='ascii') as file:
+            for line in file:
+                if line.startswith('wchar:'):
+                    return int(line[len('wchar:'):])
+    except OSError:
+        pass
+    return None
@@ -0,0 +1,75 @@
+from array import array
+import typing
+
+def split_rows(headers_len: int, content: typing.Sequence[str]) -> array:
+    """
+    Aligns the diff lines for the side-by-side view
+
+    Returns a flat array of (left, right) line indices for each row,
+    where headers are indexed before the content and -1 marks an empty side.
+    Headers and context lines are given on both sides.
+    """
+    rows = array('i')
+    removed: typing.List[int] = []
+    added: typing.List[int] = []
+
+    def flush() -> None:
+        for offset in range(max(len(removed), len(added))):
+            rows.append(removed[offset] if offset < len(removed) else -1)
+            rows.append(added[offset] if offset < len(added) else -1)
+        removed.clear()
+        added.clear()
+
+    for idx in range(headers_len):
+        rows.extend((idx, idx))
+
+    last_prefix = ' '
+    for idx, line in enumerate(content, headers_len):
+        if len(line) == 0:
+            continue
+        prefix = line[0]
+
+        if prefix == '-':
+            if len(added) != 0:
+                flush()
+            removed.append(idx)
+        elif prefix == '+':
+            added.append(idx)
+        elif prefix == '\\':
+            # "no newline at end of file" markers belong to the line before them
+            if last_prefix == '-':
+                removed.append(idx)
+            elif last_prefix == '+':
+                added.append(idx)
+            else:
+                flush()
+                rows.extend((idx, idx))
+            continue
+        else:
+            flush()
+            rows.extend((idx, idx))
+        last_prefix = prefix
+
+    flush()
+    return rows
+
+def row_line(rows: array, row: int) -> int:
+    """
+    Returns the line index shown in the row, preferring the left side
+    """
+    left = rows[row * 2]
+    return left if left >= 0 else rows[row * 2 + 1]
+
+def line_row(rows: array, idx: int) -> int:
+    """
+    Returns the first row that shows the line index or a later line
+    """
+    low = 0
+    high = len(rows) // 2
+    while low < high:
+        mid = (low + high) // 2
+        if row_line(rows, mid) < idx:
+            low = mid + 1
+        else:
+            high = mid
+    return low
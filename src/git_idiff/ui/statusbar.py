@@ -23,7 +23,11 @@ class StatusBar(CursesPad):
         selected_file_idx: int,
         filelist_len: int,
         total_insertions: int,
-        total_deletions: int
+        total_deletions: int,
+        hunk_idx: int = -1,
+        hunk_count: int = 0,
+        commit_label: str = '',
+        message: str = ''
     ) -> None:
         self.pad.erase()
 
@@ -33,7 +37,8 @@ class StatusBar(CursesPad):
         diff_colnum = min(diff_longest_line, pad_diff.width + pad_diff.x)
 
         leftstr = StrAttrFormat(
-            f' {selected_file_idx + 1} / {filelist_len} files  {{insertions}}  {{deletions}}',
+            f' {commit_label + "  " if len(commit_label) != 0 else ""}'
+            f'{selected_file_idx + 1} / {filelist_len} files  {{insertions}}  {{deletions}}',
             {
                 'insertions': (
                     f'+{total_insertions}',
@@ -46,7 +51,10 @@ class StatusBar(CursesPad):
             },
             curses.A_REVERSE
         )
-        centerstr = ' '
+        if len(message) != 0:
+            centerstr = f' {message} '
+        else:
+            centerstr = f' hunk {hunk_idx + 1}/{hunk_count} ' if hunk_count != 0 else ' '
         rightstr = f'({diff_linenum}, {diff_colnum}) / ({diff_lines}, {diff_longest_line}) '
 
         width = min(self._width, max_x)
@@ -0,0 +1,94 @@
+from collections import OrderedDict
+import importlib.util
+import os
+import typing
+
+from . import colors
+
+CACHE_SIZE = 4096
+
+Token = typing.Tuple[str, int]
+
+class SyntaxHighlighter:
+    """
+    Tokenizes diff lines by the file extension,
+    pygments is only imported when the first line is tokenized
+    """
+
+    def __init__(self, cache_size: int = CACHE_SIZE):
+        self.cache_size: int = cache_size
+
+        self._cache: 'OrderedDict[typing.Tuple[str, str], typing.List[Token]]' = OrderedDict()
+        self._lexers: typing.Dict[str, typing.Any] = {}
+        self._token_colors: typing.Optional[typing.List[typing.Tuple[typing.Any, int]]] = None
+        self._available: typing.Optional[bool] = None
+
+    @property
+    def available(self) -> bool:
+        if self._available is None:
+            self._available = importlib.util.find_spec('pygments') is not None
+        return self._available
+
+    def tokenize(self, filename: str, line: str) -> typing.Optional[typing.List[Token]]:
+        """
+        Returns the (text, color) tokens of the line without its diff prefix,
+        or None if the file type is unknown
+        """
+        key = (filename, line)
+        tokens = self._cache.get(key)
+        if tokens is not None:
+            self._cache.move_to_end(key)
+            return tokens
+
+        lexer = self._get_lexer(filename)
+        if lexer is None:
+            return None
+
+        tokens = []
+        for token_type, text in lexer.get_tokens(line):
+            color = self._token_color(token_type)
+            if len(tokens) != 0 and tokens[-1][1] == color:
+                tokens[-1] = (tokens[-1][0] + text, color)
+            else:
+                tokens.append((text, color))
+
+        self._cache[key] = tokens
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return tokens
+
+    def _get_lexer(self, filename: str) -> typing.Any:
+        _, ext = os.path.splitext(filename)
+        key = ext if len(ext) != 0 else os.path.basename(filename)
+        if key in self._lexers:
+            return self._lexers[key]
+
+        lexer = None
+        if self.available:
+            from pygments.lexers import get_lexer_for_filename # type: ignore
+            from pygments.util import ClassNotFound # type: ignore
+
+            try:
+                lexer = get_lexer_for_filename(filename, stripnl=False, ensurenl=False)
+            except ClassNotFound:
+                pass
+
+        self._lexers[key] = lexer
+        return lexer
+
+    def _token_color(self, token_type: typing.Any) -> int:
+        if self._token_colors is None:
+            from pygments import token # type: ignore
+
+            self._token_colors = [
+                (token.Comment, colors.COLOR_SYNTAX_COMMENT),
+                (token.Keyword, colors.COLOR_SYNTAX_KEYWORD),
+                (token.Name.Builtin, colors.COLOR_SYNTAX_KEYWORD),
+                (token.String, colors.COLOR_SYNTAX_STRING),
+                (token.Number, colors.COLOR_SYNTAX_NUMBER),
+            ]
+
+        for parent, color in self._token_colors:
+            if token_type in parent:
+                return color
+        return 0
@@ -0,0 +1,94 @@
+import difflib
+import re
+import typing
+
+WORD_REGEX = re.compile(r'\w+|\s+|[^\w\s]')
+MAX_LINE_LENGTH = 1024
+
+Span = typing.Tuple[int, int]
+RowSpan = typing.Tuple[int, int, int]
+
+def hunk_spans(lines: typing.Sequence[str], start: int, end: int) -> typing.List[RowSpan]:
+    """
+    Returns the changed word spans (row, start, end)
+    of the paired removed and added lines in the hunk
+    """
+    result: typing.List[RowSpan] = []
+    idx = start
+
+    while idx < end:
+        if not _is_prefixed(lines[idx], '-'):
+            idx += 1
+            continue
+
+        removed_start = idx
+        while idx < end and _is_prefixed(lines[idx], '-'):
+            idx += 1
+        added_start = idx
+        while idx < end and _is_prefixed(lines[idx], '+'):
+            idx += 1
+
+        # lines are paired in order, any extra removed or added lines are left alone
+        for offset in range(min(added_start - removed_start, idx - added_start)):
+            result.extend(_paired_spans(lines, removed_start + offset, added_start + offset))
+
+    return result
+
+def line_spans(old: str, new: str) -> typing.Tuple[typing.List[Span], typing.List[Span]]:
+    """
+    Returns the changed spans of the old and new lines,
+    or no spans if the lines have nothing in common
+    """
+    if len(old) > MAX_LINE_LENGTH or len(new) > MAX_LINE_LENGTH:
+        return [], []
+
+    old_words = WORD_REGEX.findall(old)
+    new_words = WORD_REGEX.findall(new)
+    old_offsets = _offsets(old_words)
+    new_offsets = _offsets(new_words)
+
+    old_spans: typing.List[Span] = []
+    new_spans: typing.List[Span] = []
+    common = False
+
+    matcher = difflib.SequenceMatcher(None, old_words, new_words, autojunk=False)
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag == 'equal':
+            if any(not word.isspace() for word in old_words[old_start:old_end]):
+                common = True
+            continue
+
+        if old_start != old_end:
+            old_spans.append((old_offsets[old_start], old_offsets[old_end]))
+        if new_start != new_end:
+            new_spans.append((new_offsets[new_start], new_offsets[new_end]))
+
+    if not common:
+        return [], []
+    return old_spans, new_spans
+
+def _paired_spans(lines: typing.Sequence[str], old_row: int, new_row: int) -> typing.List[RowSpan]:
+    """
+    Returns the changed word spans of a removed line and the added line paired with it
+    """
+    old_spans, new_spans = line_spans(lines[old_row][1:], lines[new_row][1:])
+    return [
+        (row, _column(lines[row], start + 1), _column(lines[row], end + 1))
+        for row, spans in ((old_row, old_spans), (new_row, new_spans))
+        for start, end in spans
+    ]
+
+def _offsets(words: typing.List[str]) -> typing.List[int]:
+    offsets = [0]
+    for word in words:
+        offsets.append(offsets[-1] + len(word))
+    return offsets
+
+def _column(line: str, idx: int) -> int:
+    # curses expands tabs when drawing, so offsets past a tab are shifted
+    if '\t' not in line:
+        return idx
+    return len(line[:idx].expandtabs())
+
+def _is_prefixed(line: str, prefix: str) -> bool:
+    return len(line) != 0 and line[0] == prefix
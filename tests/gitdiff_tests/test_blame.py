@@ -0,0 +1,137 @@
+from array import array
+import unittest
+
+from src.git_idiff.blame import BLAME_BLOCK_LINES, BLAME_PENDING, BlameCache, BlameRange, old_line_numbers
+from src.git_idiff.gitdiff import GitDiff
+from src.git_idiff.gitfile import GitFile
+
+ARGS = 'args'
+EXPECTED = 'expected'
+
+BLAME_OUTPUT = b'\n'.join([
+    b'1111111111111111111111111111111111111111 3 2 2',
+    b'author Alice',
+    b'author-time 100',
+    b'summary first',
+    b'filename a.txt',
+    b'2222222222222222222222222222222222222222 5 4 1',
+    b'author Bob',
+    b'author-time 200',
+    b'previous 1111111111111111111111111111111111111111 a.txt',
+    b'filename a.txt',
+    b'1111111111111111111111111111111111111111 9 5 1',
+    b'filename a.txt',
+    b'',
+])
+
+class MockGitDiff(GitDiff):
+    REVISIONS = ['HEAD', 'abc', 'def']
+
+    def __init__(self, args=None):
+        super().__init__(args)
+        self.blames = []
+
+    def start_blame(self, filename, blob_id, start, end):
+        self.blames.append((filename, blob_id, start, end))
+        return None
+
+    def rev_parse(self, revision):
+        name = revision[:-len('^{commit}')] if revision.endswith('^{commit}') else revision
+        return name if name in MockGitDiff.REVISIONS else None
+
+    def merge_base(self, first, second):
+        return f'base of {first} {second}'
+
+class BlameTest(unittest.TestCase):
+    def test_feed(self):
+        blame = BlameRange(2, 6)
+
+        # entries are only used once their filename line is read
+        self.assertFalse(blame.feed(BLAME_OUTPUT[:50]))
+        self.assertTrue(blame.feed(BLAME_OUTPUT[50:]))
+
+        alice = ('1' * 40, 'Alice', 100)
+        self.assertListEqual([alice, alice, ('2' * 40, 'Bob', 200), alice, None], blame.lines)
+
+    def test_pending(self):
+        blame = BlameRange(1, 2)
+        blame.proc = object()
+        self.assertIs(BLAME_PENDING, blame.line(1))
+
+        blame.proc = None
+        self.assertIsNone(blame.line(1))
+
+    def test_annotate(self):
+        gitdiff = MockGitDiff()
+        cache = BlameCache(size=2)
+
+        result = cache.annotate(gitdiff, 'a.txt', 'abc', [0, 1, 2, BLAME_BLOCK_LINES + 1])
+        cache.annotate(gitdiff, 'a.txt', 'abc', [BLAME_BLOCK_LINES])
+        cache.annotate(gitdiff, 'a.txt', 'abc', [BLAME_BLOCK_LINES * 2 + 1, BLAME_BLOCK_LINES + 1, 1])
+
+        self.assertListEqual([None] * 4, result)
+        self.assertFalse(cache.running)
+        self.assertListEqual([
+            ('a.txt', 'abc', 1, BLAME_BLOCK_LINES),
+            ('a.txt', 'abc', BLAME_BLOCK_LINES + 1, BLAME_BLOCK_LINES * 2),
+            ('a.txt', 'abc', BLAME_BLOCK_LINES * 2 + 1, BLAME_BLOCK_LINES * 3),
+            ('a.txt', 'abc', BLAME_BLOCK_LINES + 1, BLAME_BLOCK_LINES * 2),
+            ('a.txt', 'abc', 1, BLAME_BLOCK_LINES),
+        ], gitdiff.blames)
+
+    def test_old_revision(self):
+        entries = [
+            { ARGS: [], EXPECTED: ('HEAD', True) },
+            { ARGS: ['--cached'], EXPECTED: ('HEAD', False) },
+            { ARGS: ['--staged', 'abc'], EXPECTED: ('abc', False) },
+            { ARGS: ['-U', '5', 'abc', 'def'], EXPECTED: ('abc', False) },
+            { ARGS: ['abc', 'a.txt'], EXPECTED: ('abc', False) },
+            { ARGS: ['abc..def'], EXPECTED: ('abc', False) },
+            { ARGS: ['..def'], EXPECTED: ('HEAD', False) },
+            { ARGS: ['abc...def'], EXPECTED: ('base of abc def', False) },
+            { ARGS: ['abc...'], EXPECTED: ('base of abc HEAD', False) },
+            { ARGS: ['--merge-base', 'abc', 'def'], EXPECTED: ('base of abc def', False) },
+            { ARGS: ['--merge-base', '--cached', 'abc'], EXPECTED: ('base of abc HEAD', False) },
+            { ARGS: ['a.txt'], EXPECTED: ('HEAD', True) },
+            { ARGS: ['--', 'abc'], EXPECTED: ('HEAD', True) },
+            { ARGS: ['abc', 'def', 'HEAD'], EXPECTED: (None, False) },
+            { ARGS: ['--no-index', 'a', 'b'], EXPECTED: (None, False) },
+        ]
+
+        for entry in entries:
+            with self.subTest(**entry):
+                gitdiff = MockGitDiff(entry[ARGS])
+                self.assertTupleEqual(entry[EXPECTED], gitdiff._old_version())
+                self.assertEqual(entry[EXPECTED][0], gitdiff.old_revision())
+
+    def test_old_line_numbers(self):
+        file = GitFile(
+            'a.txt',
+            content=[
+                '@@ -1,4 +1,4 @@',
+                ' one', '-two', '+2', ' three', '\\ No newline at end of file',
+                '@@ -9,2 +9,2 @@',
+                '+8.5', ' nine', '-ten',
+                '',
+            ],
+            hunks=array('I', [0, 1, 3, 1, 3, 6, 9, 2, 9, 2])
+        )
+
+        entries = [
+            {
+                ARGS: list(range(11)),
+                EXPECTED: [0, 1, 2, 0, 3, 0, 0, 0, 9, 10, 0]
+            },
+            {
+                ARGS: [-1, 8, 9, 11],
+                EXPECTED: [0, 9, 10, 0]
+            },
+            {
+                ARGS: [9, 2, 2, -1, 4],
+                EXPECTED: [10, 2, 2, 0, 3]
+            },
+        ]
+
+        for entry in entries:
+            with self.subTest(rows=entry[ARGS]):
+                self.assertListEqual(entry[EXPECTED], old_line_numbers(file, entry[ARGS]))
@@ -0,0 +1,159 @@
+from array import array
+import io
+import subprocess
+import typing
+import unittest
+
+from src.git_idiff import blobreader
+from src.git_idiff.blobreader import BlobReader
+from src.git_idiff.gitdiff import GitDiff
+from src.git_idiff.gitfile import GitFile
+from tests.testutils import patch
+
+ARGS = 'args'
+EXPECTED = 'expected'
+VALUE = 'value'
+
+BLOB = b''.join(b'l%d\n' % num for num in range(1, 21))
+
+class MockBlobReader(BlobReader):
+    def __init__(self, blobs: dict, cache_size: int = 2 ** 20):
+        super().__init__(cache_size)
+        self.blobs = blobs
+        self.reads: typing.List[str] = []
+
+    def _read_object(self, blob_id: str):
+        self.reads.append(blob_id)
+        return self.blobs.get(blob_id)
+
+class MockCatFile:
+    def __init__(self, output: bytes, exits: bool = True):
+        self.stdin = io.BytesIO()
+        self.stdout = io.BytesIO(output)
+        self.returncode: typing.Optional[int] = None
+        self.exits = exits
+        self.killed = False
+
+    def poll(self) -> typing.Optional[int]:
+        return self.returncode
+
+    def kill(self) -> None:
+        self.killed = True
+        self.returncode = -9
+
+    def wait(self, timeout: typing.Optional[float] = None) -> int:
+        if self.returncode is None:
+            if not self.exits:
+                raise subprocess.TimeoutExpired(BlobReader.ARGS, timeout or 0)
+            self.returncode = 0
+        return self.returncode
+
+class FullFile(io.BytesIO):
+    def write(self, data) -> int:
+        raise OSError('No space left on device')
+
+def _context(start: int, end: int) -> list:
+    return [ f' l{num}' for num in range(start, end + 1) ]
+
+def _get_file() -> GitFile:
+    return GitFile(
+        'a.txt',
+        headers=['diff --git a/a.txt b/a.txt', 'index 1111111..2222222 100644', '--- a/a.txt', '+++ b/a.txt'],
+        content=[
+            '@@ -4,3 +4,3 @@ def a():',
+            ' l4', '-l5', '+five', ' l6',
+            '@@ -14,3 +14,2 @@',
+            ' l14', '-l15', ' l16',
+            '',
+        ],
+        hunks=array('I', [0, 4, 3, 4, 3, 5, 14, 3, 14, 2])
+    )
+
+class ExpandContextTest(unittest.TestCase):
+    def test_expand_context(self):
+        entries = [
+            {
+                # the function context is kept while the hunk start does not move
+                ARGS: 0,
+                EXPECTED: (list(_get_file().content), list(_get_file().hunks))
+            },
+            {
+                ARGS: 2,
+                EXPECTED: (
+                    [
+                        '@@ -2,7 +2,7 @@',
+                        *_context(2, 4), '-l5', '+five', *_context(6, 8),
+                        '@@ -12,7 +12,6 @@',
+                        *_context(12, 14), '-l15', *_context(16, 18),
+                        '',
+                    ],
+                    [0, 2, 7, 2, 7, 9, 12, 7, 12, 6]
+                )
+            },
+            {
+                ARGS: 4,
+                EXPECTED: (
+                    [
+                        '@@ -1,20 +1,19 @@',
+                        *_context(1, 4), '-l5', '+five', *_context(6, 14), '-l15', *_context(16, 20),
+                        '',
+                    ],
+                    [0, 1, 20, 1, 19]
+                )
+            },
+        ]
+
+        for entry in entries:
+            with self.subTest(**entry):
+                gitdiff = GitDiff()
+                gitdiff.blob_reader = MockBlobReader({'1111111': BLOB})
+                file = _get_file()
+
+                self.assertTrue(gitdiff.expand_context(file, entry[ARGS]))
+                self.assertListEqual(entry[EXPECTED][0], list(file.content))
+                self.assertListEqual(entry[EXPECTED][1], list(file.hunks))
+
+    def test_expand_context_missing_blob(self):
+        gitdiff = GitDiff()
+        gitdiff.blob_reader = MockBlobReader({})
+        file = _get_file()
+
+        self.assertFalse(gitdiff.expand_context(file, 2))
+        self.assertListEqual(list(_get_file().content), list(file.content))
+
+    def test_blob_reader_cache(self):
+        reader = MockBlobReader({'a': b'a' * 4, 'b': b'b' * 4, 'c': b'c' * 4}, cache_size=8)
+
+        for blob_id in ['a', 'b', 'a', 'c', 'a', 'b']:
+            reader.read(blob_id)
+
+        self.assertListEqual(['a', 'b', 'c', 'b'], reader.reads)
+
+    def test_blob_reader_interrupted(self):
+        procs: typing.List[MockCatFile] = []
+
+        def start_cat_file() -> MockCatFile:
+            procs.append(MockCatFile(b'1111111 blob 4\nabc\n\n'))
+            return procs[-1]
+
+        reader = BlobReader()
+        with patch(blobreader, '_start_cat_file', start_cat_file):
+            with self.assertRaises(OSError):
+                reader.read_to_file('1111111', FullFile())
+
+            # the rest of the first blob is not read as the reply to the next request
+            self.assertTrue(procs[0].killed)
+            self.assertTrue(procs[0].stdout.closed)
+            self.assertEqual(b'abc\n', reader.read('1111111'))
+            self.assertEqual(2, len(procs))
+
+    def test_blob_reader_close_blocked(self):
+        proc = MockCatFile(b'1111111 blob 4\nabc\n\n', exits=False)
+        reader = BlobReader()
+        with patch(blobreader, '_start_cat_file', lambda: proc):
+            # the object is never read, so cat-file does not exit when its input ends
+            reader._request('1111111')
+        reader.close()
+
+        self.assertTrue(proc.killed)
+        self.assertTrue(proc.stdout.closed)
@@ -0,0 +1,101 @@
+from array import array
+import io
+import json
+import unittest
+
+from src.git_idiff.__main__ import _split_args
+from src.git_idiff.export import write_jsonl
+from src.git_idiff.gitfile import GitFile
+
+ARGS = 'args'
+EXPECTED = 'expected'
+
+class ExportTest(unittest.TestCase):
+    def test_write_jsonl(self):
+        files = [
+            GitFile('a', insertions=2, deletions=1, status='M', hunks=array('I', [0, 1, 2, 1, 3])),
+            GitFile('c', old_filename='b', insertions=0, deletions=0, status='R090'),
+            GitFile('d', status='A'),
+        ]
+
+        out = io.StringIO()
+        write_jsonl(files, out, hunks=True)
+
+        self.assertListEqual([
+            {
+                'filename': 'a',
+                'old_filename': None,
+                'status': 'M',
+                'score': 0,
+                'insertions': 2,
+                'deletions': 1,
+                'hunks': [{ 'old_start': 1, 'old_count': 2, 'new_start': 1, 'new_count': 3 }],
+            },
+            {
+                'filename': 'c',
+                'old_filename': 'b',
+                'status': 'R',
+                'score': 90,
+                'insertions': 0,
+                'deletions': 0,
+                'hunks': [],
+            },
+            {
+                'filename': 'd',
+                'old_filename': None,
+                'status': 'A',
+                'score': 0,
+                'insertions': None,
+                'deletions': None,
+                'hunks': [],
+            },
+        ], [ json.loads(line) for line in out.getvalue().splitlines() ])
+
+        out = io.StringIO()
+        write_jsonl(files[:1], out)
+        self.assertNotIn('hunks', json.loads(out.getvalue()))
+
+    def test_split_args(self):
+        entries = [
+            {
+                ARGS: ['HEAD~', '-U5'],
+                EXPECTED: (['HEAD~', '-U5'], None, False, None, None, None)
+            },
+            {
+                ARGS: ['--export=jsonl', 'HEAD~', '--export-hunks'],
+                EXPECTED: (['HEAD~'], 'jsonl', True, None, None, None)
+            },
+            {
+                ARGS: ['HEAD~', '--', '--export=jsonl'],
+                EXPECTED: (['HEAD~', '--', '--export=jsonl'], None, False, None, None, None)
+            },
+            {
+                ARGS: ['--render-stats=stats.tsv', 'HEAD~'],
+                EXPECTED: (['HEAD~'], None, False, 'stats.tsv', None, None)
+            },
+            {
+                ARGS: ['-M', '--log', 'main..topic', '--', 'src'],
+                EXPECTED: (['-M', '--', 'src'], None, False, None, 'main..topic', None)
+            },
+            {
+                ARGS: ['--max-file-changes=500', 'HEAD~'],
+                EXPECTED: (['HEAD~'], None, False, None, None, 500)
+            },
+        ]
+
+        for entry in entries:
+            with self.subTest(args=entry[ARGS]):
+                self.assertTupleEqual(entry[EXPECTED], _split_args(entry[ARGS]))
+
+    def test_split_args_error(self):
+        entries = [
+            ['--export-hunks', 'HEAD~'],
+            ['HEAD~', '--log'],
+            ['--max-file-changes=all'],
+            ['--max-file-changes=-1'],
+        ]
+
+        for args in entries:
+            with self.subTest(args=args):
+                with self.assertRaises(ValueError):
+                    _split_args(args)
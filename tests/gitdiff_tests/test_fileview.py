@@ -0,0 +1,103 @@
+from array import array
+import unittest
+
+from src.git_idiff.fileview import changed_runs, open_file_view, version_blob_id
+from src.git_idiff.gitdiff import GitDiff
+from src.git_idiff.gitfile import GitFile
+
+ARGS = 'args'
+EXPECTED = 'expected'
+VALUE = 'value'
+
+class MockGitDiff(GitDiff):
+    def __init__(self, blobs: dict):
+        super().__init__()
+        self.blobs = blobs
+
+    def read_blob_to_file(self, blob_id, out):
+        if blob_id not in self.blobs:
+            return False
+        out.write(self.blobs[blob_id])
+        return True
+
+def _get_file(status: str = GitFile.MODIFIED) -> GitFile:
+    return GitFile(
+        'a.txt',
+        insertions=3,
+        deletions=2,
+        headers=['diff --git a/a.txt b/a.txt', 'index 1111111..2222222 100644', '--- a/a.txt', '+++ b/a.txt'],
+        content=[
+            '@@ -1,4 +1,4 @@',
+            ' one', '-two', '-three', '+2', '+3', ' four',
+            '@@ -9,2 +9,3 @@',
+            ' nine', '+9.5', ' ten',
+            '',
+        ],
+        hunks=array('I', [0, 1, 4, 1, 4, 7, 9, 2, 9, 3]),
+        status=status
+    )
+
+class FileViewTest(unittest.TestCase):
+    def test_changed_runs(self):
+        entries = [
+            { ARGS: True, EXPECTED: [1, 3, 9, 10] },
+            { ARGS: False, EXPECTED: [1, 3] },
+        ]
+
+        for entry in entries:
+            with self.subTest(**entry):
+                self.assertListEqual(entry[EXPECTED], list(changed_runs(_get_file(), entry[ARGS])))
+
+    def test_open_file_view(self):
+        gitdiff = MockGitDiff({
+            '1111111': b'one\ntwo\nthree\nfour\n',
+            '2222222': b'one\n2\n3\nfour',
+        })
+
+        view = open_file_view(gitdiff, _get_file(), True)
+        self.assertListEqual(['one', '2', '3', 'four'], list(view.lines))
+        self.assertListEqual([False, True, True, False], [ view.is_changed(row) for row in range(4) ])
+        self.assertEqual(2, view.change_count)
+        self.assertEqual(1, view.find_change(9))
+        self.assertEqual(-1, view.find_change(0))
+        self.assertEqual(4, view.longest)
+        view.close()
+        self.assertEqual(0, len(view.lines))
+
+        view = open_file_view(gitdiff, _get_file(), False)
+        self.assertListEqual(['one', 'two', 'three', 'four'], list(view.lines))
+        view.close()
+
+    def test_open_file_view_missing(self):
+        gitdiff = MockGitDiff({})
+
+        self.assertIsNone(open_file_view(gitdiff, _get_file(), False))
+        self.assertIsNone(open_file_view(gitdiff, _get_file(GitFile.ADDED), False))
+        self.assertIsNone(open_file_view(gitdiff, _get_file(GitFile.DELETED), True))
+
+    def test_version_blob_id(self):
+        entries = [
+            {
+                VALUE: ['diff --git a/a b/a', 'index 07e09c5..6f37569 100644'],
+                EXPECTED: ('07e09c5', '6f37569')
+            },
+            {
+                VALUE: ['diff --git a/a b/a', 'deleted file mode 100644', 'index 07e09c5..0000000'],
+                EXPECTED: ('07e09c5', None)
+            },
+            {
+                VALUE: ['diff --cc a', 'index 1e02ec9,4cefd50..6f37569'],
+                EXPECTED: (None, '6f37569')
+            },
+            {
+                VALUE: ['diff --git a/a b/a', 'new mode 100755'],
+                EXPECTED: (None, None)
+            },
+        ]
+
+        for entry in entries:
+            with self.subTest(headers=entry[VALUE]):
+                file = GitFile('a', headers=entry[VALUE])
+                self.assertTupleEqual(
+                    entry[EXPECTED], (version_blob_id(file, False), version_blob_id(file, True))
+                )
@@ -1,9 +1,13 @@
+from array import array
+import io
 import json
 import os
 import typing
 import unittest
 
-from src.git_idiff.gitdiff import GitDiff, GitFile
+from src.git_idiff.diffstream import iter_process_diff
+from src.git_idiff.gitdiff import GitDiff
+from src.git_idiff.gitfile import GitFile, display_path
 
 ARGS = 'args'
 EXPECTED = 'expected'
@@ -13,6 +17,12 @@ MOCKED_DATA_DIR = os.path.join(os.path.dirname(__file__), 'mocked_data')
 MOCKED_DIFF_DIR = os.path.join(MOCKED_DATA_DIR, 'diff')
 MOCKED_STAT_DIR = os.path.join(MOCKED_DATA_DIR, 'status')
 
+class MockGitDiff(GitDiff):
+    REVISIONS = ['HEAD', 'HEAD~', 'abc', 'def']
+
+    def rev_parse(self, revision):
+        return revision if revision in MockGitDiff.REVISIONS else None
+
 class GitDiffTest(unittest.TestCase):
     def test_get_diff(self):
         entries = [
@@ -77,6 +87,316 @@ class GitDiffTest(unittest.TestCase):
             check_status = True
         )
 
+    def test_get_statuses_copy_of_changed_file(self):
+        files = [
+            GitFile('a', insertions=1, deletions=0),
+            GitFile('b', old_filename='a', insertions=1, deletions=0),
+        ]
+        GitDiff()._process_statuses(files, b'M\0a\0C098\0a\0b\0')
+
+        self.assertListEqual([(GitFile.MODIFIED, 0), (GitFile.COPIED, 98)], [
+            (file.status, file.score) for file in files
+        ])
+
+    def test_iter_process_diff(self):
+        entries = [
+            ['62a4472', '8ef1477'],
+            ['-M05', '3382256', 'c04fa3b'],
+            ['empty'],
+            ['merge-conflicts'],
+        ]
+
+        for args in entries:
+            with self.subTest(args=args):
+                gitdiff = GitDiff(args)
+                data = _get_mocked_diff_data(args)
+                files = list(iter_process_diff(gitdiff, io.BytesIO(data)))
+
+                self.assertResultsEqual(
+                    _get_mocked_diff_results(args),
+                    _gitfiles_to_result(files),
+                    check_status = False
+                )
+
+                expected = gitdiff._process_diff(data)
+                self.assertEqual(len(expected), len(files))
+                for file, headers_only in zip(files, iter_process_diff(gitdiff, io.BytesIO(data), content=False)):
+                    self.assertEqual(0, len(headers_only.content))
+                    self.assertListEqual(file.headers, headers_only.headers)
+                    self.assertEqual(list(file.hunks), list(headers_only.hunks))
+                for file, expected_file in zip(files, expected):
+                    self.assertEqual(list(expected_file.hunks), list(file.hunks))
+
+    def test_iter_process_diff_deferred(self):
+        args = ['62a4472', '8ef1477']
+        data = _get_mocked_diff_data(args)
+
+        gitdiff = GitDiff(args, max_file_changes=10)
+        expected = gitdiff._process_diff(data)
+        files = list(iter_process_diff(gitdiff, io.BytesIO(data)))
+
+        self.assertListEqual([ file.deferred for file in expected ], [ file.deferred for file in files ])
+        self.assertListEqual([ len(file.content) for file in expected ], [ len(file.content) for file in files ])
+
+    def test_get_diff_previous(self):
+        args = ['62a4472', '8ef1477']
+        gitdiff = GitDiff(args)
+        data = _get_mocked_diff_data(args)
+        previous = gitdiff._process_diff(data)
+
+        changed = previous[0]
+        changed.headers = [
+            header.replace('index ', 'index 1') for header in changed.headers
+        ]
+
+        files = gitdiff._process_diff(data, previous)
+
+        self.assertIsNot(changed.content, files[0].content)
+        for idx in range(1, len(files)):
+            if previous[idx].blob_ids is not None:
+                self.assertIs(previous[idx].content, files[idx].content)
+        self.assertResultsEqual(
+            _get_mocked_diff_results(args),
+            _gitfiles_to_result(files),
+            check_status = False
+        )
+
+    def test_get_diff_previous_rehomed(self):
+        args = ['62a4472', '8ef1477']
+        gitdiff = GitDiff(args)
+        data = _get_mocked_diff_data(args)
+        previous = gitdiff._process_diff(data)
+        old_data = previous[0].content.data
+
+        files = gitdiff._process_diff(bytes(bytearray(data)), previous)
+
+        reused = [ idx for idx in range(len(files)) if previous[idx].blob_ids is not None ]
+        self.assertNotEqual(0, len(reused))
+        for idx in reused:
+            with self.subTest(filename=files[idx].filename):
+                self.assertIs(previous[idx].content, files[idx].content)
+                self.assertIsNot(old_data, files[idx].content.data)
+        self.assertResultsEqual(
+            _get_mocked_diff_results(args),
+            _gitfiles_to_result(files),
+            check_status = False
+        )
+
+    def test_get_diff_deferred(self):
+        args = ['62a4472', '8ef1477']
+        data = _get_mocked_diff_data(args)
+        expected = _get_mocked_diff_results(args)
+
+        gitdiff = GitDiff(args, max_file_changes=10)
+        files = gitdiff._process_diff(data)
+
+        for idx, file in enumerate(files):
+            with self.subTest(filename=file.filename):
+                expected_file = expected['gitfiles'][idx]
+                self.assertListEqual(expected_file['headers'], file.headers)
+
+                if file.changes > 10:
+                    self.assertTrue(file.deferred)
+                    self.assertEqual(0, len(file.content))
+                    self.assertEqual(0, file.hunk_count)
+
+                    gitdiff._process_file_patch(file, data)
+                    self.assertFalse(file.deferred)
+                else:
+                    self.assertFalse(file.deferred)
+                self.assertListEqual(expected_file['content'], list(file.content))
+
+        self.assertTrue(any(file.changes > 10 for file in files))
+
+    def test_get_diff_binary_shared(self):
+        data = b''.join([
+            b'1\t1\ta\x00-\t-\tb.bin\x003\t0\tc\x001\t0\td\x00\x00',
+            b'diff --git a/a b/a\nindex 7898192..6f83395 100644\n--- a/a\n+++ b/a\n',
+            b'@@ -1 +1 @@\n-a\n+b\n',
+            b'diff --git a/b.bin b/b.bin\nindex 1e02ec9..4cefd50 100644\n',
+            b'Binary files a/b.bin and b/b.bin differ\n',
+            b'diff --git a/c b/c\nindex 1e02ec9..4cefd50 100644\n--- a/c\n+++ b/c\n',
+            b'@@ -0,0 +1,3 @@\n+1\n+2\n+3\n',
+            b'diff --git a/d b/d\nindex 7898192..6f83395 100644\n--- a/d\n+++ b/d\n',
+            b'@@ -1 +1,2 @@\n a\n+b\n',
+        ])
+        entries = [
+            { VALUE: None, EXPECTED: [False, True, False, False] },
+            { VALUE: 2, EXPECTED: [False, True, True, False] },
+        ]
+
+        for entry in entries:
+            with self.subTest(max_file_changes=entry[VALUE]):
+                files = GitDiff(max_file_changes=entry[VALUE])._process_diff(data)
+
+                self.assertListEqual(entry[EXPECTED], [ len(file.content) == 0 for file in files ])
+                self.assertListEqual(['@@ -1 +1 @@', '-a', '+b'], list(files[0].content))
+                self.assertListEqual(['@@ -1 +1,2 @@', ' a', '+b', ''], list(files[3].content))
+                self.assertListEqual([0, 1, 1, 1, 2], list(files[3].hunks))
+
+                buffers = [ files[0].content.data, files[3].content.data ]
+                if entry[VALUE] is None:
+                    # a binary file does not keep the other patches from sharing the output
+                    self.assertIs(buffers[0], buffers[1])
+                else:
+                    # the deferred patch is left out of the buffers of the other patches
+                    self.assertIsNot(buffers[0], buffers[1])
+                    self.assertTrue(all(b'+++ b/c' not in buffer for buffer in buffers))
+
+    def test_file_args(self):
+        entries = [
+            {
+                ARGS: ['HEAD~'],
+                VALUE: GitFile('b', old_filename='a'),
+                EXPECTED: ['HEAD~', '--', 'a', 'b']
+            },
+            {
+                ARGS: ['HEAD~', '--', 'src'],
+                VALUE: GitFile('b'),
+                EXPECTED: ['HEAD~', '--', 'b']
+            },
+            {
+                ARGS: ['HEAD~', 'src', '-U', '5', 'b'],
+                VALUE: GitFile('b'),
+                EXPECTED: ['-U', '5', 'HEAD~', '--', 'b']
+            },
+            {
+                ARGS: ['HEAD~', '--diff-filter', 'M', '--src-prefix', 'HEAD', 'b'],
+                VALUE: GitFile('b'),
+                EXPECTED: ['--diff-filter=M', '--src-prefix=HEAD', 'HEAD~', '--', 'b']
+            },
+            {
+                ARGS: ['abc..def', 'src'],
+                VALUE: GitFile('b'),
+                EXPECTED: ['abc..def', '--', 'b']
+            },
+            {
+                ARGS: ['abc...', 'src'],
+                VALUE: GitFile('b'),
+                EXPECTED: ['abc...', '--', 'b']
+            },
+            {
+                ARGS: ['src', 'HEAD'],
+                VALUE: GitFile('b'),
+                EXPECTED: ['--', 'b']
+            },
+            {
+                ARGS: ['--no-index', 'x', 'y'],
+                VALUE: GitFile('b'),
+                EXPECTED: ['--no-index', 'x', 'y']
+            },
+        ]
+
+        for entry in entries:
+            with self.subTest(args=entry[ARGS]):
+                self.assertListEqual(
+                    entry[EXPECTED],
+                    MockGitDiff(entry[ARGS])._file_args(entry[VALUE])
+                )
+
+    def test_get_diff_decode_errors(self):
+        data = b''.join([
+            b'1\t1\tf\xe9\x00\x00',
+            b'diff --git a/f\xe9 b/f\xe9\nindex 7898192..6f83395 100644\n--- a/f\xe9\n+++ b/f\xe9\n',
+            b'@@ -1 +1 @@\n-a\n+caf\xe9\n',
+        ])
+
+        entries = [
+            { VALUE: 'replace', EXPECTED: '\ufffd' },
+            { VALUE: 'surrogateescape', EXPECTED: '\udce9' },
+        ]
+
+        for entry in entries:
+            with self.subTest(errors=entry[VALUE]):
+                files = GitDiff(decode_errors=entry[VALUE])._process_diff(data)
+
+                self.assertEqual('f\udce9', files[0].filename)
+                self.assertListEqual(['@@ -1 +1 @@', '-a', '+caf' + entry[EXPECTED], ''], list(files[0].content))
+
+    def test_get_diff_path_not_utf8(self):
+        data = b''.join([
+            b'diff --cc m\xe9\nindex 1e02ec9,4cefd50..0000000\n--- a/m\xe9\n+++ b/m\xe9\n',
+            b'@@@ -1,1 -1,1 +1,1 @@@\n- a\n +b\n++c\n',
+            b'1\t1\t\x00old\xe9\x00f\xe9\x00\x00',
+            b'diff --git a/old\xe9 b/f\xe9\nsimilarity index 50%\n',
+            b'rename from old\xe9\nrename to f\xe9\nindex 7898192..6f83395 100644\n',
+            b'--- a/old\xe9\n+++ b/f\xe9\n@@ -1 +1 @@\n-a\n+b\n',
+        ])
+
+        gitdiff = MockGitDiff(['HEAD'])
+        files = gitdiff._process_diff(data)
+
+        self.assertEqual(b'm\xe9', os.fsencode(files[0].filename))
+        self.assertEqual(b'f\xe9', os.fsencode(files[1].filename))
+        self.assertEqual(b'old\xe9', os.fsencode(files[1].old_filename))
+        self.assertListEqual(
+            ['HEAD', '--', 'old\udce9', 'f\udce9'],
+            gitdiff._file_args(files[1])
+        )
+        self.assertEqual('f\ufffd', display_path(files[1].filename))
+        self.assertEqual('diff --git a/old\ufffd b/f\ufffd', files[1].headers[0])
+
+    def test_blob_ids(self):
+        entries = [
+            {
+                VALUE: ['diff --git a/a b/a', 'index 07e09c5..6f37569 100644'],
+                EXPECTED: ('07e09c5', '6f37569')
+            },
+            {
+                VALUE: ['diff --cc a', 'index 1e02ec9,4cefd50..0000000'],
+                EXPECTED: None
+            },
+            {
+                VALUE: ['diff --git a/a b/a', 'new mode 100755'],
+                EXPECTED: None
+            },
+        ]
+
+        for entry in entries:
+            with self.subTest(headers=entry[VALUE]):
+                self.assertEqual(entry[EXPECTED], GitFile('a', headers=entry[VALUE]).blob_ids)
+
+    def test_hunks(self):
+        args = ['62a4472', '8ef1477']
+        gitdiff = GitDiff(args)
+        files = gitdiff._process_diff(_get_mocked_diff_data(args))
+
+        for file in files:
+            with self.subTest(filename=file.filename):
+                rows = [
+                    idx for idx, line in enumerate(file.content) if line.startswith('@@')
+                ]
+                self.assertListEqual(rows, [ file.hunk(idx)[0] for idx in range(file.hunk_count) ])
+
+                for idx in range(file.hunk_count):
+                    row, _, old_count, _, new_count = file.hunk(idx)
+                    end = file.hunk(idx + 1)[0] if idx + 1 < file.hunk_count else len(file.content)
+                    lines = file.content[row + 1:end]
+                    self.assertEqual(old_count, sum(1 for line in lines if line[:1] in (' ', '-')))
+                    self.assertEqual(new_count, sum(1 for line in lines if line[:1] in (' ', '+')))
+
+        self.assertTupleEqual((0, 1, 7, 1, 13), files[0].hunk(0))
+
+    def test_find_hunk(self):
+        file = GitFile('test', hunks=array('I', [
+            2, 1, 3, 1, 3,
+            10, 20, 3, 20, 4,
+            20, 40, 3, 41, 3,
+        ]))
+
+        entries = [
+            { VALUE: -3, EXPECTED: -1 },
+            { VALUE: 0, EXPECTED: -1 },
+            { VALUE: 2, EXPECTED: 0 },
+            { VALUE: 9, EXPECTED: 0 },
+            { VALUE: 10, EXPECTED: 1 },
+            { VALUE: 100, EXPECTED: 2 },
+        ]
+
+        for entry in entries:
+            with self.subTest(row=entry[VALUE]):
+                self.assertEqual(entry[EXPECTED], file.find_hunk(entry[VALUE]))
+
     def assertResultsEqual(self, expected, actual, check_status=True):
         idx = 0
         for file in expected['gitfiles']:
@@ -123,7 +443,7 @@ def _gitfile_to_dict(file: GitFile) -> typing.Dict[str, typing.Any]:
         'insertions': file.insertions,
         'deletions': file.deletions,
         'headers': file.headers,
-        'content': file.content,
+        'content': list(file.content),
         'status': file.status,
         'score': file.score
     }
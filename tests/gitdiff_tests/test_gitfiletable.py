@@ -0,0 +1,85 @@
+from array import array
+import unittest
+
+from src.git_idiff.gitfile import GitFile, GitFileTable
+
+class GitFileTableTest(unittest.TestCase):
+    def test_append(self):
+        table = GitFileTable()
+        table.append('a.py', None, 5, 2)
+        table.append('b.py', 'a.py', None, None)
+
+        self.assertEqual(2, len(table))
+
+        first = table[0]
+        self.assertEqual('a.py', first.filename)
+        self.assertIsNone(first.old_filename)
+        self.assertEqual(5, first.insertions)
+        self.assertEqual(2, first.deletions)
+        self.assertEqual(GitFile.UNKNOWN, first.status)
+        self.assertEqual(0, first.score)
+
+        second = table[-1]
+        self.assertEqual('b.py', second.filename)
+        self.assertEqual('a.py', second.old_filename)
+        self.assertIsNone(second.insertions)
+        self.assertIsNone(second.deletions)
+
+        self.assertEqual(5, table.total_insertions())
+        self.assertEqual(2, table.total_deletions())
+
+        with self.assertRaises(IndexError):
+            _ = table[2]
+
+    def test_row_write(self):
+        table = GitFileTable()
+        table.append('a.py', None, 5, 2)
+
+        row = table[0]
+        self.assertIs(row, table[0])
+
+        row.set_status('R087')
+        row.content = ['+a']
+        row.insertions = None
+
+        self.assertEqual(ord('R'), table.statuses[0])
+        self.assertEqual(87, table.scores[0])
+        self.assertListEqual(['+a'], table.content[0])
+        self.assertEqual(-1, table.insertions[0])
+        self.assertEqual(['a.py'], [ file.filename for file in table ])
+
+    def test_set_hunks(self):
+        table = GitFileTable()
+        for name in ('a', 'b', 'c'):
+            table.append(name)
+
+        table[1].hunks = array('I', [0, 1, 1, 1, 1])
+        table[2].hunks = array('I', [0, 2, 2, 2, 2, 5, 9, 1, 9, 1])
+        table[0].hunks = array('I', [3, 3, 3, 3, 3])
+        table[1].hunks = array('I')
+
+        self.assertListEqual([3, 3, 3, 3, 3], list(table[0].hunks))
+        self.assertEqual(0, table[1].hunk_count)
+        self.assertEqual(2, table[2].hunk_count)
+        self.assertTupleEqual((5, 9, 1, 9, 1), table[2].hunk(1))
+        self.assertEqual(1, table[2].find_hunk(7))
+
+    def test_standalone_file(self):
+        file = GitFile('b', 'a', 1, 2, headers=['diff --git a/a b/b'], status='R090')
+
+        self.assertEqual(1, len(file.table))
+        self.assertEqual(0, file.index)
+        self.assertEqual(('a', 'b', 1, 2), (file.old_filename, file.filename, file.insertions, file.deletions))
+        self.assertEqual((GitFile.RENAMED, 90), (file.status, file.score))
+
+        file.deferred = True
+        file.hunks = array('I', [0, 1, 1, 1, 1])
+        self.assertEqual(1, file.table.deferred[0])
+        self.assertEqual(1, file.hunk_count)
+        self.assertListEqual(['diff --git a/a b/b'], file.table.headers[0])
+
+    def test_slots(self):
+        self.assertFalse(hasattr(GitFile('test'), '__dict__'))
+        table = GitFileTable()
+        table.append('test')
+        self.assertFalse(hasattr(table[0], '__dict__'))
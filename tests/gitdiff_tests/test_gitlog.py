@@ -0,0 +1,147 @@
+import io
+import typing
+import unittest
+
+from src.git_idiff import gitlog
+from src.git_idiff.gitdiff import GitDiff
+from src.git_idiff.gitfile import GitFile, GitFileTable
+from src.git_idiff.gitlog import CommitSeries, EMPTY_TREE, GitCommit, _header_status, iter_process_log
+from tests.testutils import patch
+from tests.gitdiff_tests.test_gitdiff import _get_mocked_diff_data, _get_mocked_diff_results
+
+ARGS = 'args'
+EXPECTED = 'expected'
+VALUE = 'value'
+
+def _commit_line(commit_hash: str, parents: str, subject: str) -> bytes:
+    return b'\0'.join([b'', b'commit ' + commit_hash.encode(), parents.encode(), b'author', b'100', subject.encode(), b''])
+
+class GitLogTest(unittest.TestCase):
+    def test_iter_process_log(self):
+        diffs = [
+            ['62a4472', '8ef1477'],
+            ['-M05', '3382256', 'c04fa3b'],
+        ]
+        data = b''.join([
+            _commit_line('c1', 'p1', 'first') + b'\n',
+            _get_mocked_diff_data(diffs[0]),
+            _commit_line('c2', 'c1', 'empty'),
+            _commit_line('c3', 'c2 p2', 'merge'),
+            _commit_line('c4', 'c3', 'second') + b'\n',
+            _get_mocked_diff_data(diffs[1]),
+        ])
+
+        commits = list(iter_process_log(GitDiff(), io.BytesIO(data)))
+
+        self.assertListEqual(['c1', 'c2', 'c3', 'c4'], [ commit.commit_hash for commit in commits ])
+        self.assertListEqual(['c2', 'p2'], commits[2].parents)
+        self.assertEqual('merge', commits[2].subject)
+        self.assertEqual(100, commits[0].timestamp)
+        self.assertEqual(0, len(commits[1].files))
+        self.assertEqual(0, len(commits[2].files))
+
+        for commit, args in zip([commits[0], commits[3]], diffs):
+            with self.subTest(args=args):
+                expected = _get_mocked_diff_results(args)['gitfiles']
+                self.assertListEqual(
+                    [ (file['filename'], file['old_filename'], file['headers'], file['content']) for file in expected ],
+                    [ (file.filename, file.old_filename, file.headers, list(file.content)) for file in commit.files ]
+                )
+
+                files = GitDiff(args)._process_diff(_get_mocked_diff_data(args))
+                self.assertListEqual(
+                    [ list(file.hunks) for file in files ],
+                    [ list(file.hunks) for file in commit.files ]
+                )
+
+    def test_header_status(self):
+        entries = [
+            {
+                VALUE: ['diff --git a/a b/a', 'index 07e09c5..6f37569 100644'],
+                EXPECTED: GitFile.MODIFIED
+            },
+            {
+                VALUE: ['diff --git a/a b/a', 'new file mode 100644'],
+                EXPECTED: GitFile.ADDED
+            },
+            {
+                VALUE: ['diff --git a/a b/a', 'deleted file mode 100644'],
+                EXPECTED: GitFile.DELETED
+            },
+            {
+                VALUE: ['diff --git a/a b/b', 'similarity index 90%', 'rename from a', 'rename to b'],
+                EXPECTED: 'R090'
+            },
+            {
+                VALUE: ['diff --git a/a b/b', 'similarity index 100%', 'copy from a', 'copy to b'],
+                EXPECTED: 'C100'
+            },
+        ]
+
+        for entry in entries:
+            with self.subTest(headers=entry[VALUE]):
+                self.assertEqual(entry[EXPECTED], _header_status(entry[VALUE]))
+
+class MockLog:
+    def __init__(self, count: int):
+        self.count = count
+        self.read = 0
+        self.loaded: typing.List[str] = []
+
+    def iter_log(self, gitdiff, revisions, content=True):
+        for idx in range(self.count):
+            self.read += 1
+            yield self.get_commit(gitdiff, str(idx))
+
+    def get_commit(self, gitdiff, commit_hash):
+        self.loaded.append(commit_hash)
+        files = GitFileTable()
+        files.append(commit_hash)
+        return GitCommit(commit_hash, [], files=files)
+
+class CommitSeriesTest(unittest.TestCase):
+    def test_select(self):
+        log = MockLog(10)
+        with patch(gitlog, 'iter_log', log.iter_log), patch(gitlog, 'get_commit', log.get_commit):
+            series = CommitSeries(GitDiff(), ['HEAD'], prefetch=1)
+
+            self.assertEqual('0', series.select(0).commit_hash)
+            self.assertEqual(1, log.read)
+
+            while series.needs_prefetch():
+                series.prefetch_one()
+            self.assertEqual(2, log.read)
+            self.assertFalse(series.complete)
+
+            self.assertEqual('5', series.select(5).commit_hash)
+            self.assertEqual(6, log.read)
+            self.assertListEqual([ idx in (4, 5) for idx in range(6) ], [ commit.files is not None for commit in series.commits ])
+
+            log.loaded.clear()
+            series.select(1)
+            self.assertListEqual(['1'], log.loaded)
+            while series.needs_prefetch():
+                series.prefetch_one()
+            self.assertListEqual(['1', '2', '0'], log.loaded)
+
+            self.assertIsNone(series.select(20))
+            self.assertTrue(series.complete)
+            self.assertEqual(10, len(series))
+
+    def test_update_selected(self):
+        log = MockLog(3)
+        with patch(gitlog, 'iter_log', log.iter_log), patch(gitlog, 'get_commit', log.get_commit):
+            series = CommitSeries(GitDiff(), ['HEAD'])
+            files = GitFileTable()
+
+            series.update_selected(files)
+            series.select(1)
+            series.update_selected(files)
+
+            self.assertListEqual([False, True], [ commit.files is files for commit in series.commits ])
+
+    def test_commit_gitdiff(self):
+        series = CommitSeries(GitDiff(['-M', '-U5']), ['HEAD'])
+
+        self.assertListEqual(['p1', 'c1', '-M', '-U5'], series.commit_gitdiff(GitCommit('c1', ['p1', 'p2'])).args)
+        self.assertListEqual([EMPTY_TREE, 'c1', '-M', '-U5'], series.commit_gitdiff(GitCommit('c1')).args)
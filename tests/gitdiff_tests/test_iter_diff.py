@@ -0,0 +1,185 @@
+import asyncio
+import io
+import subprocess
+import typing
+import unittest
+
+from src.git_idiff.diffstream import iter_diff, iter_diff_async
+from src.git_idiff.gitdiff import GitDiff
+from src.git_idiff.gitfile import GitFile
+from tests.testutils import patch
+from .test_gitdiff import _get_mocked_diff_data, _get_mocked_status_data
+
+ARGS = ['62a4472', '8ef1477']
+
+class IterDiffTest(unittest.TestCase):
+    def test_iter_diff(self):
+        expected = _get_expected_files()
+
+        with patch(subprocess, 'Popen', _mocked_popen):
+            files = list(iter_diff(GitDiff(ARGS)))
+
+        self.assertListEqual(
+            [ (file.filename, file.status, list(file.content)) for file in expected ],
+            [ (file.filename, file.status, list(file.content)) for file in files ]
+        )
+
+    def test_iter_diff_callbacks(self):
+        expected = _get_expected_files()
+        hunks: typing.List[typing.Tuple[str, tuple]] = []
+
+        def on_file(file: GitFile) -> bool:
+            return file.status != GitFile.ADDED
+
+        def on_hunk(file: GitFile, hunk: tuple) -> None:
+            hunks.append((file.filename, hunk))
+
+        with patch(subprocess, 'Popen', _mocked_popen):
+            files = list(iter_diff(GitDiff(ARGS), content=False, on_file=on_file, on_hunk=on_hunk))
+
+        self.assertListEqual(
+            [ file.filename for file in expected if file.status != GitFile.ADDED ],
+            [ file.filename for file in files ]
+        )
+        self.assertListEqual([
+            (file.filename, file.hunk(idx)) for file in expected for idx in range(file.hunk_count)
+        ], hunks)
+
+    def test_iter_diff_abort(self):
+        def on_file(file: GitFile) -> None:
+            if file.changes > 10:
+                raise _BudgetExceeded()
+
+        procs: typing.List[_MockedPopen] = []
+
+        with patch(subprocess, 'Popen', _tracked_popen(procs)):
+            files = []
+            with self.assertRaises(_BudgetExceeded):
+                for file in iter_diff(GitDiff(ARGS), on_file=on_file):
+                    files.append(file)
+
+        self.assertTrue(all(file.changes <= 10 for file in files))
+        self.assertListEqual([False, True], [ proc.killed for proc in procs ])
+
+    def test_iter_diff_stop(self):
+        procs: typing.List[_MockedPopen] = []
+
+        with patch(subprocess, 'Popen', _tracked_popen(procs)):
+            files = iter_diff(GitDiff(ARGS))
+            next(files)
+            files.close()
+            self.assertTrue(procs[-1].killed)
+
+            list(iter_diff(GitDiff(ARGS)))
+            self.assertFalse(procs[-1].killed)
+
+    def test_iter_diff_async(self):
+        expected = _get_expected_files()
+
+        async def collect() -> typing.List[GitFile]:
+            return [ file async for file in iter_diff_async(GitDiff(ARGS)) ]
+
+        with patch(asyncio, 'create_subprocess_exec', _mocked_subprocess_exec):
+            files = asyncio.run(collect())
+
+        self.assertListEqual(
+            [ (file.filename, file.status, list(file.content)) for file in expected ],
+            [ (file.filename, file.status, list(file.content)) for file in files ]
+        )
+
+    def test_gitdiff_iter_diff(self):
+        expected = _get_expected_files()
+
+        async def collect() -> typing.List[GitFile]:
+            return [ file async for file in GitDiff(ARGS).iter_diff_async(content=False) ]
+
+        with patch(subprocess, 'Popen', _mocked_popen):
+            files = list(GitDiff(ARGS).iter_diff(content=False))
+        with patch(asyncio, 'create_subprocess_exec', _mocked_subprocess_exec):
+            async_files = asyncio.run(collect())
+
+        for result in (files, async_files):
+            with self.subTest(async_=result is async_files):
+                self.assertListEqual(
+                    [ (file.filename, file.insertions, file.deletions) for file in expected ],
+                    [ (file.filename, file.insertions, file.deletions) for file in result ]
+                )
+
+class _BudgetExceeded(Exception):
+    pass
+
+def _get_expected_files() -> typing.Sequence[GitFile]:
+    gitdiff = GitDiff(ARGS)
+    files = gitdiff._process_diff(_get_mocked_diff_data(ARGS))
+    gitdiff._process_statuses(files, _get_mocked_status_data(ARGS))
+    return files
+
+def _mocked_output(args: typing.Sequence[str]) -> bytes:
+    if '--name-status' in args:
+        return _get_mocked_status_data(ARGS)
+    return _get_mocked_diff_data(ARGS)
+
+class _MockedPopen:
+    def __init__(self, args: typing.Sequence[str]):
+        self.stdout = io.BytesIO(_mocked_output(args))
+        self.stderr = io.BytesIO()
+        self.returncode: typing.Optional[int] = None
+        self.killed = False
+
+    def communicate(self) -> typing.Tuple[bytes, bytes]:
+        self.returncode = 0
+        return self.stdout.read(), self.stderr.read()
+
+    def poll(self) -> typing.Optional[int]:
+        return self.returncode
+
+    def kill(self) -> None:
+        self.killed = True
+        self.returncode = -9
+
+    def wait(self) -> int:
+        if self.returncode is None:
+            self.returncode = 0
+        return self.returncode
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stdout.close()
+
+def _mocked_popen(args: typing.Sequence[str], **kwargs) -> _MockedPopen:
+    return _MockedPopen(args)
+
+def _tracked_popen(procs: typing.List[_MockedPopen]) -> typing.Callable[..., _MockedPopen]:
+    def popen(args: typing.Sequence[str], **kwargs) -> _MockedPopen:
+        procs.append(_MockedPopen(args))
+        return procs[-1]
+    return popen
+
+class _MockedStream:
+    def __init__(self, data: bytes):
+        self.data = io.BytesIO(data)
+
+    async def readline(self) -> bytes:
+        return self.data.readline()
+
+    async def read(self) -> bytes:
+        return self.data.read()
+
+class _MockedProcess:
+    def __init__(self, args: typing.Sequence[str]):
+        self.stdout = _MockedStream(_mocked_output(args))
+        self.stderr = _MockedStream(b'')
+        self.returncode: typing.Optional[int] = None
+
+    async def communicate(self) -> typing.Tuple[bytes, bytes]:
+        self.returncode = 0
+        return await self.stdout.read(), b''
+
+    async def wait(self) -> int:
+        self.returncode = 0
+        return 0
+
+async def _mocked_subprocess_exec(*args, **kwargs) -> _MockedProcess:
+    return _MockedProcess(args)
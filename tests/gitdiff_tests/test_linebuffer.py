@@ -0,0 +1,87 @@
+import unittest
+
+from src.git_idiff.lines import LineBuffer, line_offsets, longest_line, stream_line_offsets
+
+DATA = 'data'
+EXPECTED = 'expected'
+
+class LineBufferTest(unittest.TestCase):
+    def test_split(self):
+        entries = [
+            { DATA: b'a\nbc\n', EXPECTED: ['a', 'bc', ''] },
+            { DATA: b'a\n\nbc', EXPECTED: ['a', '', 'bc'] },
+            { DATA: b'\n', EXPECTED: ['', ''] },
+            { DATA: b'', EXPECTED: [] },
+        ]
+
+        for entry in entries:
+            data = entry[DATA]
+            with self.subTest(data=data):
+                lines = LineBuffer(data)
+                self.assertEqual(len(entry[EXPECTED]), len(lines))
+                self.assertListEqual(entry[EXPECTED], list(lines))
+                self.assertListEqual(entry[EXPECTED], [ lines[i] for i in range(len(lines)) ])
+
+    def test_getitem(self):
+        lines = LineBuffer(b'zero\none\ntwo\nthree')
+
+        self.assertEqual('three', lines[-1])
+        self.assertListEqual(['one', 'two'], list(lines[1:3]))
+        self.assertListEqual(['zero', 'two'], list(lines[::2]))
+        self.assertListEqual([], list(lines[3:1]))
+        self.assertIs(lines.data, lines[1:].data)
+
+        with self.assertRaises(IndexError):
+            _ = lines[4]
+
+    def test_from_lines(self):
+        entries = [
+            ['a', 'bc'],
+            [''],
+            [],
+        ]
+
+        for entry in entries:
+            with self.subTest(lines=entry):
+                self.assertListEqual(entry, list(LineBuffer.from_lines(entry)))
+                self.assertEqual(entry, LineBuffer.from_lines(entry))
+
+    def test_longest(self):
+        entries = [
+            { DATA: b'a\nbcd\n', EXPECTED: 3 },
+            { DATA: b'abcd', EXPECTED: 4 },
+            { DATA: b'', EXPECTED: 0 },
+        ]
+
+        for entry in entries:
+            data = entry[DATA]
+            with self.subTest(data=data):
+                self.assertEqual(entry[EXPECTED], LineBuffer(data).longest())
+                self.assertEqual(entry[EXPECTED], longest_line(data.decode().split('\n') if data else []))
+
+    def test_line_offsets(self):
+        self.assertListEqual([0, 2, 5, 6], list(line_offsets(b'a\nbc\n')))
+
+    def test_stream_line_offsets(self):
+        entries = [b'a\nbc\n', b'a\n\nbcdef\ng', b'\n\n', b'abcdefg', b'']
+
+        for data in entries:
+            for chunk_size in (1, 2, 3, 64):
+                with self.subTest(data=data, chunk_size=chunk_size):
+                    self.assertListEqual(list(line_offsets(data)), list(stream_line_offsets(data, chunk_size)))
+
+    def test_decode_errors(self):
+        entries = [
+            { DATA: 'replace', EXPECTED: ['caf\ufffd', 'ok'] },
+            { DATA: 'surrogateescape', EXPECTED: ['caf\udce9', 'ok'] },
+            { DATA: 'ignore', EXPECTED: ['caf', 'ok'] },
+        ]
+
+        for entry in entries:
+            errors = entry[DATA]
+            with self.subTest(errors=errors):
+                self.assertListEqual(entry[EXPECTED], list(LineBuffer(b'caf\xe9\nok', errors=errors)))
+
+        with self.assertRaises(UnicodeDecodeError):
+            _ = LineBuffer(b'caf\xe9\nok', errors='strict')[0]
+        self.assertEqual('ok', LineBuffer(b'caf\xe9\nok', errors='strict')[1])
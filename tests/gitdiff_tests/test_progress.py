@@ -0,0 +1,42 @@
+import unittest
+
+from src.git_idiff.gitdiff import GitDiff
+from src.git_idiff.progress import DiffProgress
+from tests.gitdiff_tests.test_gitdiff import _get_mocked_diff_data
+
+ARGS = 'args'
+
+CHUNK_SIZES = [1, 2, 7, 13, 64, 4096, 2**20]
+
+class DiffProgressTest(unittest.TestCase):
+    def test_update(self):
+        entries = [
+            {
+                ARGS: ['62a4472', '8ef1477'],
+            },
+            {
+                ARGS: ['-M05', '3382256', 'c04fa3b'],
+            },
+            {
+                ARGS: ['empty'],
+            },
+            {
+                ARGS: ['merge-conflicts'],
+            },
+        ]
+
+        for entry in entries:
+            args = entry[ARGS]
+            data = _get_mocked_diff_data(args)
+            expected = len(GitDiff(args)._process_diff(data))
+
+            for size in CHUNK_SIZES:
+                with self.subTest(args=args, chunk_size=size):
+                    progress = DiffProgress()
+                    for idx in range(0, len(data), size):
+                        progress.update(data[idx:idx + size])
+
+                    self.assertEqual(len(data), progress.bytes_read)
+                    self.assertEqual(expected, progress.files)
+                    if expected != 0:
+                        self.assertEqual(expected, progress.expected_files)
@@ -0,0 +1,26 @@
+import asyncio
+import sys
+import time
+import unittest
+
+from src.git_idiff.process import ProcessError, run_async
+
+class RunAsyncTest(unittest.TestCase):
+    def test_run_async(self):
+        output = asyncio.run(run_async([sys.executable, '-c', 'print("done")']))
+        self.assertEqual(b'done', output.strip())
+
+        with self.assertRaises(ProcessError):
+            asyncio.run(run_async([sys.executable, '-c', 'import sys; sys.exit(1)']))
+
+    def test_run_async_cancel(self):
+        async def cancel() -> None:
+            task = asyncio.ensure_future(run_async([sys.executable, '-c', 'import time; time.sleep(30)']))
+            await asyncio.sleep(0.2)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        start = time.monotonic()
+        asyncio.run(cancel())
+        self.assertLess(time.monotonic() - start, 10)
@@ -89,6 +89,11 @@ class SanitizeArgsTest(unittest.TestCase):
                 ARGS: ['--not-whitelisted', '--cached', '--text', '--not-wl'],
                 EXPECTED: ['--cached', '--text'],
                 REMOVED: ['--not-whitelisted', '--not-wl']
+            },
+            {
+                ARGS: ['--skip-to', 'a', '--ignore-matching-lines', '^#', 'HEAD', '--anchored'],
+                EXPECTED: ['--skip-to=a', '--ignore-matching-lines=^#', 'HEAD', '--anchored'],
+                REMOVED: []
             }
         ]
 
@@ -108,6 +113,10 @@ class SanitizeArgsTest(unittest.TestCase):
             {
                 ARGS: ['--dst-prefix=z'],
                 EXPECTED: (None, 'z')
+            },
+            {
+                ARGS: ['--src-prefix', 'y', '--dst-prefix', 'z'],
+                EXPECTED: ('y', 'z')
             }
         ]
 
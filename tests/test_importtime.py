@@ -0,0 +1,80 @@
+import os
+import subprocess
+import sys
+import typing
+import unittest
+
+ARGS = 'args'
+EXPECTED = 'expected'
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+# modules that are only needed once the ui starts
+UI_MODULES = ['asyncio', 'curses', '_curses', 'git_idiff.ui']
+
+# the entry point takes about a twentieth of the import time of gitdiff,
+# it is allowed up to a half so timing noise does not fail the test
+ENTRY_POINT_FACTOR = 2
+
+class ImportTimeTest(unittest.TestCase):
+    def test_lazy_imports(self):
+        entries = [
+            {
+                ARGS: ['-m', 'git_idiff', '-V'],
+                EXPECTED: [*UI_MODULES, 'git_idiff.gitdiff'],
+            },
+            {
+                ARGS: ['-c', 'import git_idiff.__main__'],
+                EXPECTED: [*UI_MODULES, 'git_idiff.gitdiff'],
+            },
+            {
+                ARGS: ['-c', 'import git_idiff.gitdiff'],
+                EXPECTED: UI_MODULES,
+            },
+        ]
+
+        for entry in entries:
+            args = entry[ARGS]
+            with self.subTest(args=args):
+                imports = _get_import_times(args)
+                self.assertIn('git_idiff', imports)
+
+                for module in entry[EXPECTED]:
+                    self.assertFalse(
+                        any(name == module or name.startswith(module + '.') for name in imports),
+                        f'{module} should not be imported'
+                    )
+
+    def test_entry_point_import_time(self):
+        # gitdiff is imported first so the modules both need are only counted for it
+        imports = _get_import_times(['-c', 'import git_idiff.gitdiff; import git_idiff.__main__'])
+
+        # importing the ui from the entry point alone takes longer than gitdiff
+        self.assertLess(
+            imports['git_idiff.__main__'] * ENTRY_POINT_FACTOR, imports['git_idiff.gitdiff']
+        )
+
+def _get_import_times(args: typing.List[str]) -> typing.Dict[str, int]:
+    """
+    Runs python with -X importtime and returns the cumulative import time of each imported module
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = SRC_DIR
+
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', *args],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env=env,
+        check=True
+    )
+
+    result = {}
+    for line in proc.stderr.decode('utf-8').splitlines():
+        if not line.startswith('import time:'):
+            continue
+
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if cumulative.strip().isdigit():
+            result[name.strip()] = int(cumulative)
+    return result
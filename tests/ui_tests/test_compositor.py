@@ -0,0 +1,36 @@
+import curses
+import unittest
+
+from src.git_idiff.ui.compositor import Compositor
+from ..testutils import patch
+
+class MockPad:
+    def __init__(self, calls: list):
+        self.compositor = None
+        self.calls = calls
+
+    def noutrefresh(self) -> None:
+        self.calls.append(self)
+
+class CompositorTest(unittest.TestCase):
+    def test_update(self):
+        calls = []
+        pad_a = MockPad(calls)
+        pad_b = MockPad(calls)
+
+        compositor = Compositor(None)
+        compositor.add(pad_a)
+        compositor.add(pad_b)
+        self.assertIs(compositor, pad_a.compositor)
+
+        compositor.damage(pad_b)
+        compositor.damage(pad_a)
+        compositor.damage(pad_b)
+
+        with patch(curses, 'doupdate', lambda: calls.append('doupdate')):
+            compositor.update()
+            self.assertListEqual([pad_b, pad_a, 'doupdate'], calls)
+            self.assertListEqual([], compositor.damaged)
+
+            compositor.update()
+            self.assertListEqual([pad_b, pad_a, 'doupdate', 'doupdate'], calls)
@@ -0,0 +1,49 @@
+import unittest
+
+from src.git_idiff.gitdiff import GitDiff
+from src.git_idiff.gitfile import GitFile
+from src.git_idiff.process import ProcessError
+from src.git_idiff.ui.cui import CursesUi
+
+class MockGitDiff(GitDiff):
+    def get_diff(self, previous=None):
+        raise ProcessError('fatal: bad revision\nusage: git diff')
+
+class MockFileView:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+class MockPad:
+    y = 3
+    x = 0
+
+class MockCursesUi(CursesUi):
+    def __init__(self, gitdiff: GitDiff):
+        super().__init__(gitdiff)
+        self.statusbar_updates = 0
+
+    def update_statusbar(self) -> None:
+        self.statusbar_updates += 1
+
+class CursesUiTest(unittest.TestCase):
+    def test_refresh_diff_error(self):
+        ui = MockCursesUi(MockGitDiff())
+        file = GitFile('test', None, 1, 1)
+        file_view = MockFileView()
+        ui.pad_diff = MockPad()
+        ui.filelist.append_file(file)
+        ui.selected_file = ui.filelist[0]
+        ui.selected_file_idx = 0
+        ui.file_view = file_view
+
+        ui._refresh_diff()
+
+        # the diff pad still shows the file view, so it must stay open
+        self.assertIs(file_view, ui.file_view)
+        self.assertFalse(file_view.closed)
+        self.assertEqual('test', ui.selected_file.filename)
+        self.assertEqual('failed to refresh the diff: fatal: bad revision', ui.status_message)
+        self.assertEqual(1, ui.statusbar_updates)
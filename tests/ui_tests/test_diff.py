@@ -0,0 +1,108 @@
+import curses
+import typing
+import unittest
+
+from src.git_idiff.ui.diff import LINE_CHUNK_SIZE, LONG_LINE_LENGTH, DiffPad
+from ..testutils import patch
+
+ARGS = 'args'
+EXPECTED = 'expected'
+VALUE = 'value'
+
+class MockPad:
+    def __init__(self, height: int, width: int):
+        self.size = (height, width)
+        self.calls: typing.List[typing.Tuple[str, tuple]] = []
+
+    def getmaxyx(self):
+        return self.size
+
+    def resize(self, height: int, width: int) -> None:
+        self.size = (height, width)
+
+    def erase(self) -> None:
+        self.calls.clear()
+
+    def addnstr(self, *args):
+        self.calls.append(('addnstr', args))
+
+    def addch(self, *args):
+        self.calls.append(('addch', args))
+
+    def noutrefresh(self, *args):
+        pass
+
+class MockWindow:
+    def getmaxyx(self):
+        return (4, 20)
+
+def _diff_pad(content):
+    with patch(curses, 'newpad', MockPad):
+        pad = DiffPad(MockWindow(), None, 0)
+
+    pad.worddiff_enabled = False
+    with patch(curses, 'color_pair', lambda x: 0), patch(curses, 'doupdate', lambda: None):
+        pad.update([], content, len(content), max(map(len, content)))
+    return pad
+
+def _refresh(pad, y, x):
+    with patch(curses, 'color_pair', lambda x: 0), patch(curses, 'doupdate', lambda: None):
+        pad.refresh(y, x)
+    return pad.pad.calls
+
+class DiffPadTest(unittest.TestCase):
+    def test_line_slice(self):
+        line = ''.join(chr(ord('a') + idx) * LINE_CHUNK_SIZE for idx in range(5))
+        pad = _diff_pad([line, 'x' * (LINE_CHUNK_SIZE - 4) + '\tyz', 'short\tline'])
+
+        entries = [
+            { ARGS: (0, 0, 4), EXPECTED: ('aaaa', len(line)) },
+            { ARGS: (0, LINE_CHUNK_SIZE - 2, 4), EXPECTED: ('aabb', len(line)) },
+            { ARGS: (0, LINE_CHUNK_SIZE, 2), EXPECTED: ('bb', len(line)) },
+            { ARGS: (0, LINE_CHUNK_SIZE * 2 - 1, LINE_CHUNK_SIZE + 2), EXPECTED: (
+                'b' + 'c' * LINE_CHUNK_SIZE + 'd', len(line)
+            ) },
+            { ARGS: (0, len(line) - 2, 10), EXPECTED: ('ee', len(line)) },
+            { ARGS: (0, len(line) + 5, 10), EXPECTED: ('', len(line)) },
+            # the tab is expanded before the line is split into chunks
+            { ARGS: (1, LINE_CHUNK_SIZE - 6, 10), EXPECTED: ('xx    yz', LINE_CHUNK_SIZE + 2) },
+            { ARGS: (1, LINE_CHUNK_SIZE, 10), EXPECTED: ('yz', LINE_CHUNK_SIZE + 2) },
+            { ARGS: (2, 3, 8), EXPECTED: ('rt   lin', 12) },
+        ]
+
+        for entry in entries:
+            with self.subTest(args=entry[ARGS]):
+                self.assertEqual(entry[EXPECTED], pad._line_slice(*entry[ARGS]))
+
+    def test_refresh_long_markers(self):
+        line = '0123456789' * (LONG_LINE_LENGTH // 10 + 1)
+        pad = _diff_pad([line, 'short'])
+
+        entries = [
+            { VALUE: 0, EXPECTED: [(19, '>')] },
+            { VALUE: 10, EXPECTED: [(0, '<'), (19, '>')] },
+            { VALUE: len(line), EXPECTED: [(0, '<')] },
+        ]
+
+        for entry in entries:
+            with self.subTest(x=entry[VALUE]):
+                calls = _refresh(pad, 0, entry[VALUE])
+                self.assertListEqual(entry[EXPECTED], [
+                    (args[1], args[2]) for name, args in calls if name == 'addch' and args[0] == 0
+                ])
+                # the short line is not drawn once the view is past its end
+                self.assertEqual(pad.x < 5, any(
+                    name == 'addnstr' and args[0] == 1 for name, args in calls
+                ))
+
+        self.assertEqual(len(line) - 19, pad.x)
+
+    def test_refresh_long_tabs(self):
+        line = '\t' * (LONG_LINE_LENGTH + 1) + 'end'
+        pad = _diff_pad([line])
+
+        calls = _refresh(pad, 0, len(line.expandtabs()))
+
+        # the view is clamped to the tab expanded line, not its length
+        self.assertEqual(len(line.expandtabs()) - 19, pad.x)
+        self.assertEqual(('addnstr', (0, 0, ' ' * 16 + 'end', 20, curses.A_NORMAL)), calls[0])
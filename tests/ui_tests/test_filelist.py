@@ -1,7 +1,7 @@
 import curses
 import unittest
 
-from src.git_idiff.gitdiff import GitFile
+from src.git_idiff.gitfile import GitFile
 from src.git_idiff.ui.filelist import _gitfile_to_saf, _gitfile_to_entry
 from ..testutils import patch
 
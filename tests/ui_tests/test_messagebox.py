@@ -4,6 +4,8 @@ from src.git_idiff.ui.messagebox import MessageBox
 
 MESSAGE = 'message'
 WIDTH = 'width'
+HSPACING = 'hspacing'
+VSPACING = 'vspacing'
 EXPECTED = 'expected'
 
 class MessageBoxTest(unittest.TestCase):
@@ -46,3 +48,25 @@ class MessageBoxTest(unittest.TestCase):
                     entry[EXPECTED],
                     MessageBox.box_msg(message, width)
                 )
+
+    def test_box_size(self):
+        entries = [
+            {
+                MESSAGE: ['ab', 'abcd'],
+                EXPECTED: (4, 6)
+            },
+            {
+                MESSAGE: ['ab', 'abcd'],
+                HSPACING: 1,
+                VSPACING: 2,
+                EXPECTED: (8, 8)
+            },
+        ]
+
+        for entry in entries:
+            with self.subTest(message=entry[MESSAGE]):
+                self.assertTupleEqual(entry[EXPECTED], MessageBox.box_size(
+                    entry[MESSAGE],
+                    entry.get(HSPACING, 0),
+                    entry.get(VSPACING, 0)
+                ))
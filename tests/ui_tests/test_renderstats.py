@@ -0,0 +1,86 @@
+import io
+import unittest
+
+from src.git_idiff.ui import renderstats
+from src.git_idiff.ui.renderstats import RenderStats
+from ..testutils import patch
+
+class MockWindow:
+    def __init__(self):
+        self.calls = []
+
+    def addstr(self, *args):
+        self.calls.append(('addstr', args))
+
+    def addnstr(self, *args):
+        self.calls.append(('addnstr', args))
+
+    def addch(self, *args):
+        self.calls.append(('addch', args))
+
+    def noutrefresh(self, *args):
+        self.calls.append(('noutrefresh', args))
+
+    def refresh(self, *args):
+        self.calls.append(('refresh', args))
+
+    def getch(self):
+        self.calls.append(('getch', ()))
+        return -1
+
+    def getmaxyx(self):
+        return (24, 80)
+
+class RenderStatsTest(unittest.TestCase):
+    def test_count(self):
+        mock = MockWindow()
+        # only the reads around refresh and getch are counted
+        written = iter([0, 100, 160, 500, 510])
+
+        with patch(renderstats, '_get_bytes_written', lambda: next(written)):
+            stats = RenderStats()
+            win = stats.wrap(mock)
+            stats.end_frame()
+            stats.start_frame(ord('n'))
+
+            win.addstr(0, 0, 'abc', 1)
+            win.addstr('de')
+            win.addnstr(1, 0, 'abcdef', 4, 1)
+            win.addnstr('ab', 10)
+            win.addch(2, 0, 'x')
+            win.noutrefresh(0, 0, 0, 0, 10, 10)
+            self.assertTupleEqual((24, 80), win.getmaxyx())
+            win.refresh()
+            self.assertEqual(-1, win.getch())
+            stats.end_frame()
+
+        self.assertEqual(8, len(mock.calls))
+
+        frame = stats.frames[1]
+        self.assertDictEqual({
+            'addstr': 2,
+            'addnstr': 2,
+            'addch': 1,
+            'refresh': 1,
+            'noutrefresh': 1,
+            'doupdate': 0,
+        }, frame.calls)
+        self.assertEqual(12, frame.chars)
+        self.assertEqual(2, frame.refreshes)
+        self.assertEqual(70, frame.bytes_written)
+
+        out = io.StringIO()
+        stats.report(out)
+        lines = [ line.split('\t') for line in out.getvalue().splitlines() ]
+
+        self.assertEqual('key', lines[0][0])
+        self.assertListEqual(['2', '2', '1', '1', '1', '0', '12', '70'], lines[2][1:-1])
+        self.assertEqual('total', lines[-1][0])
+
+    def test_count_unmeasured(self):
+        with patch(renderstats, '_get_bytes_written', lambda: None):
+            stats = RenderStats()
+            stats.wrap(MockWindow()).refresh()
+            stats.end_frame()
+
+        self.assertIsNone(stats.frames[0].bytes_written)
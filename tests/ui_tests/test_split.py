@@ -0,0 +1,56 @@
+import unittest
+
+from src.git_idiff.ui.split import split_rows
+
+HEADERS_LEN = 'headers-len'
+CONTENT = 'content'
+EXPECTED = 'expected'
+
+class SplitTest(unittest.TestCase):
+    def test_split_rows(self):
+        entries = [
+            {
+                HEADERS_LEN: 1,
+                CONTENT: [
+                    '@@ -1,4 +1,3 @@',
+                    ' a',
+                    '-b',
+                    '-c',
+                    '+d',
+                    ' e',
+                    ''
+                ],
+                EXPECTED: [0, 0, 1, 1, 2, 2, 3, 5, 4, -1, 6, 6]
+            },
+            {
+                HEADERS_LEN: 0,
+                CONTENT: [
+                    '@@ -1 +1,2 @@',
+                    '-a',
+                    '+b',
+                    '+c',
+                    '-d',
+                    '+e',
+                ],
+                EXPECTED: [0, 0, 1, 2, -1, 3, 4, 5]
+            },
+            {
+                HEADERS_LEN: 0,
+                CONTENT: [
+                    '@@ -1 +1 @@',
+                    '-a',
+                    '\\ No newline at end of file',
+                    '+a',
+                    '\\ No newline at end of file',
+                ],
+                EXPECTED: [0, 0, 1, 3, 2, 4]
+            },
+        ]
+
+        for entry in entries:
+            content = entry[CONTENT]
+            with self.subTest(content=content):
+                self.assertListEqual(
+                    entry[EXPECTED],
+                    list(split_rows(entry[HEADERS_LEN], content))
+                )
@@ -0,0 +1,49 @@
+import unittest
+
+from src.git_idiff.ui import colors
+from src.git_idiff.ui.syntax import SyntaxHighlighter
+
+FILENAME = 'filename'
+LINE = 'line'
+EXPECTED = 'expected'
+
+class SyntaxHighlighterTest(unittest.TestCase):
+    def setUp(self):
+        self.highlighter = SyntaxHighlighter(cache_size=2)
+        if not self.highlighter.available:
+            self.skipTest('pygments is not installed')
+
+    def test_tokenize(self):
+        entries = [
+            {
+                FILENAME: 'test.py',
+                LINE: 'return 1 # one',
+                EXPECTED: [
+                    ('return', colors.COLOR_SYNTAX_KEYWORD),
+                    (' ', 0),
+                    ('1', colors.COLOR_SYNTAX_NUMBER),
+                    (' ', 0),
+                    ('# one', colors.COLOR_SYNTAX_COMMENT),
+                ]
+            },
+            {
+                FILENAME: 'unknown.zzzzzz',
+                LINE: 'return 1',
+                EXPECTED: None
+            },
+        ]
+
+        for entry in entries:
+            with self.subTest(filename=entry[FILENAME], line=entry[LINE]):
+                self.assertEqual(
+                    entry[EXPECTED],
+                    self.highlighter.tokenize(entry[FILENAME], entry[LINE])
+                )
+
+    def test_tokenize_cache(self):
+        tokens = self.highlighter.tokenize('test.py', 'a = 1')
+        self.assertIs(tokens, self.highlighter.tokenize('test.py', 'a = 1'))
+
+        self.highlighter.tokenize('test.py', 'b = 1')
+        self.highlighter.tokenize('test.py', 'c = 1')
+        self.assertIsNot(tokens, self.highlighter.tokenize('test.py', 'a = 1'))
@@ -0,0 +1,81 @@
+import unittest
+
+from src.git_idiff.ui.worddiff import hunk_spans, line_spans
+
+LINES = 'lines'
+OLD = 'old'
+NEW = 'new'
+EXPECTED = 'expected'
+
+class WordDiffTest(unittest.TestCase):
+    def test_line_spans(self):
+        entries = [
+            {
+                OLD: 'self.value = get(1)',
+                NEW: 'self.value = fetch(1)',
+                EXPECTED: ([(13, 16)], [(13, 18)])
+            },
+            {
+                OLD: 'return a',
+                NEW: 'return a, b',
+                EXPECTED: ([], [(8, 11)])
+            },
+            {
+                OLD: 'completely',
+                NEW: 'different',
+                EXPECTED: ([], [])
+            },
+            {
+                OLD: 'same line',
+                NEW: 'same line',
+                EXPECTED: ([], [])
+            },
+        ]
+
+        for entry in entries:
+            with self.subTest(old=entry[OLD], new=entry[NEW]):
+                self.assertTupleEqual(entry[EXPECTED], line_spans(entry[OLD], entry[NEW]))
+
+    def test_hunk_spans(self):
+        entries = [
+            {
+                LINES: [
+                    '@@ -1,3 +1,3 @@',
+                    ' context',
+                    '-x = 1',
+                    '+x = 2',
+                    ' context',
+                ],
+                EXPECTED: [(2, 5, 6), (3, 5, 6)]
+            },
+            {
+                LINES: [
+                    '@@ -1,3 +1,2 @@',
+                    '-a = 1',
+                    '-b = 1',
+                    '+a = 2',
+                ],
+                EXPECTED: [(1, 5, 6), (3, 5, 6)]
+            },
+            {
+                LINES: [
+                    '@@ -1,1 +1,1 @@',
+                    '-\ta = 1',
+                    '+\ta = 2',
+                ],
+                EXPECTED: [(1, 12, 13), (2, 12, 13)]
+            },
+            {
+                LINES: [
+                    '@@ -1,1 +1,1 @@',
+                    '+a = 1',
+                    '-a = 2',
+                ],
+                EXPECTED: []
+            },
+        ]
+
+        for entry in entries:
+            lines = entry[LINES]
+            with self.subTest(lines=lines):
+                self.assertListEqual(entry[EXPECTED], hunk_spans(lines, 1, len(lines)))